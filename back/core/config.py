@@ -1,5 +1,5 @@
+import json
 import os
-import queue
 from dotenv import load_dotenv
 from sqlalchemy import create_engine
 import torch
@@ -15,16 +15,51 @@ class Settings:
     UPLOAD_FOLDER = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "upload")
     DATASETS_FOLDER = os.path.join(UPLOAD_FOLDER, "datasets")
     MODELS_FOLDER = os.path.join(UPLOAD_FOLDER, "models")
+    CACHE_FOLDER = os.path.join(UPLOAD_FOLDER, "cache")
+    # Tamaño de los bloques con que se escriben las subidas a disco (bytes)
+    UPLOAD_CHUNK_SIZE = int(os.getenv("UPLOAD_CHUNK_SIZE", 1024 * 1024))
+    # Filas por bloque al parsear un dataset subido
+    PARSE_CHUNK_ROWS = int(os.getenv("PARSE_CHUNK_ROWS", 100_000))
+    # Códigos máximos por columna categórica, los valores menos frecuentes se agrupan (0 sin límite)
+    MAX_CATEGORIES = int(os.getenv("MAX_CATEGORIES", 0))
+    # Valores distintos por columna numérica con que las estadísticas de la subida siguen siendo exactas
+    STATS_MAX_DISTINCT = int(os.getenv("STATS_MAX_DISTINCT", 100_000))
+    # Filas de la muestra con que se calcula el histograma de las columnas sobre ese límite
+    STATS_SAMPLE_ROWS = int(os.getenv("STATS_SAMPLE_ROWS", 100_000))
     # Task queue settings
     MAX_WORKERS = 2
-    TASK_QUEUE = queue.Queue()
-    TASKS_PROGRESS = {}
+    # "thread" ejecuta los entrenamientos en threads, "process" en un proceso por entrenamiento
+    TRAIN_EXECUTOR = os.getenv("TRAIN_EXECUTOR", "thread")
+    JOBS_FOLDER = os.path.join(UPLOAD_FOLDER, "jobs")
+    # Cola persistente de entrenamientos
+    JOB_QUEUE_URL = os.getenv("JOB_QUEUE_URL", "sqlite:///" + os.path.join(JOBS_FOLDER, "queue.db"))
+    JOB_LEASE_SECONDS = int(os.getenv("JOB_LEASE_SECONDS", 60))
+    JOB_POLL_SECONDS = float(os.getenv("JOB_POLL_SECONDS", 1))
+    JOB_MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", 3))
+    MAX_JOBS_PER_USER = int(os.getenv("MAX_JOBS_PER_USER", MAX_WORKERS))
+    # Prioridad máxima que un usuario puede pedir para sus entrenamientos (desde 0)
+    MAX_JOB_PRIORITY = int(os.getenv("MAX_JOB_PRIORITY", 5))
+    # Configuraciones máximas de un barrido de hiperparámetros
+    MAX_SWEEP_POINTS = int(os.getenv("MAX_SWEEP_POINTS", 50))
+    # Folds máximos de una validación cruzada
+    MAX_FOLDS = int(os.getenv("MAX_FOLDS", 20))
+    # Escritura del progreso de entrenamiento en la base de datos
+    PROGRESS_FLUSH_SECONDS = float(os.getenv("PROGRESS_FLUSH_SECONDS", 2))
+    PROGRESS_FLUSH_EPOCHS = int(os.getenv("PROGRESS_FLUSH_EPOCHS", 0))
+    # Pool de threads para el trabajo de CPU de las rutas
+    OFFLOAD_MAX_WORKERS = int(os.getenv("OFFLOAD_MAX_WORKERS", 4))
+    OFFLOAD_ROUTE_LIMIT = int(os.getenv("OFFLOAD_ROUTE_LIMIT", 2))
+    # límites por ruta, p.ej. '{"predict": 4}'
+    OFFLOAD_ROUTE_LIMITS = json.loads(os.getenv("OFFLOAD_ROUTE_LIMITS", "{}"))
+    # Loaded models cache settings
+    MODEL_CACHE_MAX_MODELS = int(os.getenv("MODEL_CACHE_MAX_MODELS", 16))
+    MODEL_CACHE_MAX_BYTES = int(os.getenv("MODEL_CACHE_MAX_BYTES", 512 * 1024 * 1024))
     # Configure device for PyTorch
     DEVICE = "cuda" if torch.cuda.is_available() else "cpu"
     # Database configuration
     DB_ENGINE = os.getenv("DB_ENGINE", "sqlite")
     if DB_ENGINE == "sqlite":
-        DATABASE_URL = "sqlite:///./test.db"
+        DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./test.db")
         engine = create_engine(
             DATABASE_URL,
             connect_args={"check_same_thread": False}
@@ -51,5 +86,9 @@ class Settings:
             os.makedirs(self.DATASETS_FOLDER)
         if not os.path.exists(self.MODELS_FOLDER):
             os.makedirs(self.MODELS_FOLDER)
+        if not os.path.exists(self.CACHE_FOLDER):
+            os.makedirs(self.CACHE_FOLDER)
+        if not os.path.exists(self.JOBS_FOLDER):
+            os.makedirs(self.JOBS_FOLDER)
 
 settings = Settings()
\ No newline at end of file
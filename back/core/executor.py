@@ -0,0 +1,220 @@
+import importlib
+import multiprocessing
+import os
+import queue
+import socket
+import threading
+import uuid
+import json
+from core.config import settings
+from core.jobQueue import JobQueue
+from core.progressBus import progress_bus
+from utils.sanitize import sanitize_json
+from utils.trainingData import save_split, remove_split
+
+STOP_MESSAGE = json.dumps({"status": "Training stopped by user"})
+
+
+class LocalProgress:
+    """
+    Progreso de entrenamiento publicado directamente en el bus de progreso del proceso.
+    """
+
+    def update(self, task_id, msg):
+        progress_bus.publish(task_id, msg)
+
+    def stopped(self, task_id):
+        return progress_bus.stopped(task_id)
+
+
+class PipeProgress:
+    """
+    Progreso de entrenamiento reportado desde un proceso worker al proceso principal.
+    Los mensajes se envían por una cola y la detención se recibe por un evento.
+    """
+
+    def __init__(self, messages, stop):
+        self.messages = messages
+        self.stop = stop
+
+    def update(self, task_id, msg):
+        self.messages.put(msg)
+
+    def stopped(self, task_id):
+        return self.stop.is_set()
+
+
+def task_name(func):
+    return f"{func.__module__}:{func.__name__}"
+
+
+def resolve_task(name):
+    module, function = name.split(":")
+    return getattr(importlib.import_module(module), function)
+
+
+class ThreadExecutor:
+    """
+    Ejecuta los entrenamientos de la cola persistente en threads del proceso del servidor.
+    """
+
+    def __init__(self, job_queue: JobQueue, max_workers):
+        self.job_queue = job_queue
+        self.max_workers = max_workers
+
+    def start(self):
+        for _ in range(self.max_workers):
+            t = threading.Thread(target=self.worker_loop, daemon=True)
+            t.start()
+
+    def submit(self, func, kwargs, task_id, user_id=None, priority=0, data_path=None):
+        """
+        Encola un entrenamiento. El split se guarda en disco para que el trabajo sobreviva a un reinicio.
+        Args:
+            func (callable): Función de entrenamiento a nivel de módulo, recibe kwargs, data_path,
+                tasks_id y progress. Abre su propia sesión sobre DATABASE_URL.
+            kwargs (dict): Argumentos de la función. "data" contiene (X_train, X_test, y_train, y_test).
+            task_id (str): Id de la tarea (id de la iteración).
+            user_id (int): Usuario que encola el entrenamiento.
+            priority (int): Prioridad del entrenamiento.
+            data_path (str): Split ya guardado con save_split y compartido entre trabajos, en vez de "data".
+        """
+        kwargs = dict(kwargs)
+        if data_path is None:
+            data_path = save_split(os.path.join(settings.JOBS_FOLDER, str(task_id)), *kwargs.pop("data"))
+        return self.job_queue.put(
+            task_id,
+            task_name(func),
+            sanitize_json(kwargs),
+            data_path=data_path,
+            user_id=user_id,
+            priority=priority,
+        )
+
+    def submit_many(self, func, jobs, data_path, user_id=None, priority=0):
+        """
+        Encola varios entrenamientos sobre un mismo split ya guardado, todos en una sola
+        transacción para que ninguno elimine el split antes de que se encolen los demás.
+        Args:
+            func (callable): Función de entrenamiento, ver submit.
+            jobs (list[tuple]): (kwargs, task_id) de cada entrenamiento.
+            data_path (str): Split compartido guardado con save_split.
+            user_id (int): Usuario que encola los entrenamientos.
+            priority (int): Prioridad de los entrenamientos.
+        """
+        return self.job_queue.put_many([
+            {
+                "task_id": task_id,
+                "task": task_name(func),
+                "payload": sanitize_json(kwargs),
+                "data_path": data_path,
+                "user_id": user_id,
+                "priority": priority,
+            }
+            for kwargs, task_id in jobs
+        ])
+
+    def worker_loop(self):
+        worker_id = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        while True:
+            try:
+                job = self.job_queue.claim(worker_id)
+            except Exception as e:
+                print(f"Error en worker: {e}")
+                job = None
+            if job is None:
+                self.job_queue.wakeup.wait(settings.JOB_POLL_SECONDS)
+                self.job_queue.wakeup.clear()
+                continue
+            done = threading.Event()
+            heartbeat = threading.Thread(target=self.heartbeat_loop, args=(job, worker_id, done), daemon=True)
+            heartbeat.start()
+            error = None
+            try:
+                print(f"Starting task {job.task_id}")
+                self.run(job)
+            except Exception as e:
+                print(f"Error en worker: {e}")
+                error = str(e)
+            finally:
+                done.set()
+                self.job_queue.finish(job.id, worker_id, error=error)
+                #una validación cruzada encola un trabajo por fold con el mismo id de tarea, si uno
+                #falla o se detiene los demás ya no pueden completarla: los que corren se detienen
+                #en su siguiente época y los encolados se cancelan
+                if error is not None:
+                    progress_bus.request_stop(job.task_id)
+                    self.job_queue.cancel(job.task_id, f"Cancelled, another job of the task failed: {error}")
+                elif progress_bus.stopped(job.task_id):
+                    self.job_queue.cancel(job.task_id, "Cancelled, the task was stopped")
+                #un split compartido se elimina con el último trabajo que lo usa
+                if not self.job_queue.data_in_use(job.data_path):
+                    remove_split(job.data_path)
+                #el estado de la tarea se olvida con su último trabajo, haya o no clientes conectados
+                if not self.job_queue.is_pending(job.task_id):
+                    progress_bus.finish(job.task_id)
+
+    def heartbeat_loop(self, job, worker_id, done):
+        while not done.wait(self.job_queue.lease_seconds / 3):
+            self.job_queue.heartbeat(job.id, worker_id)
+
+    def run(self, job):
+        func = resolve_task(job.task)
+        func(
+            **job.payload,
+            data_path=job.data_path,
+            tasks_id=job.task_id,
+            progress=LocalProgress(),
+        )
+
+
+class ProcessExecutor(ThreadExecutor):
+    """
+    Ejecuta cada entrenamiento en su propio proceso, evitando que entrenamientos
+    concurrentes compitan por el GIL. El proceso lee el split desde disco y el progreso
+    vuelve al proceso principal por una cola.
+    """
+
+    def run(self, job):
+        task_id = job.task_id
+        kwargs = dict(job.payload, data_path=job.data_path)
+        ctx = multiprocessing.get_context("spawn")
+        messages = ctx.Queue()
+        stop = ctx.Event()
+        # daemon para que el proceso termine junto con el servidor, el entrenamiento no crea procesos
+        # propios y si el servidor se detiene el lease vence y el trabajo se retoma
+        process = ctx.Process(target=run_job, args=(job.task, kwargs, task_id, messages, stop), daemon=True)
+        process.start()
+        while process.is_alive() or not messages.empty():
+            if progress_bus.stopped(task_id):
+                stop.set()
+            try:
+                msg = messages.get(timeout=0.5)
+            except queue.Empty:
+                continue
+            progress_bus.publish(task_id, msg)
+        process.join()
+        if process.exitcode != 0:
+            raise RuntimeError(f"Training process exited with code {process.exitcode}")
+
+
+def run_job(task, kwargs, task_id, messages, stop):
+    """
+    Punto de entrada del proceso worker.
+    """
+    resolve_task(task)(**kwargs, tasks_id=task_id, progress=PipeProgress(messages, stop))
+
+
+def create_executor(kind, job_queue, max_workers):
+    """
+    Crea el ejecutor de entrenamientos configurado.
+    Args:
+        kind (str): "thread" o "process".
+        job_queue (JobQueue): Cola persistente de entrenamientos.
+        max_workers (int): Cantidad de entrenamientos simultáneos.
+    """
+    if kind == "thread":
+        return ThreadExecutor(job_queue, max_workers)
+    if kind == "process":
+        return ProcessExecutor(job_queue, max_workers)
+    raise ValueError(f"Unknown training executor {kind}")
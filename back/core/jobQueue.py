@@ -0,0 +1,285 @@
+import enum
+import threading
+from datetime import datetime, timedelta
+from sqlalchemy import Column, Integer, String, DateTime, JSON, Enum, create_engine, update, or_, and_, func
+from sqlalchemy.orm import declarative_base, sessionmaker
+from database import enable_sqlite_wal
+from utils.trainingData import remove_split
+
+QueueBase = declarative_base()
+
+
+class JobStatus(enum.Enum):
+    QUEUED = "queued"
+    RUNNING = "running"
+    DONE = "done"
+    FAILED = "failed"
+
+    def __str__(self):
+        return self.value
+
+
+class TrainingJob(QueueBase):
+    """
+    Modelo que representa un entrenamiento encolado.
+
+    La cola vive en su propia base de datos (por defecto un archivo SQLite local), de modo
+    que los entrenamientos pendientes sobreviven a un reinicio del servidor.
+
+    Atributos:
+        id (int): Identificador único del trabajo. Clave primaria.
+        task_id (str): Id de la tarea, corresponde al id de la iteración.
+        user_id (int): Usuario que encoló el entrenamiento, usado para limitar trabajos concurrentes.
+        priority (int): Prioridad del trabajo, los de mayor prioridad se ejecutan primero.
+        status (JobStatus): Estado del trabajo en la cola.
+        task (str): Función a ejecutar, como "modulo:funcion".
+        payload (dict): Argumentos de la función.
+        data_path (str): Carpeta con el split de entrenamiento guardado en disco.
+        worker_id (str): Worker que tomó el trabajo.
+        lease_expires_at (datetime): Hasta cuándo es válido el lease del worker, si vence el trabajo se vuelve a tomar.
+        attempts (int): Cantidad de veces que se tomó el trabajo.
+        error (str): Error del último intento.
+        created_at (datetime): Fecha y hora en que se encoló.
+        finished_at (datetime): Fecha y hora en que terminó.
+    """
+    __tablename__ = "training_jobs"
+
+    id = Column(Integer, primary_key=True, index=True)
+    task_id = Column(String, index=True, nullable=False)
+    user_id = Column(Integer, nullable=True)
+    priority = Column(Integer, default=0)
+    status = Column(Enum(JobStatus), default=JobStatus.QUEUED, index=True)
+    task = Column(String, nullable=False)
+    payload = Column(JSON, nullable=True)
+    data_path = Column(String, nullable=True)
+    worker_id = Column(String, nullable=True)
+    lease_expires_at = Column(DateTime, nullable=True)
+    attempts = Column(Integer, default=0)
+    error = Column(String, nullable=True)
+    created_at = Column(DateTime, nullable=False)
+    finished_at = Column(DateTime, nullable=True)
+
+
+class JobQueue:
+    """
+    Cola persistente de entrenamientos con semántica de claim/lease.
+
+    Un worker toma un trabajo con claim y lo mantiene renovando el lease con heartbeat.
+    Si el proceso muere el lease vence y otro worker vuelve a tomar el trabajo, hasta
+    max_attempts veces.
+
+    on_failed se llama con cada trabajo que se da por fallido al superar los intentos, antes
+    de confirmar el cambio en la cola, para marcar su iteración; si falla el trabajo no se
+    marca y se reintenta en el siguiente claim.
+    """
+
+    def __init__(self, url, lease_seconds=60, max_jobs_per_user=2, max_attempts=3, on_failed=None):
+        connect_args = {"check_same_thread": False} if url.startswith("sqlite") else {}
+        self.engine = enable_sqlite_wal(create_engine(url, connect_args=connect_args))
+        QueueBase.metadata.create_all(bind=self.engine)
+        self.Session = sessionmaker(bind=self.engine, autoflush=False, autocommit=False, expire_on_commit=False)
+        self.lease_seconds = lease_seconds
+        self.max_jobs_per_user = max_jobs_per_user
+        self.max_attempts = max_attempts
+        self.on_failed = on_failed
+        self.lock = threading.Lock()
+        # se activa al encolar para despertar a los workers
+        self.wakeup = threading.Event()
+
+    def put(self, task_id, task, payload, data_path=None, user_id=None, priority=0):
+        """
+        Encola un trabajo.
+        Args:
+            task_id (str): Id de la tarea.
+            task (str): Función a ejecutar, como "modulo:funcion".
+            payload (dict): Argumentos de la función, serializables a JSON.
+            data_path (str): Carpeta con los datos del trabajo.
+            user_id (int): Usuario dueño del trabajo.
+            priority (int): Prioridad, mayor se ejecuta antes.
+        Returns:
+            TrainingJob: Trabajo encolado.
+        """
+        return self.put_many([{
+            "task_id": task_id,
+            "task": task,
+            "payload": payload,
+            "data_path": data_path,
+            "user_id": user_id,
+            "priority": priority,
+        }])[0]
+
+    def put_many(self, jobs):
+        """
+        Encola varios trabajos en una sola transacción. Los trabajos que comparten un split
+        se encolan juntos: si uno termina antes de que se encolen los demás, el worker no
+        encuentra otro trabajo usando el split y lo elimina.
+        Args:
+            jobs (list[dict]): Argumentos de put de cada trabajo.
+        Returns:
+            list[TrainingJob]: Trabajos encolados.
+        """
+        now = datetime.now()
+        with self.Session() as db:
+            queued = [
+                TrainingJob(
+                    task_id=str(job["task_id"]),
+                    user_id=job.get("user_id"),
+                    priority=job.get("priority", 0),
+                    status=JobStatus.QUEUED,
+                    task=job["task"],
+                    payload=job["payload"],
+                    data_path=job.get("data_path"),
+                    attempts=0,
+                    created_at=now,
+                )
+                for job in jobs
+            ]
+            db.add_all(queued)
+            db.commit()
+        self.wakeup.set()
+        return queued
+
+    def claim(self, worker_id):
+        """
+        Toma el trabajo disponible de mayor prioridad respetando el límite de trabajos por usuario.
+        Los trabajos en ejecución con el lease vencido vuelven a estar disponibles.
+        Args:
+            worker_id (str): Id del worker que toma el trabajo.
+        Returns:
+            TrainingJob | None: Trabajo tomado o None si no hay trabajos disponibles.
+        """
+        with self.lock, self.Session() as db:
+            now = datetime.now()
+            expired = and_(TrainingJob.status == JobStatus.RUNNING, TrainingJob.lease_expires_at < now)
+            #trabajos que superaron los intentos se marcan como fallidos junto con su iteración
+            failed = db.query(TrainingJob).filter(expired, TrainingJob.attempts >= self.max_attempts).all()
+            for job in failed:
+                job.status = JobStatus.FAILED
+                job.finished_at = now
+                job.lease_expires_at = None
+                job.error = "Worker lease expired too many times"
+                if self.on_failed is not None:
+                    self.on_failed(job)
+            db.commit()
+            #los demás trabajos encolados de la tarea ya no pueden completarla
+            for job in failed:
+                self.cancel(job.task_id, f"Cancelled, another job of the task failed: {job.error}")
+            #un split compartido se elimina con el último trabajo que lo usa
+            for job in failed:
+                if job.data_path is not None and not self.data_in_use(job.data_path):
+                    remove_split(job.data_path)
+            running = dict(
+                db.query(TrainingJob.user_id, func.count(TrainingJob.id))
+                .filter(TrainingJob.status == JobStatus.RUNNING, TrainingJob.lease_expires_at >= now)
+                .group_by(TrainingJob.user_id)
+                .all()
+            )
+            candidates = (
+                db.query(TrainingJob)
+                .filter(or_(TrainingJob.status == JobStatus.QUEUED, expired))
+                .order_by(TrainingJob.priority.desc(), TrainingJob.id.asc())
+                .all()
+            )
+            for job in candidates:
+                if job.user_id is not None and running.get(job.user_id, 0) >= self.max_jobs_per_user:
+                    continue
+                #attempts funciona como version, si otro proceso tomó el trabajo no se actualiza ninguna fila
+                result = db.execute(
+                    update(TrainingJob)
+                    .where(TrainingJob.id == job.id, TrainingJob.attempts == job.attempts)
+                    .values(
+                        status=JobStatus.RUNNING,
+                        worker_id=worker_id,
+                        lease_expires_at=now + timedelta(seconds=self.lease_seconds),
+                        attempts=job.attempts + 1,
+                    )
+                )
+                db.commit()
+                if result.rowcount == 1:
+                    db.refresh(job)
+                    return job
+            return None
+
+    def heartbeat(self, job_id, worker_id):
+        """
+        Renueva el lease de un trabajo tomado por el worker.
+        Returns:
+            bool: False si el worker ya no es dueño del trabajo.
+        """
+        with self.Session() as db:
+            result = db.execute(
+                update(TrainingJob)
+                .where(TrainingJob.id == job_id, TrainingJob.worker_id == worker_id, TrainingJob.status == JobStatus.RUNNING)
+                .values(lease_expires_at=datetime.now() + timedelta(seconds=self.lease_seconds))
+            )
+            db.commit()
+            return result.rowcount == 1
+
+    def finish(self, job_id, worker_id, error=None):
+        """
+        Marca un trabajo como terminado, o fallido si se entrega un error.
+        """
+        with self.Session() as db:
+            db.execute(
+                update(TrainingJob)
+                .where(TrainingJob.id == job_id, TrainingJob.worker_id == worker_id)
+                .values(
+                    status=JobStatus.FAILED if error else JobStatus.DONE,
+                    error=error,
+                    finished_at=datetime.now(),
+                    lease_expires_at=None,
+                )
+            )
+            db.commit()
+
+    def cancel(self, task_id, error):
+        """
+        Da por fallidos los trabajos aún encolados de una tarea, por ejemplo los folds
+        pendientes de una validación cruzada cuando otro fold falla o se detiene.
+        Returns:
+            int: Cantidad de trabajos cancelados.
+        """
+        with self.Session() as db:
+            result = db.execute(
+                update(TrainingJob)
+                .where(TrainingJob.task_id == str(task_id), TrainingJob.status == JobStatus.QUEUED)
+                .values(status=JobStatus.FAILED, error=error, finished_at=datetime.now())
+            )
+            db.commit()
+            return result.rowcount
+
+    def get(self, task_id):
+        """
+        Obtiene el último trabajo encolado para una tarea.
+        Returns:
+            TrainingJob | None
+        """
+        with self.Session() as db:
+            return (
+                db.query(TrainingJob)
+                .filter(TrainingJob.task_id == str(task_id))
+                .order_by(TrainingJob.id.desc())
+                .first()
+            )
+
+    def is_pending(self, task_id):
+        """
+        Indica si algún trabajo de la tarea sigue encolado o en ejecución, una validación
+        cruzada encola un trabajo por fold con el mismo id de tarea.
+        """
+        with self.Session() as db:
+            return db.query(TrainingJob).filter(
+                TrainingJob.task_id == str(task_id),
+                TrainingJob.status.in_([JobStatus.QUEUED, JobStatus.RUNNING]),
+            ).first() is not None
+
+    def data_in_use(self, data_path):
+        """
+        Indica si algún trabajo encolado o en ejecución usa la carpeta de datos,
+        los barridos de hiperparámetros comparten un mismo split entre sus trabajos.
+        """
+        with self.Session() as db:
+            return db.query(TrainingJob).filter(
+                TrainingJob.data_path == data_path,
+                TrainingJob.status.in_([JobStatus.QUEUED, JobStatus.RUNNING]),
+            ).first() is not None
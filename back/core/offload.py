@@ -0,0 +1,136 @@
+import asyncio
+import functools
+import threading
+import time
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+from core.config import settings
+
+
+class Offloader:
+    """
+    Ejecuta el trabajo de CPU de las rutas async (pandas, torch, sklearn) en un pool de threads
+    acotado, para no bloquear el event loop ni los websockets de entrenamiento.
+    Cada ruta tiene un límite de ejecuciones simultáneas; las que exceden el límite esperan
+    su turno sin ocupar threads del pool. Se registran tiempos de espera y de ejecución por ruta.
+    """
+
+    def __init__(self, max_workers, route_limit=None, route_limits=None):
+        """
+        Args:
+            max_workers (int): Threads del pool compartido por todas las rutas.
+            route_limit (int): Ejecuciones simultáneas por ruta, por defecto sin límite propio.
+            route_limits (dict): Límite de rutas específicas, {ruta: límite}.
+        """
+        self.max_workers = max_workers
+        self.route_limit = route_limit
+        self.route_limits = route_limits or {}
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="offload")
+        self._semaphores = weakref.WeakKeyDictionary()
+        self._stats = {}
+        self._lock = threading.Lock()
+
+    def limit(self, name):
+        return self.route_limits.get(name, self.route_limit)
+
+    def _semaphore(self, loop, name):
+        limit = self.limit(name)
+        if limit is None:
+            return None
+        # los semáforos de asyncio pertenecen a un event loop
+        semaphores = self._semaphores.setdefault(loop, {})
+        if name not in semaphores:
+            semaphores[name] = asyncio.Semaphore(limit)
+        return semaphores[name]
+
+    def _route_stats(self, name):
+        if name not in self._stats:
+            self._stats[name] = {
+                "queued": 0,
+                "running": 0,
+                "completed": 0,
+                "failed": 0,
+                "wait_time": 0.0,
+                "max_wait_time": 0.0,
+                "run_time": 0.0,
+            }
+        return self._stats[name]
+
+    async def run(self, name, func, *args, **kwargs):
+        """
+        Ejecuta func(*args, **kwargs) en el pool y espera su resultado sin bloquear el event loop.
+        Las excepciones de func se propagan al llamador.
+        Args:
+            name (str): Ruta a la que se cuenta la ejecución.
+            func (callable): Función bloqueante.
+        """
+        state = {"queued_at": time.perf_counter(), "started": False, "abandoned": False}
+        with self._lock:
+            self._route_stats(name)["queued"] += 1
+        loop = asyncio.get_running_loop()
+        semaphore = self._semaphore(loop, name)
+        call = functools.partial(self._call, name, state, func, args, kwargs)
+        try:
+            if semaphore is None:
+                return await loop.run_in_executor(self.executor, call)
+            async with semaphore:
+                return await loop.run_in_executor(self.executor, call)
+        finally:
+            with self._lock:
+                #cancelada antes de empezar, deja de contarse como en espera
+                if not state["started"]:
+                    state["abandoned"] = True
+                    self._route_stats(name)["queued"] -= 1
+
+    def _call(self, name, state, func, args, kwargs):
+        started = time.perf_counter()
+        wait = started - state["queued_at"]
+        with self._lock:
+            stats = self._route_stats(name)
+            state["started"] = True
+            if not state["abandoned"]:
+                stats["queued"] -= 1
+            stats["running"] += 1
+            stats["wait_time"] += wait
+            stats["max_wait_time"] = max(stats["max_wait_time"], wait)
+        failed = False
+        try:
+            return func(*args, **kwargs)
+        except BaseException:
+            failed = True
+            raise
+        finally:
+            with self._lock:
+                stats["running"] -= 1
+                stats["run_time"] += time.perf_counter() - started
+                stats["failed" if failed else "completed"] += 1
+
+    def stats(self):
+        """
+        Métricas de la cola por ruta: ejecuciones en espera y en curso, terminadas, fallidas
+        y tiempos promedio de espera y de ejecución en segundos.
+        """
+        with self._lock:
+            routes = {}
+            for name, stats in self._stats.items():
+                done = stats["completed"] + stats["failed"]
+                started = done + stats["running"]
+                routes[name] = {
+                    "limit": self.limit(name),
+                    "queued": stats["queued"],
+                    "running": stats["running"],
+                    "completed": stats["completed"],
+                    "failed": stats["failed"],
+                    "avg_wait_time": stats["wait_time"] / started if started else 0.0,
+                    "max_wait_time": stats["max_wait_time"],
+                    "avg_run_time": stats["run_time"] / done if done else 0.0,
+                }
+            return {"max_workers": self.max_workers, "routes": routes}
+
+
+# Pool compartido por las rutas
+offloader = Offloader(
+    settings.OFFLOAD_MAX_WORKERS,
+    route_limit=settings.OFFLOAD_ROUTE_LIMIT,
+    route_limits=settings.OFFLOAD_ROUTE_LIMITS,
+)
@@ -0,0 +1,112 @@
+import asyncio
+import threading
+
+
+class ProgressBus:
+    """
+    Canal de progreso de los entrenamientos basado en eventos.
+
+    Los workers publican desde cualquier thread y cada suscriptor (un websocket) recibe
+    los mensajes en su propia asyncio.Queue, alimentada con loop.call_soon_threadsafe.
+    Solo se publican cambios de estado, y un suscriptor nuevo recibe primero el último
+    estado conocido. Las colas guardan solo el mensaje más reciente, de modo que un
+    cliente lento no acumula progreso obsoleto.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._latest = {}
+        self._subscribers = {}
+        self._stopped = set()
+
+    def publish(self, task_id, msg):
+        """
+        Publica el estado de una tarea. Se puede llamar desde cualquier thread.
+        Args:
+            task_id (str): Id de la tarea.
+            msg (str): Estado de la tarea.
+        """
+        with self._lock:
+            if self._latest.get(task_id) == msg:
+                return
+            self._latest[task_id] = msg
+            subscribers = list(self._subscribers.get(task_id, ()))
+        for loop, queue in subscribers:
+            try:
+                loop.call_soon_threadsafe(self._offer, queue, msg)
+            except RuntimeError:
+                # el loop del suscriptor ya se cerró
+                pass
+
+    @staticmethod
+    def _offer(queue, msg):
+        if queue.full():
+            queue.get_nowait()
+        queue.put_nowait(msg)
+
+    def get(self, task_id, default=None):
+        """
+        Último estado publicado de una tarea.
+        """
+        with self._lock:
+            return self._latest.get(task_id, default)
+
+    def subscribe(self, task_id):
+        """
+        Suscribe al progreso de una tarea, debe llamarse desde el event loop del suscriptor.
+        Returns:
+            asyncio.Queue: Cola con los estados de la tarea, comenzando por el último conocido.
+        """
+        queue = asyncio.Queue(maxsize=1)
+        subscriber = (asyncio.get_running_loop(), queue)
+        with self._lock:
+            self._subscribers.setdefault(task_id, set()).add(subscriber)
+            latest = self._latest.get(task_id)
+        if latest is not None:
+            queue.put_nowait(latest)
+        return queue
+
+    def unsubscribe(self, task_id, queue, discard=False):
+        """
+        Elimina una suscripción.
+        Args:
+            discard (bool): Si es True y no quedan suscriptores se olvida el estado de la tarea.
+        """
+        with self._lock:
+            subscribers = self._subscribers.get(task_id, set())
+            subscribers = {s for s in subscribers if s[1] is not queue}
+            if subscribers:
+                self._subscribers[task_id] = subscribers
+            else:
+                self._subscribers.pop(task_id, None)
+                if discard:
+                    self._latest.pop(task_id, None)
+                    self._stopped.discard(task_id)
+
+    def request_stop(self, task_id, msg=None):
+        """
+        Marca una tarea para detenerse y publica el mensaje de detención, si se entrega.
+        """
+        with self._lock:
+            self._stopped.add(task_id)
+        if msg is not None:
+            self.publish(task_id, msg)
+
+    def finish(self, task_id):
+        """
+        Olvida el estado y la detención de una tarea que terminó, aunque ningún cliente haya
+        recibido el último mensaje. Los suscriptores conectados ya lo tienen en su cola.
+        """
+        with self._lock:
+            self._latest.pop(task_id, None)
+            self._stopped.discard(task_id)
+
+    def stopped(self, task_id):
+        """
+        Indica si se pidió detener la tarea.
+        """
+        with self._lock:
+            return task_id in self._stopped
+
+
+progress_bus = ProgressBus()
@@ -1,3 +1,6 @@
+import threading
+from sqlalchemy import create_engine, event, inspect, text
+from sqlalchemy.engine import make_url
 from sqlalchemy.orm import sessionmaker, declarative_base
 from core.config import Settings
 
@@ -7,9 +10,99 @@ SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
 Base = declarative_base()
 
+# sessionmakers de los workers de entrenamiento, por url (None es la base de datos por defecto)
+_worker_sessionmakers = {}
+_worker_lock = threading.Lock()
+
+
+def enable_sqlite_wal(engine):
+    """
+    Activa el modo WAL en las conexiones SQLite de un engine, para que las lecturas de
+    las requests no esperen a las escrituras de los entrenamientos y viceversa.
+    """
+    if engine.url.get_backend_name() != "sqlite":
+        return engine
+
+    @event.listens_for(engine, "connect")
+    def set_sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute("PRAGMA synchronous=NORMAL")
+        cursor.execute("PRAGMA busy_timeout=5000")
+        cursor.close()
+
+    return engine
+
+
+enable_sqlite_wal(engine)
+
+
+def upgrade_schema(engine, metadata=None):
+    """
+    Agrega a las tablas existentes las columnas de los modelos que todavía no tienen,
+    create_all solo crea las tablas nuevas. Permite abrir una base de datos creada con una
+    versión anterior sin migraciones; las columnas nuevas deben aceptar nulos.
+    Args:
+        engine (Engine): Engine de la base de datos.
+        metadata (MetaData, optional): Tablas esperadas, por defecto las de Base.
+    Returns:
+        list: Columnas agregadas, como "tabla.columna".
+    """
+    metadata = metadata if metadata is not None else Base.metadata
+    inspector = inspect(engine)
+    preparer = engine.dialect.identifier_preparer
+    added = []
+    with engine.begin() as conn:
+        for table in metadata.sorted_tables:
+            if not inspector.has_table(table.name):
+                continue
+            existing = {column["name"] for column in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name in existing:
+                    continue
+                column_type = column.type.compile(dialect=engine.dialect)
+                conn.execute(text(f"ALTER TABLE {preparer.format_table(table)} ADD COLUMN {preparer.format_column(column)} {column_type}"))
+                added.append(f"{table.name}.{column.name}")
+                for index in table.indexes:
+                    if column.name in index.columns:
+                        index.create(conn, checkfirst=True)
+    return added
+
+
 def get_db():
     db = SessionLocal()
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+
+
+def create_worker_engine(database_url=None):
+    """
+    Crea el engine de los workers de entrenamiento, con un pool del tamaño de MAX_WORKERS
+    separado del de las requests. La url se toma de la configuración, no se guarda en los
+    trabajos encolados porque incluye las credenciales.
+    """
+    database_url = database_url or Settings.DATABASE_URL
+    url = make_url(database_url)
+    kwargs = {}
+    if url.get_backend_name() == "sqlite":
+        kwargs["connect_args"] = {"check_same_thread": False}
+    if url.database not in (None, "", ":memory:"):
+        kwargs["pool_size"] = Settings.MAX_WORKERS
+        kwargs["max_overflow"] = Settings.MAX_WORKERS
+        kwargs["pool_pre_ping"] = True
+    return enable_sqlite_wal(create_engine(url, **kwargs))
+
+
+def session_for(database_url=None):
+    """
+    Crea la sesión propia de un trabajo de entrenamiento sobre la base de datos indicada,
+    o la por defecto si es None. Cada trabajo debe cerrar su sesión al terminar.
+    """
+    with _worker_lock:
+        if database_url not in _worker_sessionmakers:
+            worker_engine = create_worker_engine(database_url)
+            _worker_sessionmakers[database_url] = sessionmaker(autocommit=False, autoflush=False, bind=worker_engine)
+        factory = _worker_sessionmakers[database_url]
+    return factory()
@@ -1,5 +1,7 @@
 import ast
 import dill
+import numpy as np
+import pandas as pd
 
 
 class DSParser:
@@ -293,8 +295,148 @@ class DSParser:
 
         # Guardamos el JSON original como atributo oculto
         func._ds_json_condition = json_condition
+        func._ds_columns = list(columns)
         return func
 
+    def build_mask_expr(self, condition, columns):
+        """
+        Construye un nodo AST vectorizado a partir de una condición en JSON.
+        A diferencia de build_expr, el nodo evalúa la condición sobre una matriz
+        completa (filas x columnas) y retorna una máscara booleana por fila.
+
+        :param condition: Condición en formato JSON.
+        :return: Nodo AST representando la máscara.
+        """
+        if isinstance(condition, dict) and 'op' in condition and condition['op'] in ('and', 'or'):
+            # caso de combinación booleana: np.logical_and(a, np.logical_and(b, c))
+            func = 'logical_and' if condition['op'] == 'and' else 'logical_or'
+            values = [self.build_mask_expr(c, columns) for c in condition['values']]
+            return self._reduce_mask(func, values)
+
+        elif isinstance(condition, list):
+            # caso de comparación encadenada: a <= x[:, 0] < b → (a <= x[:, 0]) & (x[:, 0] < b)
+            left = self.build_mask_side(condition[0]['left'], columns)
+            compares = []
+            for c in condition:
+                right = self.build_mask_side(c['right'], columns)
+                compares.append(ast.Compare(left=left, ops=[self.op_inverse_map[c['op']]()], comparators=[right]))
+                left = right
+            return self._reduce_mask('logical_and', compares)
+
+        elif isinstance(condition, dict):
+            # caso simple: {'left': ..., 'op': ..., 'right': ...}
+            return ast.Compare(
+                left=self.build_mask_side(condition['left'], columns),
+                ops=[self.op_inverse_map[condition['op']]()],
+                comparators=[self.build_mask_side(condition['right'], columns)]
+            )
+
+        else:
+            raise ValueError(f"No se puede procesar la condición: {condition}")
+
+    def build_mask_side(self, value, columns):
+        """
+        Construye un lado de una expresión vectorizada. Las referencias a columnas
+        se traducen a x[:, i] para operar sobre la columna completa.
+
+        :param value: Valor en formato JSON.
+        :return: Nodo AST representando el lado de la expresión.
+        """
+        if isinstance(value, dict) and 'op' in value:
+            # Expresión binaria
+            op_class = self.op_inverse_map[value['op']]
+            left = self.build_mask_side(value['left'], columns)
+            right = self.build_mask_side(value['right'], columns)
+            return ast.BinOp(left=left, op=op_class(), right=right)
+        elif isinstance(value, str) and value.startswith('x['):
+            return self._column_node(int(value[2:-1]))
+        elif isinstance(value, str):
+            if value in columns:
+                return self._column_node(columns.index(value))
+            # Nombre de variable
+            return ast.Name(id=value, ctx=ast.Load())
+        else:
+            # Constante (numero, booleano, etc.)
+            return ast.Constant(value=value)
+
+    def _column_node(self, index):
+        """
+        Retorna el nodo AST de x[:, index].
+        """
+        return ast.Subscript(
+            value=ast.Name(id='x', ctx=ast.Load()),
+            slice=ast.Tuple(elts=[ast.Slice(), ast.Constant(value=index)], ctx=ast.Load()),
+            ctx=ast.Load()
+        )
+
+    def _reduce_mask(self, func, values):
+        """
+        Combina una lista de nodos con np.logical_and / np.logical_or.
+        """
+        node = values[0]
+        for value in values[1:]:
+            node = ast.Call(
+                func=ast.Attribute(value=ast.Name(id='np', ctx=ast.Load()), attr=func, ctx=ast.Load()),
+                args=[node, value],
+                keywords=[]
+            )
+        return node
+
+    def mask_input(self, X, columns):
+        """
+        Prepara la entrada de una máscara vectorizada como matriz 2-D.
+        Un DataFrame se reordena según columns, y los valores nulos (None) se tratan
+        como NaN, igual que al evaluar json_to_lambda fila a fila sobre floats: toda
+        comparación con NaN es falsa salvo '!='.
+
+        :param X: Matriz 2-D o DataFrame.
+        :param columns: Columnas con las que se construyó la condición.
+        :return: numpy array 2-D.
+        :raises ValueError: Si el DataFrame no tiene alguna de las columnas.
+        """
+        if isinstance(X, pd.DataFrame):
+            missing = [col for col in columns if col not in X.columns]
+            if missing:
+                raise ValueError(f"Columnas no encontradas: {', '.join(map(str, missing))}")
+            X = X[columns].to_numpy()
+        X = np.asarray(X)
+        if X.dtype == object:
+            X = np.where(pd.isnull(X), np.nan, X)
+            try:
+                X = X.astype(float)
+            except (TypeError, ValueError):
+                pass
+        return X
+
+    def json_to_mask(self, json_condition, columns):
+        """
+        Retorna una función que evalúa la condición en JSON sobre todas las filas
+        de una matriz 2-D o DataFrame en una sola pasada, retornando una máscara
+        booleana. Es el equivalente vectorizado de json_to_lambda.
+        """
+        expr = self.build_mask_expr(json_condition, columns)
+        lambda_func = ast.Lambda(
+            args=ast.arguments(
+                posonlyargs=[], args=[ast.arg(arg='x')], kwonlyargs=[],
+                kw_defaults=[], defaults=[]
+            ),
+            body=expr
+        )
+        mod = ast.Expression(body=lambda_func)
+        ast.fix_missing_locations(mod)
+        compiled = compile(mod, "<string>", mode="eval")
+        func = eval(compiled, {"np": np})
+
+        def mask(X):
+            X = self.mask_input(X, columns)
+            with np.errstate(all='ignore'):
+                result = func(X)
+            # condiciones sin columnas retornan un escalar, se expanden a todas las filas
+            return np.broadcast_to(np.asarray(result, dtype=bool), (len(X),))
+
+        mask._ds_json_condition = json_condition
+        return mask
+
         
 class DSRuleVisitor(ast.NodeVisitor):
     def __init__(self):
@@ -4,10 +4,50 @@ import time
 import numpy as np
 import pandas as pd
 import torch
+from scipy import sparse
 from sklearn.base import ClassifierMixin
 from torch.autograd import Variable
 
 from dsgd.DSModelMultiQ import DSModelMultiQ
+from dsmodels.DSParser import DSParser
+
+
+class IndexBatches:
+    """
+    In-memory mini-batch iterator over row indices and targets, every iteration is one epoch.
+    Batches are slices of contiguous tensors (of a new permutation when shuffling), without the
+    per-sample collate and worker processes of a DataLoader
+    """
+
+    def __init__(self, y, batch_size, shuffle=False, seed=None):
+        """
+        :param y: Target tensor, one row per sample
+        :param batch_size: Rows per batch
+        :param shuffle: Permutes the rows every epoch
+        :param seed: Seed of the permutations
+        """
+        self.y = y
+        self.n = len(y)
+        self.batch_size = batch_size
+        self.shuffle = shuffle
+        self.generator = torch.Generator()
+        if seed is not None:
+            self.generator.manual_seed(seed)
+        else:
+            self.generator.seed()
+
+    def __len__(self):
+        return (self.n + self.batch_size - 1) // self.batch_size
+
+    def __iter__(self):
+        if self.shuffle:
+            order = torch.randperm(self.n, generator=self.generator)
+            y = self.y[order.to(self.y.device)]
+        else:
+            order = torch.arange(self.n)
+            y = self.y
+        for start in range(0, self.n, self.batch_size):
+            yield order[start:start + self.batch_size], y[start:start + self.batch_size]
 
 
 class DSClassifierMultiQ(ClassifierMixin):
@@ -17,7 +57,8 @@ class DSClassifierMultiQ(ClassifierMixin):
 
     def __init__(self, num_classes, lr=0.005, max_iter=200, min_iter=2, min_dloss=0.0001, optim="adam", lossfn="MSE",
                  debug_mode=False, step_debug_mode=False, batch_size=4000, num_workers=1,
-                 precompute_rules=False, device="cpu", force_precompute=False):
+                 precompute_rules=False, device="cpu", force_precompute=False, vectorized=False, shuffle=False,
+                 seed=None):
         """
         Creates the classifier and the DSModel (accesible in attribute model)
         :param lr: Learning rate
@@ -28,6 +69,9 @@ class DSClassifierMultiQ(ClassifierMixin):
         :param debug_mode: Enables debug in training (prtinting and output metrics)
         :param device: [ cpu | cuda | mps ] Device to use by pytorch
         :param force_precompute: Forces precomputation of rules, could use too much RAM
+        :param vectorized: Evaluates the rules once over whole columns and combines masses with tensor ops
+        :param shuffle: Draws the mini-batches from a new permutation of the rows every epoch
+        :param seed: Seed of the batch permutations
         """
         self.k = num_classes
         self.lr = lr
@@ -51,8 +95,19 @@ class DSClassifierMultiQ(ClassifierMixin):
         self.model = DSModelMultiQ(num_classes, precompute_rules=precompute_rules,
                                     device=self.device, force_precompute=force_precompute).to(self.device)
         self.classes_ = [k for k in range(self.k)]
-
-    def fit(self, X, y, add_single_rules=False, single_rules_breaks=2, add_mult_rules=False, column_names=None, **kwargs):
+        self.vectorized = vectorized
+        self.shuffle = shuffle
+        self.seed = seed
+        self._activations = None
+        self._features = None
+        self._validation = None
+        self.best_epoch_ = None
+        # Per epoch training curve: loss, epoch_time and, in debug modes, forward/backward/optim/norm timings
+        self.history_ = {"loss": [], "epoch_time": []}
+
+    def fit(self, X, y, add_single_rules=False, single_rules_breaks=2, add_mult_rules=False, column_names=None,
+            validation_data=None, patience=None, validation_every=1, activations=None, validation_activations=None,
+            **kwargs):
         """
         Fits the model masses using gradient descent optimization
         :param X: Features for training
@@ -60,6 +115,13 @@ class DSClassifierMultiQ(ClassifierMixin):
         :param add_single_rules: Generates single rules
         :param single_rules_breaks: Single rule breaks number
         :param add_mult_rules: Generates multiplication pair rules
+        :param validation_data: Optional (X_val, y_val) evaluated during training, the masses with the lowest
+        validation loss are restored when the optimization ends
+        :param patience: Validations without improvement before stopping early (None disables early stopping)
+        :param validation_every: Epochs between validations
+        :param activations: Precomputed rule activation matrix of X (see rule_activation_matrix), only used
+        when vectorized
+        :param validation_activations: Precomputed rule activation matrix of the validation features
         :param kwargs: In case of debugging, parameters of optimize_debug
         """
         # if self.balance_class_data:
@@ -90,8 +152,14 @@ class DSClassifierMultiQ(ClassifierMixin):
         else:
             raise RuntimeError("Unknown loss function %s" % self.lossfn)
 
-        # Add index to X
-        X = np.insert(X, 0, values=np.arange(0, len(X)), axis=1)
+        # Batches only carry row indices, X is never copied to add an index column
+        if self.vectorized:
+            # Rules are evaluated once over the whole dataset
+            self._activations = self.rule_activation_matrix(X) if activations is None else sparse.csr_matrix(activations)
+        else:
+            # The indexed features the model expects are built per batch
+            self._features = self._feature_tensor(X)
+        self._start_validation(validation_data, patience, validation_every, validation_activations)
 
         if self.step_debug_mode:
             return self._optimize_debug_step(X, y, optimizer, criterion, **kwargs)
@@ -102,25 +170,24 @@ class DSClassifierMultiQ(ClassifierMixin):
 
     def _optimize(self, X, y, optimizer, criterion):
         losses = []
+        self.history_ = {"loss": losses, "epoch_time": []}
         self.model.train()
         self.model.clear_rmap()
 
-        Xt = Variable(torch.Tensor(X).to(self.device))
         if self.lossfn == "CE":
             yt = Variable(torch.LongTensor(y).to(self.device))
         else:
             yt = torch.nn.functional.one_hot(torch.LongTensor(y).to(self.device), self.k).float()
 
-        dataset = torch.utils.data.TensorDataset(Xt, yt)
-        N = len(dataset)
-        train_loader = torch.utils.data.DataLoader(dataset, batch_size=self.batch_size, shuffle=False,
-                                                   num_workers=self.num_workers, pin_memory=False)
+        N = len(X)
+        train_loader = IndexBatches(yt, self.batch_size, shuffle=self.shuffle, seed=self.seed)
         epoch = 0
         for epoch in range(self.max_iter):
             acc_loss = 0
+            t_epoch = time.time()
             for Xi, yi in train_loader:
                 optimizer.zero_grad()
-                y_pred = self.model.forward(Xi)
+                y_pred = self._forward(Xi)
                 loss = criterion(y_pred, yi)
                 loss.backward(retain_graph=True)
                 optimizer.step()
@@ -128,15 +195,22 @@ class DSClassifierMultiQ(ClassifierMixin):
                 acc_loss += loss.data.item() * len(yi) / N
 
             losses.append(acc_loss)
+            self._record_epoch(time.time() - t_epoch)
+            if self._validate(epoch, criterion):
+                break
             if epoch > self.min_iter and losses[-2] - acc_loss < self.min_dJ:
                 break
 
+        self._end_validation()
+        self._activations = None
+        self._features = None
         return losses, epoch
 
     def _optimize_debug(self, X, y, optimizer, criterion, print_init_model=False, print_final_model=False, print_time=True,
                         print_partial_time=False, print_every_epochs=None, print_least_loss=True, return_partial_dt=False,
                         disable_all_print=False, print_epoch_progress=False):
         losses = []
+        self.history_ = {"loss": losses, "epoch_time": []}
         yield "Optimization started"
 
         if disable_all_print:
@@ -158,77 +232,86 @@ class DSClassifierMultiQ(ClassifierMixin):
 
         self.model.train()
         self.model.clear_rmap()
-        Xt = Variable(torch.Tensor(X).to(self.device))
         if self.lossfn == "CE":
             yt = Variable(torch.LongTensor(y).to(self.device))
         else:
             yt = torch.nn.functional.one_hot(torch.LongTensor(y).to(self.device), self.k).float()
 
-        dataset = torch.utils.data.TensorDataset(Xt, yt)
-        N = len(dataset)
-        train_loader = torch.utils.data.DataLoader(dataset, batch_size=self.batch_size, shuffle=False,
-                                                   num_workers=self.num_workers, pin_memory=False)
+        N = len(X)
+        train_loader = IndexBatches(yt, self.batch_size, shuffle=self.shuffle, seed=self.seed)
 
         epoch = 0
         since = time.time()
-        for epoch in range(self.max_iter):
-            if print_every_epochs is not None and epoch % print_every_epochs == 0:
-                data = {
-                    "epoch": epoch + 1,
-                    "max": self.max_iter,
-                    "loss": losses[-1] if losses else 0,
-                    "time": time.time() - since,
-                    "eta": (time.time() - since)/ (epoch) * self.max_iter if epoch > 0 else 0,
-                    "status": "training"
-                }
-                yield json.dumps(data)
-                #yield f"{epoch + 1} {self.max_iter} {losses[-1] if losses else 0} {time.time() - since:.4f} {(time.time() - since)/ (epoch + 1) * self.max_iter:.4f}"
-            acc_loss = 0
-            if print_epoch_progress:
-                acc_n = 0
-
-            for Xi, yi in train_loader:
-                # with torch.autograd.detect_anomaly():
-                ni = len(yi)
+        try:
+            for epoch in range(self.max_iter):
+                if print_every_epochs is not None and epoch % print_every_epochs == 0:
+                    data = {
+                        "epoch": epoch + 1,
+                        "max": self.max_iter,
+                        "loss": losses[-1] if losses else 0,
+                        "time": time.time() - since,
+                        "eta": (time.time() - since)/ (epoch) * self.max_iter if epoch > 0 else 0,
+                        "status": "training"
+                    }
+                    yield json.dumps(data)
+                    #yield f"{epoch + 1} {self.max_iter} {losses[-1] if losses else 0} {time.time() - since:.4f} {(time.time() - since)/ (epoch + 1) * self.max_iter:.4f}"
+                acc_loss = 0
+                t_epoch = time.time()
+                phases = (dt_forward, dt_loss, dt_optim, dt_norm)
                 if print_epoch_progress:
-                    acc_n += ni
-                    yield ("\r %d%% [" % (100*acc_n/N)) + "#"*int(25*acc_n/N) + " "*int(25 - 25*acc_n/N) + "]"
-                tq = time.time()
-                optimizer.zero_grad()
-                y_pred = self.model.forward(Xi)
-                # self.model.check_nan("after forward")
-                dt_forward += time.time() - tq
-
-                tq = time.time()
-                loss = criterion(y_pred, yi)
-                # self.model.check_nan("after loss computation")
-                if np.isnan(loss.data.item()) or not np.isfinite(loss.data.item()):
-                    yield self.model
-                    yield y_pred
-                    yield yi
-                    yield loss
-                    raise RuntimeError("Loss is NaN or Infinity")
-
-                loss.backward(retain_graph=True)
-                # self.model.check_nan("after backward")
-                dt_loss += time.time() - tq
-
-                tq = time.time()
-                optimizer.step()
-                # self.model.check_nan("after optimizer step")
-                dt_optim += time.time() - tq
-
-                tq = time.time()
-                self.model.normalize()
-                # self.model.check_nan("after normalize")
-                dt_norm += time.time() - tq
-
-                acc_loss += loss.data.item() * ni / N
-
-            losses.append(acc_loss)
-            if epoch > self.min_iter and losses[-2] - acc_loss < self.min_dJ:
-                break
-
+                    acc_n = 0
+
+                for Xi, yi in train_loader:
+                    # with torch.autograd.detect_anomaly():
+                    ni = len(yi)
+                    if print_epoch_progress:
+                        acc_n += ni
+                        yield ("\r %d%% [" % (100*acc_n/N)) + "#"*int(25*acc_n/N) + " "*int(25 - 25*acc_n/N) + "]"
+                    tq = time.time()
+                    optimizer.zero_grad()
+                    y_pred = self._forward(Xi)
+                    # self.model.check_nan("after forward")
+                    dt_forward += time.time() - tq
+
+                    tq = time.time()
+                    loss = criterion(y_pred, yi)
+                    # self.model.check_nan("after loss computation")
+                    if np.isnan(loss.data.item()) or not np.isfinite(loss.data.item()):
+                        yield self.model
+                        yield y_pred
+                        yield yi
+                        yield loss
+                        raise RuntimeError("Loss is NaN or Infinity")
+
+                    loss.backward(retain_graph=True)
+                    # self.model.check_nan("after backward")
+                    dt_loss += time.time() - tq
+
+                    tq = time.time()
+                    optimizer.step()
+                    # self.model.check_nan("after optimizer step")
+                    dt_optim += time.time() - tq
+
+                    tq = time.time()
+                    self.model.normalize()
+                    # self.model.check_nan("after normalize")
+                    dt_norm += time.time() - tq
+
+                    acc_loss += loss.data.item() * ni / N
+
+                losses.append(acc_loss)
+                self._record_epoch(time.time() - t_epoch, dt_forward - phases[0], dt_loss - phases[1],
+                                   dt_optim - phases[2], dt_norm - phases[3])
+                if self._validate(epoch, criterion):
+                    break
+                if epoch > self.min_iter and losses[-2] - acc_loss < self.min_dJ:
+                    break
+        finally:
+            # Also runs when the caller stops consuming the generator, e.g. a training stopped by the
+            # user, so the masses with the lowest validation loss are restored in every case
+            self._end_validation()
+            self._activations = None
+            self._features = None
         dt = time.time() - ti
         if print_time:
             yield"\nTraining time: %.2fs, epochs: %d" % (dt, epoch + 1)
@@ -254,6 +337,7 @@ class DSClassifierMultiQ(ClassifierMixin):
 
     def _optimize_debug_step(self, X, y, optimizer, criterion):
         losses = []
+        self.history_ = {"loss": losses, "epoch_time": []}
         masses = []
         yield "Optimization started"
 
@@ -276,73 +360,82 @@ class DSClassifierMultiQ(ClassifierMixin):
 
         self.model.train()
         self.model.clear_rmap()
-        Xt = Variable(torch.Tensor(X).to(self.device))
         if self.lossfn == "CE":
             yt = Variable(torch.LongTensor(y).to(self.device))
         else:
             yt = torch.nn.functional.one_hot(torch.LongTensor(y).to(self.device), self.k).float()
 
-        dataset = torch.utils.data.TensorDataset(Xt, yt)
-        N = len(dataset)
-        train_loader = torch.utils.data.DataLoader(dataset, batch_size=self.batch_size, shuffle=False,
-                                                   num_workers=self.num_workers, pin_memory=False)
+        N = len(X)
+        train_loader = IndexBatches(yt, self.batch_size, shuffle=self.shuffle, seed=self.seed)
 
         epoch = 0
-        for epoch in range(self.max_iter):
-            if print_every_epochs is not None and epoch % print_every_epochs == 0:
-                yield "\rProcessing epoch\t%d\t%.4f\t" % (epoch + 1, losses[-1] if len(losses) > 0 else 1)
-            acc_loss = 0
-            if print_epoch_progress:
-                acc_n = 0
-                yield ""
-            for Xi, yi in train_loader:
-                # with torch.autograd.detect_anomaly():
-                m = []
-                for mi in self.model.parameters():
-                    m.append(mi.detach().tolist())
-                masses.append(m)
-
-                ni = len(yi)
+        try:
+            for epoch in range(self.max_iter):
+                if print_every_epochs is not None and epoch % print_every_epochs == 0:
+                    yield "\rProcessing epoch\t%d\t%.4f\t" % (epoch + 1, losses[-1] if len(losses) > 0 else 1)
+                acc_loss = 0
+                t_epoch = time.time()
+                phases = (dt_forward, dt_loss, dt_optim, dt_norm)
                 if print_epoch_progress:
-                    acc_n += ni
-                    yield ("\r %d%% [" % (100*acc_n/N)) + "#"*int(25*acc_n/N) + " "*int(25 - 25*acc_n/N) + "]"
-                tq = time.time()
-                optimizer.zero_grad()
-                y_pred = self.model.forward(Xi)
-                # self.model.check_nan("after forward")
-                dt_forward += time.time() - tq
-
-                tq = time.time()
-                loss = criterion(y_pred, yi)
-                # self.model.check_nan("after loss computation")
-                if np.isnan(loss.data.item()) or not np.isfinite(loss.data.item()):
-                    yield self.model
-                    yield y_pred
-                    yield yi
-                    yield loss
-                    raise RuntimeError("Loss is NaN or Infinity")
-
-                loss.backward(retain_graph=True)
-                # self.model.check_nan("after backward")
-                dt_loss += time.time() - tq
-
-                tq = time.time()
-                optimizer.step()
-                # self.model.check_nan("after optimizer step")
-                dt_optim += time.time() - tq
-
-                tq = time.time()
-                self.model.normalize()
-
-                # self.model.check_nan("after normalize")
-                dt_norm += time.time() - tq
-
-                acc_loss += loss.data.item() * ni / N
-
-            losses.append(acc_loss)
-            if epoch > self.min_iter and losses[-2] - acc_loss < self.min_dJ:
-                break
-
+                    acc_n = 0
+                    yield ""
+                for Xi, yi in train_loader:
+                    # with torch.autograd.detect_anomaly():
+                    m = []
+                    for mi in self.model.parameters():
+                        m.append(mi.detach().tolist())
+                    masses.append(m)
+
+                    ni = len(yi)
+                    if print_epoch_progress:
+                        acc_n += ni
+                        yield ("\r %d%% [" % (100*acc_n/N)) + "#"*int(25*acc_n/N) + " "*int(25 - 25*acc_n/N) + "]"
+                    tq = time.time()
+                    optimizer.zero_grad()
+                    y_pred = self._forward(Xi)
+                    # self.model.check_nan("after forward")
+                    dt_forward += time.time() - tq
+
+                    tq = time.time()
+                    loss = criterion(y_pred, yi)
+                    # self.model.check_nan("after loss computation")
+                    if np.isnan(loss.data.item()) or not np.isfinite(loss.data.item()):
+                        yield self.model
+                        yield y_pred
+                        yield yi
+                        yield loss
+                        raise RuntimeError("Loss is NaN or Infinity")
+
+                    loss.backward(retain_graph=True)
+                    # self.model.check_nan("after backward")
+                    dt_loss += time.time() - tq
+
+                    tq = time.time()
+                    optimizer.step()
+                    # self.model.check_nan("after optimizer step")
+                    dt_optim += time.time() - tq
+
+                    tq = time.time()
+                    self.model.normalize()
+
+                    # self.model.check_nan("after normalize")
+                    dt_norm += time.time() - tq
+
+                    acc_loss += loss.data.item() * ni / N
+
+                losses.append(acc_loss)
+                self._record_epoch(time.time() - t_epoch, dt_forward - phases[0], dt_loss - phases[1],
+                                   dt_optim - phases[2], dt_norm - phases[3])
+                if self._validate(epoch, criterion):
+                    break
+                if epoch > self.min_iter and losses[-2] - acc_loss < self.min_dJ:
+                    break
+        finally:
+            # Also runs when the caller stops consuming the generator, e.g. a training stopped by the
+            # user, so the masses with the lowest validation loss are restored in every case
+            self._end_validation()
+            self._activations = None
+            self._features = None
         dt = time.time() - ti
         if print_time:
             yield "\nTraining time: %.2fs, epochs: %d" % (dt, epoch + 1)
@@ -373,14 +466,18 @@ class DSClassifierMultiQ(ClassifierMixin):
         self.model.clear_rmap()
         if "values" in dir(X):
             X = X.values
-        X = np.insert(X, 0, values=np.arange(0, len(X)), axis=1)
 
         with torch.no_grad():
-            Xt = torch.Tensor(X).to(self.device)
+            if self.vectorized:
+                y_score = self._combine(self._dense_activations(self.rule_activation_matrix(X)))
+            else:
+                features = self._feature_tensor(X)
+                y_score = torch.cat([self.model(self._indexed_batch(idx, features))
+                                     for idx in torch.split(torch.arange(len(X)), self.batch_size)])
             if one_hot:
-                return self.model(Xt).cpu().numpy()
+                return y_score.cpu().numpy()
             else:
-                _, yt_pred = torch.max(self.model(Xt), 1)
+                _, yt_pred = torch.max(y_score, 1)
                 yt_pred = yt_pred.cpu().numpy()
                 return yt_pred
 
@@ -419,6 +516,208 @@ class DSClassifierMultiQ(ClassifierMixin):
 
         return pred, cls, df_rls, builder
 
+    def predict_explain_batch(self, X):
+        """
+        Predict the score of belonging to each class for a whole batch in a single forward pass and
+        explain every decision with the rules that apply to the row, as predict_explain does
+        :param X: Feature vectors
+        :return: Class scores, predicted classes and, for each row, a list of records with the
+        applied rules and their masses ordered by the mass of the predicted class
+        """
+        self.model.eval()
+        if "values" in dir(X):
+            X = X.values
+        activations = self.rule_activation_matrix(X)
+        with torch.no_grad():
+            preds = self._combine(self._dense_activations(activations)).cpu().numpy()
+            masses = torch.stack(list(self.model._params)).view(-1, self.k + 1).cpu().numpy()
+        classes = np.argmax(preds, axis=1)
+
+        cols = [str(i) for i in range(self.k)] + ["uncertainty"]
+        captions = [str(p) for p in self.model.preds]
+        explanations = []
+        for i in range(len(classes)):
+            sel = activations.indices[activations.indptr[i]:activations.indptr[i + 1]]
+            sel = sel[np.argsort(masses[sel, classes[i]], kind="stable")][::-1]
+            rows = []
+            for j in sel:
+                row = {"rule": captions[j]}
+                row.update(zip(cols, masses[j].tolist()))
+                rows.append(row)
+            explanations.append(rows)
+
+        return preds, classes, explanations
+
+    def rule_activation_matrix(self, X):
+        """
+        Evaluates every rule of the model over all the rows of X at once
+        :param X: Feature vectors (without index column)
+        :return: Sparse boolean matrix (rows x rules), True where the rule applies to the row
+        """
+        X = np.asarray(X)
+        rows = []
+        cols = []
+        for j, pred in enumerate(self.model.preds):
+            active = np.flatnonzero(self._rule_mask(pred, X))
+            rows.append(active)
+            cols.append(np.full(len(active), j))
+        n_rules = len(self.model.preds)
+        rows = np.concatenate(rows) if rows else np.zeros(0, dtype=int)
+        cols = np.concatenate(cols) if cols else np.zeros(0, dtype=int)
+        return sparse.csr_matrix((np.ones(len(rows), dtype=bool), (rows, cols)), shape=(len(X), n_rules))
+
+    def _rule_mask(self, pred, X):
+        """
+        Boolean mask of the rows of X where a single rule applies
+        """
+        ld = pred.ld
+        if hasattr(ld, "_ds_json_condition") and hasattr(ld, "_ds_columns"):
+            return DSParser().json_to_mask(ld._ds_json_condition, ld._ds_columns)(X)
+        try:
+            # Rules generated by DSGD index x[i], over X.T every x[i] is a whole column
+            mask = np.asarray(pred(X.T))
+            if mask.dtype == bool and mask.shape == (len(X),):
+                return mask
+        except Exception:
+            pass
+        return np.fromiter((bool(pred(x)) for x in X), dtype=bool, count=len(X))
+
+    def _start_validation(self, validation_data, patience, validation_every, activations=None):
+        """
+        Prepares the validation split, its rules are evaluated once like the training data
+        """
+        self._validation = None
+        self.best_epoch_ = None
+        if validation_data is None:
+            return
+        X_val, y_val = validation_data
+        if "values" in dir(X_val):
+            X_val = X_val.values
+        if self.lossfn == "CE":
+            yv = torch.LongTensor(np.asarray(y_val)).to(self.device)
+        else:
+            yv = torch.nn.functional.one_hot(torch.LongTensor(np.asarray(y_val)).to(self.device), self.k).float()
+        self._validation = {
+            "activations": (self.rule_activation_matrix(X_val) if activations is None else sparse.csr_matrix(activations))
+            if self.vectorized else None,
+            "features": None if self.vectorized else self._feature_tensor(X_val),
+            "y": yv,
+            "patience": patience,
+            "every": max(1, int(validation_every)),
+            "best_loss": float("inf"),
+            "best_masses": None,
+            "bad": 0,
+        }
+
+    def _validation_scores(self):
+        """
+        Class scores of the validation split, computed in batches
+        """
+        v = self._validation
+        if v["activations"] is not None:
+            A = v["activations"]
+            return torch.cat([self._combine(self._dense_activations(A[i:i + self.batch_size]))
+                              for i in range(0, A.shape[0], self.batch_size)])
+        # rule maps are cached by row index, validation rows must not reuse the training ones
+        self.model.clear_rmap()
+        idx = torch.arange(len(v["features"]))
+        y_score = torch.cat([self.model(self._indexed_batch(chunk, v["features"]))
+                             for chunk in torch.split(idx, self.batch_size)])
+        self.model.clear_rmap()
+        return y_score
+
+    def _validate(self, epoch, criterion):
+        """
+        Evaluates the validation split every validation_every epochs, keeping a snapshot of the masses
+        with the lowest validation loss
+        :return: True when the validation loss did not improve for patience validations
+        """
+        v = self._validation
+        if v is None or (epoch + 1) % v["every"] != 0:
+            return False
+        self.model.eval()
+        with torch.no_grad():
+            loss = criterion(self._validation_scores(), v["y"]).item()
+        self.model.train()
+        self.history_.setdefault("val_epoch", []).append(epoch)
+        self.history_.setdefault("val_loss", []).append(loss)
+        if loss < v["best_loss"]:
+            v["best_loss"] = loss
+            v["bad"] = 0
+            v["best_masses"] = [p.detach().clone() for p in self.model.parameters()]
+            self.best_epoch_ = epoch
+            return False
+        v["bad"] += 1
+        return v["patience"] is not None and v["bad"] >= v["patience"] and epoch > self.min_iter
+
+    def _end_validation(self):
+        """
+        Restores the masses with the lowest validation loss
+        """
+        v = self._validation
+        self._validation = None
+        if v is None or v["best_masses"] is None:
+            return
+        with torch.no_grad():
+            for p, best in zip(self.model.parameters(), v["best_masses"]):
+                p.copy_(best)
+
+    def _record_epoch(self, epoch_time, forward=None, backward=None, optim=None, norm=None):
+        """
+        Appends the timings of the last epoch to history_, phase timings are only measured in debug modes
+        """
+        self.history_["epoch_time"].append(epoch_time)
+        for key, value in (("forward", forward), ("backward", backward), ("optim", optim), ("norm", norm)):
+            if value is not None:
+                self.history_.setdefault(key, []).append(value)
+
+    @staticmethod
+    def _feature_tensor(X):
+        """
+        Tensor view of the features, sharing memory with X when it is a numpy array
+        """
+        return torch.from_numpy(np.asarray(X))
+
+    def _indexed_batch(self, idx, features):
+        """
+        Batch in the layout expected by DSModelMultiQ.forward, the row index followed by the features.
+        Only the rows of the batch are copied, in float64 so indices stay exact for any dataset size
+        :param idx: LongTensor with the row indices of the batch
+        :param features: Tensor with the features of all the rows
+        """
+        Xb = features[idx].to(torch.float64)
+        return torch.cat([idx.to(torch.float64).unsqueeze(1), Xb], dim=1).to(self.device)
+
+    def _dense_activations(self, activations):
+        """
+        Converts a block of the sparse activation matrix into a float tensor on the model device
+        """
+        return torch.from_numpy(activations.toarray()).to(self.device, dtype=torch.float32)
+
+    def _forward(self, Xi):
+        """
+        Forward of a training batch of row indices, using the precomputed activation matrix when available
+        """
+        if self._activations is None:
+            return self.model.forward(self._indexed_batch(Xi, self._features))
+        return self._combine(self._dense_activations(self._activations[Xi.cpu().numpy()]))
+
+    def _combine(self, A):
+        """
+        Dempster combination of the active rules of every row. The combined commonality of each
+        class is the product of the commonalities (m_class + m_uncertainty) of the active rules,
+        computed for the whole batch as a single matrix product in log space. It gives the same scores as
+        DSModelMultiQ.forward: a row with no active rule has a product of ones and gets the uniform
+        distribution there too. Commonalities are clamped to 1e-12 before the log, so a class with a zero
+        commonality gets a negligible score instead of an exact 0
+        :param A: Float tensor (rows x rules) with 1 where the rule applies
+        :return: Normalized class scores for each row
+        """
+        ms = torch.stack(list(self.model._params)).view(-1, self.k + 1)
+        qs = ms[:, :-1] + ms[:, -1].view(-1, 1)
+        log_q = torch.log(torch.clamp(qs, min=1e-12))
+        return torch.softmax(A @ log_q, dim=1)
+
     def print_most_important_rules(self, classes=None, threshold=0.2):
         return self.model.print_most_important_rules(classes, threshold)
 
@@ -0,0 +1,120 @@
+import numpy as np
+from sklearn.metrics import roc_auc_score
+from sklearn.preprocessing import label_binarize
+
+
+def confusion(y_true, y_pred):
+    """
+    Matriz de confusión en una sola pasada sobre las etiquetas.
+    Las clases son las presentes en y_true o y_pred, ordenadas, igual que en sklearn.
+    Returns:
+        tuple: (clases, matriz de confusión con filas reales y columnas predichas)
+    """
+    y_true = np.asarray(y_true)
+    y_pred = np.asarray(y_pred)
+    labels, encoded = np.unique(np.concatenate([y_true, y_pred]), return_inverse=True)
+    k = len(labels)
+    true_idx, pred_idx = encoded[:len(y_true)], encoded[len(y_true):]
+    matrix = np.bincount(true_idx * k + pred_idx, minlength=k * k).reshape(k, k)
+    return labels, matrix
+
+
+def report_from_confusion(labels, matrix):
+    """
+    Métricas por clase y promedios derivados de la matriz de confusión, con el formato de
+    classification_report(output_dict=True). Las divisiones por cero valen 0.
+    """
+    tp = np.diag(matrix).astype(float)
+    support = matrix.sum(axis=1)
+    predicted = matrix.sum(axis=0)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        precision = np.where(predicted > 0, tp / predicted, 0.0)
+        recall = np.where(support > 0, tp / support, 0.0)
+        # 2tp / (2tp + fp + fn), sin indefinición cuando la clase aparece
+        f1 = np.where(predicted + support > 0, 2 * tp / (predicted + support), 0.0)
+    total = float(support.sum())
+    report = {}
+    for i, label in enumerate(labels):
+        report["%s" % label] = {
+            "precision": float(precision[i]),
+            "recall": float(recall[i]),
+            "f1-score": float(f1[i]),
+            "support": float(support[i]),
+        }
+    report["accuracy"] = float(tp.sum() / total) if total else 0.0
+    report["macro avg"] = {
+        "precision": float(precision.mean()),
+        "recall": float(recall.mean()),
+        "f1-score": float(f1.mean()),
+        "support": total,
+    }
+    weights = support / total if total else np.zeros(len(labels))
+    report["weighted avg"] = {
+        "precision": float(precision @ weights),
+        "recall": float(recall @ weights),
+        "f1-score": float(f1 @ weights),
+        "support": total,
+    }
+    return report
+
+
+def roc_auc(y_true, y_proba, label_to_num):
+    """
+    ROC AUC a partir de la matriz de probabilidades, one-vs-rest con promedio macro
+    si hay más de 2 clases.
+    """
+    classes = list(label_to_num.values())
+    if len(classes) > 2:
+        y_true_bin = label_binarize(y_true, classes=classes)
+        return roc_auc_score(y_true_bin, y_proba, average='macro', multi_class='ovr')
+    # Para clasificación binaria se usa la probabilidad de la clase positiva (columna 1)
+    y_true_bin = label_binarize(y_true, classes=classes).ravel()
+    return roc_auc_score(y_true_bin, y_proba[:, 1])
+
+
+def evaluate_model(ds, X_test, y_test, label_to_num, n_classes):
+    """
+    Evalúa un modelo sobre el conjunto de prueba con una sola pasada del modelo.
+    Las predicciones salen de la matriz de probabilidades y todas las métricas de una
+    única matriz de confusión.
+    Args:
+        ds (DSClassifierMultiQ): Modelo entrenado.
+        X_test (np.ndarray): Features de prueba.
+        y_test (np.ndarray | pd.Series): Etiquetas de prueba.
+        label_to_num (dict): Mapeo de etiquetas a clases.
+        n_classes (int): Número de clases.
+    Returns:
+        tuple: (métricas con los nombres de las columnas de Iteration, predicciones)
+    """
+    y_proba = ds.predict_proba(X_test)
+    y_pred = np.argmax(y_proba, axis=1)
+    y_test = np.asarray(y_test)
+    try:
+        labels, matrix = confusion(y_test, y_pred)
+        report = report_from_confusion(labels, matrix)
+        metrics = {
+            "accuracy": report["accuracy"],
+            "precision": report["weighted avg"]["precision"],
+            "recall": report["weighted avg"]["recall"],
+            "f1_score": report["weighted avg"]["f1-score"],
+            "confusion_matrix": matrix.tolist(),
+            "classification_report": report,
+        }
+    except Exception as e:
+        print(f"Error calculating metrics: {e}")
+        metrics = {
+            "accuracy": 0.0,
+            "precision": 0.0,
+            "recall": 0.0,
+            "f1_score": 0.0,
+            "confusion_matrix": np.zeros((n_classes, n_classes)).tolist(),
+            "classification_report": {},
+        }
+    try:
+        metrics["roc_auc"] = roc_auc(y_test, y_proba, label_to_num)
+    except Exception as e:
+        print("--------------------------------")
+        print(f"Error calculating ROC AUC: {e}")
+        print("--------------------------------")
+        metrics["roc_auc"] = 0.0
+    return metrics, y_pred
@@ -0,0 +1,71 @@
+import time
+
+
+class ProgressRecorder:
+    """
+    Persiste el progreso de un entrenamiento en su iteración agrupando las escrituras.
+
+    Los mensajes de cada época se acumulan en memoria y se escriben en la base de datos
+    cada flush_seconds segundos o cada flush_epochs épocas (0 desactiva ese criterio),
+    junto con la curva de entrenamiento como un solo arreglo por métrica. flush escribe
+    siempre el último estado, y debe llamarse al terminar el entrenamiento.
+
+    Atributos:
+        db (Session): Sesión de base de datos del entrenamiento.
+        iteration (Iteration): Iteración que se está entrenando.
+        flush_seconds (float): Intervalo mínimo entre escrituras.
+        flush_epochs (int): Cantidad de épocas entre escrituras.
+    """
+
+    def __init__(self, db, iteration, flush_seconds=2.0, flush_epochs=0, clock=time.monotonic):
+        self.db = db
+        self.iteration = iteration
+        self.flush_seconds = flush_seconds
+        self.flush_epochs = flush_epochs
+        self.clock = clock
+        self.message = None
+        self.curve = None
+        self._pending = False
+        self._last_flush = clock()
+        self._epochs_at_flush = 0
+
+    def record(self, msg, curve=None):
+        """
+        Registra un mensaje de progreso y escribe si corresponde.
+        Args:
+            msg (str): Mensaje de progreso.
+            curve (dict): Curva de entrenamiento, arreglos por métrica ({"loss": [...]}).
+        """
+        self.message = msg
+        if curve is not None:
+            self.curve = curve
+        self._pending = True
+        epochs = self._epochs()
+        due = self.clock() - self._last_flush >= self.flush_seconds
+        if self.flush_epochs and epochs - self._epochs_at_flush >= self.flush_epochs:
+            due = True
+        if due:
+            self.flush()
+
+    def flush(self, curve=None):
+        """
+        Escribe el último estado registrado en la iteración.
+        """
+        if curve is not None:
+            self.curve = curve
+            self._pending = True
+        if self._pending:
+            if self.message is not None:
+                self.iteration.training_message = self.message
+            if self.curve is not None:
+                # copia para que SQLAlchemy detecte el cambio en la columna JSON
+                self.iteration.training_curve = {key: list(values) for key, values in self.curve.items()}
+        self.db.commit()
+        self._pending = False
+        self._last_flush = self.clock()
+        self._epochs_at_flush = self._epochs()
+
+    def _epochs(self):
+        if not self.curve or "loss" not in self.curve:
+            return 0
+        return len(self.curve["loss"])
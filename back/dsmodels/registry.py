@@ -0,0 +1,20 @@
+from core.config import settings
+from dsmodels import classifier
+from utils.modelRegistry import ModelRegistry
+
+
+def load_model(model_path, n_classes):
+    """
+    Carga un DSClassifierMultiQ desde el binario de reglas guardado.
+    """
+    model = classifier.DSClassifierMultiQ(num_classes=n_classes)
+    model.model.load_rules_bin(model_path)
+    return model
+
+
+# Registro compartido por las rutas que usan modelos entrenados
+model_registry = ModelRegistry(
+    load_model,
+    max_models=settings.MODEL_CACHE_MAX_MODELS,
+    max_bytes=settings.MODEL_CACHE_MAX_BYTES
+)
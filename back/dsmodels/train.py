@@ -1,21 +1,173 @@
 import json
+import os
 import numpy as np
 import pandas as pd
-from sklearn.metrics import accuracy_score, confusion_matrix, f1_score, precision_score, recall_score, classification_report, roc_auc_score
-from sklearn.preprocessing import label_binarize
+from sklearn.model_selection import train_test_split
 from models.iteration import Iteration, Status
 from dsmodels import classifier, DSParser
+from dsmodels.evaluation import evaluate_model, confusion, report_from_confusion
+from dsmodels.recorder import ProgressRecorder
+from dsmodels.registry import load_model
 from core.config import settings
+from core.executor import LocalProgress
+from core.progressBus import progress_bus
+from utils.trainingData import load_split, as_float_matrix, load_activations, save_activations, load_folds
+from database import session_for
+from utils.sanitize import sanitize_json
 from dsgd import DSRule
 from sqlalchemy.orm import Session
 from datetime import datetime
 
 
+def rule_key(json_condition):
+    """
+    Clave de una regla a partir de su condición JSON, independiente del orden de las llaves.
+    """
+    return json.dumps(json_condition, sort_keys=True)
+
+
+def warm_start_masses(model_path, n_classes, rules, previous_rules=None):
+    """
+    Masas iniciales para continuar el entrenamiento de una iteración anterior.
+    Las reglas se emparejan por su condición JSON: una regla que ya estaba en el modelo parte
+    de su masa entrenada, salvo que la masa enviada haya cambiado respecto de la enviada en la
+    iteración anterior. Las reglas nuevas o modificadas usan la masa enviada.
+    Args:
+        model_path (str): Modelo de la iteración anterior.
+        n_classes (int): Número de clases.
+        rules (list): Reglas a entrenar, tuplas (condición, masa, etiqueta).
+        previous_rules (list): Reglas enviadas en la iteración anterior, tuplas (condición, masa, etiqueta).
+    Returns:
+        list: Por cada regla la masa entrenada a usar, o None si se usa la masa enviada.
+    """
+    model = load_model(model_path, n_classes)
+    trained = {}
+    for pred, mass in zip(model.model.preds, model.model._params):
+        condition = getattr(pred.ld, "_ds_json_condition", None)
+        if condition is not None:
+            trained[rule_key(condition)] = mass.detach().cpu().tolist()
+    submitted = {rule_key(condition): mass for condition, mass, _ in previous_rules or []}
+    masses = []
+    for condition, mass, _ in rules:
+        key = rule_key(condition)
+        if key in trained and (key not in submitted or np.allclose(submitted[key], mass)):
+            masses.append(trained[key])
+        else:
+            masses.append(None)
+    return masses
+
+
+def precompute_activations(data_path, rules, n_classes):
+    """
+    Evalúa las reglas una sola vez sobre el X_train de un split guardado y deja la matriz
+    de activación junto al split, para los entrenamientos que lo comparten.
+    Args:
+        data_path (str): Carpeta del split guardado con save_split.
+        rules (list): Reglas, tuplas (condición, masa, etiqueta).
+        n_classes (int): Número de clases.
+    """
+    X_train, _, _, _, columns = load_split(data_path)
+    ds = classifier.DSClassifierMultiQ(num_classes=n_classes, device=settings.DEVICE)
+    for rule, _, label in parse_rules(rules, columns):
+        ds.model.add_rule(DSRule(rule, label))
+    save_activations(data_path, ds.rule_activation_matrix(X_train))
+
+
+def parse_rules(rules, columns):
+    """
+    Convierte las reglas JSON en funciones sobre las columnas del entrenamiento.
+    Returns:
+        list: Tuplas (función, masa, etiqueta).
+    """
+    dsparser = DSParser.DSParser()
+    functions = []
+    print("Processing rules...")
+    for rule, mass, label in rules:
+        f = dsparser.json_to_lambda(rule, columns)
+        functions.append((f, mass, label))
+    return functions
+
+
+def build_classifier(functions, n_classes, max_iter, min_iter, batch_size, loss_function, optimizer, learning_rate,
+                     min_dloss, shuffle_batches=False, initial_masses=None):
+    """
+    Crea el clasificador vectorizado con las reglas ya parseadas.
+    Args:
+        functions (list): Reglas parseadas, tuplas (función, masa, etiqueta).
+        initial_masses (list): Masa inicial de cada regla en vez de la enviada, None para usar la enviada.
+    """
+    ds = classifier.DSClassifierMultiQ(
+        num_classes=n_classes,
+        lr=learning_rate,
+        max_iter=max_iter,
+        min_iter=min_iter,
+        batch_size=batch_size,
+        lossfn=loss_function,
+        optim=optimizer,
+        debug_mode=True,
+        device=settings.DEVICE,
+        min_dloss=min_dloss,
+        vectorized=True,
+        shuffle=shuffle_batches,
+    )
+    print("Adding rules...")
+    if initial_masses is None:
+        initial_masses = [None] * len(functions)
+    for (rule, mass, label), warm_mass in zip(functions, initial_masses):
+        if warm_mass is not None:
+            mass = warm_mass
+        m_uncert = None
+        m_sing = None
+        if sum(mass) == 1:
+            m_uncert = mass[-1]
+            m_sing = mass[:-1]
+        ds.model.add_rule(DSRule(rule, label), m_sing=m_sing, m_uncert=m_uncert)
+    return ds
+
+
+def carve_validation(X, y, activations, validation_size):
+    """
+    Separa una parte del entrenamiento para validar y detener antes.
+    Returns:
+        tuple: (X, y, activations, validation_data, validation_activations)
+    """
+    if not validation_size or validation_size <= 0:
+        return X, y, activations, None, None
+    train_idx, val_idx = train_test_split(np.arange(len(y)), test_size=validation_size, random_state=42)
+    validation_activations = None
+    if activations is not None:
+        validation_activations = activations[val_idx]
+        activations = activations[train_idx]
+    return X[train_idx], y[train_idx], activations, (X[val_idx], y[val_idx]), validation_activations
+
+
+def fit_with_progress(ds, X, y, columns, progress, tasks_id, recorder=None, **fit_kwargs):
+    """
+    Entrena reportando cada época al progreso y deteniéndose si el usuario lo pide.
+    Returns:
+        bool: True si el entrenamiento fue detenido por el usuario.
+    """
+    messages = ds.fit(X, y, add_single_rules=False, single_rules_breaks=3, add_mult_rules=False, column_names=columns, print_every_epochs=1, print_final_model=False, **fit_kwargs)
+    try:
+        for msg in messages:
+            if progress.stopped(tasks_id):
+                print("Training stopped by user")
+                return True
+            progress.update(tasks_id, msg)
+            if recorder is not None:
+                recorder.record(msg, ds.history_)
+            print(msg)
+        return False
+    finally:
+        #cerrar el generador restaura las masas de la mejor validacion antes de guardar el modelo
+        messages.close()
+
+
 def train_model(
-    X_train: pd.DataFrame,
-    X_test: pd.DataFrame,
-    y_train: np.ndarray,
-    y_test: np.ndarray,
+    X_train: pd.DataFrame = None,
+    X_test: pd.DataFrame = None,
+    y_train: np.ndarray = None,
+    y_test: np.ndarray = None,
     max_iter: int = 100,
     min_iter: int = 10,
     batch_size: int = 4000,
@@ -26,72 +178,68 @@ def train_model(
     rules: list = [],
     n_classes: int = 2,
     label_to_num: dict = None,
+    validation_size: float = 0.0,
+    patience: int = None,
+    validation_every: int = 1,
+    shuffle_batches: bool = False,
+    warm_start_path: str = None,
+    warm_start_rules: list = None,
     db: Session = None,
     tasks_id: str = None,
+    data_path: str = None,
+    progress=None,
 ):
+    #cuando corre desde la cola los datos llegan como una carpeta y la sesion se crea aqui
+    if progress is None:
+        progress = LocalProgress()
+    own_session = db is None
+    if own_session:
+        db = session_for()
+    iteration = None
     try:
-        #eliminemos las columnas no numericas o booleanas
-        X_train = X_train.select_dtypes(include=[np.number, 'bool'])
-        X_test = X_test.select_dtypes(include=[np.number, 'bool'])
-        dsparser = DSParser.DSParser()
-        functions = []
-        print("Processing rules...")
-        for rule, mass, label in rules:
-            f = dsparser.json_to_lambda(rule, X_train.columns.tolist())
-            functions.append((f, mass, label))
-        print(X_train.dtypes)
-        X_train_np = X_train.to_numpy()
-        X_test_np = X_test.to_numpy()
+        #las features se usan como matrices float32 contiguas, sin copias intermedias
+        activations = None
+        if data_path is not None:
+            X_train_np, X_test_np, y_train, y_test, columns = load_split(data_path)
+            #activaciones de las reglas precalculadas, p.ej. en un barrido de hiperparametros
+            activations = load_activations(data_path)
+        else:
+            #eliminemos las columnas no numericas o booleanas
+            X_train_np, columns = as_float_matrix(X_train)
+            X_test_np, _ = as_float_matrix(X_test, columns)
+        functions = parse_rules(rules, columns)
         #si y no es numpy array, convertirlo
         if not isinstance(y_train, np.ndarray):
             y_train = y_train.to_numpy()
         if not isinstance(y_test, np.ndarray):
             y_test = y_test.to_numpy()
-        columns = X_train.columns.tolist()
-        settings.TASKS_PROGRESS[tasks_id] = "Initializing model..."
+        #separamos una parte del entrenamiento para validar y detener antes
+        X_train_np, y_train, activations, validation_data, validation_activations = carve_validation(X_train_np, y_train, activations, validation_size)
+        progress.update(tasks_id, "Initializing model...")
         print("Initializing model...")
-        ds = classifier.DSClassifierMultiQ(
-            num_classes=n_classes,
-            lr=learning_rate,
-            max_iter=max_iter,
-            min_iter=min_iter,
-            batch_size=batch_size,
-            lossfn=loss_function,
-            optim=optimizer,
-            debug_mode=True,
-            device=settings.DEVICE,
-            min_dloss=min_dloss,
-        )
-        print("Adding rules...")
-        for rule, mass, label in functions:
-            m_uncert = None
-            m_sing = None
-            if sum(mass) == 1:
-                m_uncert = mass[-1]
-                m_sing = mass[:-1]
-            ds.model.add_rule(DSRule(rule, label), m_sing=m_sing, m_uncert=m_uncert)
+        #al continuar una iteracion anterior las reglas que ya estaban parten de su masa entrenada
+        initial_masses = None
+        if warm_start_path:
+            initial_masses = warm_start_masses(warm_start_path, n_classes, rules, warm_start_rules)
+        ds = build_classifier(functions, n_classes, max_iter, min_iter, batch_size, loss_function, optimizer,
+                              learning_rate, min_dloss, shuffle_batches, initial_masses)
 
         iteration = db.query(Iteration).filter(Iteration.id == int(tasks_id)).first()
         iteration.training_status = Status.RUNNING
         iteration.training_start_time = datetime.now()
         db.commit()
         print("Starting training...")
-        for msg in ds.fit(X_train_np, y_train, add_single_rules=False, single_rules_breaks=3, add_mult_rules=False, column_names=columns, print_every_epochs=1, print_final_model=False):
-            previous_msg = settings.TASKS_PROGRESS.get(tasks_id, "")
-            if previous_msg== '{"status": "Training stopped by user"}':
-                print("Training stopped by user")
-                iteration.training_status = Status.STOPPED
-                iteration.training_end_time = datetime.now()
-                db.commit()
-                break
-            settings.TASKS_PROGRESS[tasks_id] = msg
-            iteration.training_message = msg
-            db.commit()
-            print(msg)
+        #el progreso se guarda en la base de datos cada cierto tiempo, no en cada época
+        recorder = ProgressRecorder(db, iteration, flush_seconds=settings.PROGRESS_FLUSH_SECONDS, flush_epochs=settings.PROGRESS_FLUSH_EPOCHS)
+        stopped = fit_with_progress(ds, X_train_np, y_train, columns, progress, tasks_id, recorder, validation_data=validation_data, patience=patience, validation_every=validation_every, activations=activations, validation_activations=validation_activations)
+        if stopped:
+            iteration.training_status = Status.STOPPED
+            iteration.training_end_time = datetime.now()
+        recorder.flush(ds.history_)
         data = {
             "status": "evaluation"
         }
-        settings.TASKS_PROGRESS[tasks_id] = json.dumps(data)
+        progress.update(tasks_id, json.dumps(data))
         path = settings.MODELS_FOLDER + f"/model_{tasks_id}.bin"
         ds.model.save_rules_bin(path)
         iteration.training_end_time = datetime.now()
@@ -100,70 +248,179 @@ def train_model(
         iteration.model_path = path
         db.commit()
         print("Final evaluation...")
-        y_pred = ds.predict(X_test_np)
-        try:
-            acc = accuracy_score(y_test, y_pred)
-        except:
-            acc = 0.0
-        try:
-            precision = precision_score(y_test, y_pred, average='weighted')
-        except:
-            precision = 0.0
-        try:
-            recall = recall_score(y_test, y_pred, average='weighted')
-        except:
-            recall = 0.0
-        try:
-            f1 = f1_score(y_test, y_pred, average='weighted')
-        except:
-            f1 = 0.0
-        try:
-            confusion = confusion_matrix(y_test, y_pred)
-        except:
-            confusion = np.zeros((n_classes, n_classes))
-        try:
-            report = classification_report(y_test, y_pred, output_dict=True)
-        except:
-            report = {}
-        try:
-            y_proba = ds.predict_proba(X_test_np)
-            classes = list(label_to_num.values())
-            n_classes = len(classes)
-
-            # Binarizar etiquetas solo si hay más de 2 clases
-            if n_classes > 2:
-                y_true_bin = label_binarize(y_test, classes=classes)
-                roc = roc_auc_score(
-                    y_true_bin,
-                    y_proba,
-                    average='macro',
-                    multi_class='ovr'
-                )
-            else:
-                # Para clasificación binaria
-                # Asegurarse de que y_test sea 1D
-                y_true_bin = label_binarize(y_test, classes=classes).ravel()
-                # Tomar la probabilidad de la clase positiva (columna 1)
-                roc = roc_auc_score(y_true_bin, y_proba[:, 1])
-        except Exception as e:
-            print("--------------------------------")
-            print(f"Error calculating ROC AUC: {e}")
-            print("--------------------------------")
-            roc = 0.0
-        iteration.accuracy = acc
-        iteration.precision = precision
-        iteration.recall = recall
-        iteration.f1_score = f1
-        iteration.confusion_matrix = confusion.tolist()
-        iteration.classification_report = report
-        iteration.roc_auc = roc
+        metrics, _ = evaluate_model(ds, X_test_np, y_test, label_to_num, n_classes)
+        for key, value in metrics.items():
+            setattr(iteration, key, value)
         db.commit()
         print("Training finished successfully")
         
-        settings.TASKS_PROGRESS[tasks_id] = "Training finished ✅"
+        progress.update(tasks_id, "Training finished ✅")
     except Exception as e:
         print(f"Error during training: {e}")
-        settings.TASKS_PROGRESS[tasks_id] = f"Error during training: {e}"
-        iteration.training_status = Status.ERROR
-        iteration.training_message = str(e)
-        db.commit()
\ No newline at end of file
+        progress.update(tasks_id, f"Error during training: {e}")
+        db.rollback()
+        if iteration is not None:
+            iteration.training_status = Status.ERROR
+            iteration.training_message = str(e)
+            db.commit()
+    finally:
+        if own_session:
+            db.close()
+
+def fail_expired_job(job):
+    """
+    Marca como error la iteración de un trabajo que la cola dio por fallido porque el lease
+    de su worker venció demasiadas veces, ver JobQueue.on_failed.
+    Args:
+        job (TrainingJob): Trabajo fallido.
+    """
+    db = session_for()
+    try:
+        iteration = db.query(Iteration).filter(Iteration.id == int(job.task_id)).first()
+        if iteration is not None and iteration.training_status in (Status.PENDING, Status.RUNNING, None):
+            iteration.training_status = Status.ERROR
+            iteration.training_message = job.error
+            iteration.training_end_time = datetime.now()
+            db.commit()
+    finally:
+        db.close()
+    LocalProgress().update(job.task_id, f"Error during training: {job.error}")
+    progress_bus.finish(job.task_id)
+
+
+# métricas escalares que se promedian entre folds
+FOLD_METRICS = ["accuracy", "precision", "recall", "f1_score", "roc_auc"]
+
+
+def train_fold(
+    fold: int,
+    folds: int,
+    max_iter: int = 100,
+    min_iter: int = 10,
+    batch_size: int = 4000,
+    loss_function: str = "MSE",
+    optimizer: str = "adam",
+    learning_rate: float = 0.001,
+    min_dloss: float = 0.0001,
+    rules: list = [],
+    n_classes: int = 2,
+    label_to_num: dict = None,
+    validation_size: float = 0.0,
+    patience: int = None,
+    validation_every: int = 1,
+    shuffle_batches: bool = False,
+    tasks_id: str = None,
+    data_path: str = None,
+    progress=None,
+):
+    """
+    Entrena un fold de una validación cruzada. Todos los folds leen el mismo split guardado,
+    con la asignación de folds y las activaciones de las reglas precalculadas, y el último
+    fold en terminar agrega los resultados en la iteración. Si el fold falla el error se
+    propaga al worker, que detiene y cancela los demás folds de la tarea.
+    Args:
+        fold (int): Fold que se usa como prueba.
+        folds (int): Cantidad de folds.
+    """
+    if progress is None:
+        progress = LocalProgress()
+    db = session_for()
+    iteration = None
+    try:
+        X, _, y, _, columns = load_split(data_path)
+        assignment = load_folds(data_path)
+        activations = load_activations(data_path)
+        train_idx = np.flatnonzero(assignment != fold)
+        test_idx = np.flatnonzero(assignment == fold)
+        X_train, y_train = X[train_idx], y[train_idx]
+        if activations is not None:
+            activations = activations[train_idx]
+        X_train, y_train, activations, validation_data, validation_activations = carve_validation(X_train, y_train, activations, validation_size)
+        ds = build_classifier(parse_rules(rules, columns), n_classes, max_iter, min_iter, batch_size, loss_function,
+                              optimizer, learning_rate, min_dloss, shuffle_batches)
+        iteration = db.query(Iteration).filter(Iteration.id == int(tasks_id)).first()
+        if iteration.training_status == Status.PENDING:
+            iteration.training_status = Status.RUNNING
+            iteration.training_start_time = datetime.now()
+            db.commit()
+        print(f"Starting fold {fold + 1}/{folds}...")
+        if fit_with_progress(ds, X_train, y_train, columns, progress, tasks_id, validation_data=validation_data, patience=patience, validation_every=validation_every, activations=activations, validation_activations=validation_activations):
+            #el fold también se detiene cuando otro fold falla, en ese caso se conserva el error
+            db.refresh(iteration)
+            if iteration.training_status in (Status.PENDING, Status.RUNNING):
+                iteration.training_status = Status.STOPPED
+                iteration.training_end_time = datetime.now()
+                db.commit()
+            return
+        metrics, y_pred = evaluate_model(ds, X[test_idx], y[test_idx], label_to_num, n_classes)
+        path = settings.MODELS_FOLDER + f"/model_{tasks_id}_fold{fold}.bin"
+        ds.model.save_rules_bin(path)
+        np.save(os.path.join(data_path, f"fold_{fold}_pred.npy"), np.stack([test_idx, y_pred]))
+        result = dict(metrics, fold=fold, model_path=path, best_epoch=ds.best_epoch_, curve=ds.history_)
+        #se escribe completo antes de que otro fold lo pueda leer
+        tmp = os.path.join(data_path, f"fold_{fold}.json.tmp")
+        with open(tmp, "w") as f:
+            json.dump(sanitize_json(result), f)
+        os.replace(tmp, os.path.join(data_path, f"fold_{fold}.json"))
+        print(f"Fold {fold + 1}/{folds} finished")
+        if all(os.path.exists(os.path.join(data_path, f"fold_{i}.json")) for i in range(folds)):
+            try:
+                #solo un fold agrega los resultados
+                os.close(os.open(os.path.join(data_path, "aggregate.lock"), os.O_CREAT | os.O_EXCL))
+            except FileExistsError:
+                return
+            aggregate_folds(db, iteration, data_path, folds, y)
+            progress.update(tasks_id, "Training finished ✅")
+    except Exception as e:
+        print(f"Error during training: {e}")
+        progress.update(tasks_id, f"Error during training: {e}")
+        db.rollback()
+        if iteration is not None:
+            iteration.training_status = Status.ERROR
+            iteration.training_message = str(e)
+            db.commit()
+        #el worker da el trabajo por fallido y cancela los demás folds
+        raise
+    finally:
+        db.close()
+
+
+def aggregate_folds(db, iteration, data_path, folds, y):
+    """
+    Guarda en la iteración las métricas de cada fold, su media y desviación estándar.
+    La matriz de confusión y el reporte se calculan sobre las predicciones fuera de fold de
+    todas las filas, y se conserva el modelo del fold con mejor exactitud.
+    """
+    results = []
+    for i in range(folds):
+        with open(os.path.join(data_path, f"fold_{i}.json")) as f:
+            results.append(json.load(f))
+    y_pred = np.zeros(len(y), dtype=np.int64)
+    for i in range(folds):
+        idx, pred = np.load(os.path.join(data_path, f"fold_{i}_pred.npy"))
+        y_pred[idx] = pred
+    best = max(range(folds), key=lambda i: results[i]["accuracy"])
+    path = settings.MODELS_FOLDER + f"/model_{iteration.id}.bin"
+    os.replace(results[best]["model_path"], path)
+    for i, result in enumerate(results):
+        if i != best and os.path.exists(result["model_path"]):
+            os.remove(result["model_path"])
+        result.pop("model_path")
+    for key in FOLD_METRICS:
+        setattr(iteration, key, float(np.mean([result[key] for result in results])))
+    labels, matrix = confusion(y, y_pred)
+    iteration.confusion_matrix = matrix.tolist()
+    iteration.classification_report = report_from_confusion(labels, matrix)
+    iteration.cv_results = sanitize_json({
+        "folds": results,
+        "mean": {key: float(np.mean([result[key] for result in results])) for key in FOLD_METRICS},
+        "std": {key: float(np.std([result[key] for result in results])) for key in FOLD_METRICS},
+        "best_fold": best,
+    })
+    iteration.training_curve = sanitize_json(results[best]["curve"])
+    iteration.model_path = path
+    iteration.trained = True
+    iteration.training_status = Status.COMPLETED
+    iteration.training_end_time = datetime.now()
+    db.commit()
+    print("Cross validation finished successfully")
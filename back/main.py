@@ -1,11 +1,13 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from database import Base, engine
+from database import Base, engine, upgrade_schema
 import models
 import routes
 
 
 Base.metadata.create_all(bind=engine)
+# columnas agregadas a tablas que ya existian
+upgrade_schema(engine)
 
 app = FastAPI()
 
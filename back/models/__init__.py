@@ -2,4 +2,5 @@ from .user import User
 from .datasets import Datasets
 from .dataset_file import DatasetFile
 from .experiment import Experiment
-from .iteration import Iteration
\ No newline at end of file
+from .iteration import Iteration
+from .passwordResetToken import PasswordResetToken
\ No newline at end of file
@@ -51,6 +51,8 @@ class DatasetFile(Base):
         type_file (FileType): Tipo de archivo (CSV, Excel, Parquet).
         dataset_type (DatasetType): Tipo de dataset según su uso (TRAINING, TESTING, ALL).
         header (bool): Indica si el archivo incluye fila de encabezado.
+        content_hash (str): sha256 del contenido. Los archivos con el mismo contenido comparten
+            el archivo almacenado, su cache y sus estadísticas.
 
     Relaciones:
         dataset (Datasets): Dataset al que pertenece el archivo. Relación muchos a uno.
@@ -63,5 +65,6 @@ class DatasetFile(Base):
     type_file = Column(Enum(FileType), nullable=False)
     dataset_type = Column(Enum(DatasetType), nullable=False)
     header = Column(Boolean, nullable=False)
+    content_hash = Column(String(64), index=True, nullable=True)
 
     dataset = relationship("Datasets", back_populates="files")
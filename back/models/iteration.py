@@ -47,12 +47,21 @@ class Iteration(Base):
         min_dloss (float): Cambio mínimo en la pérdida para considerar convergencia.
         precompute_rules (bool): Si se precomputaron reglas antes del entrenamiento.
         force_precompute (bool): Si se forzó el recálculo de las reglas previas.
+        validation_size (float): Proporción del entrenamiento usada para validar, 0 sin validación.
+        patience (int): Validaciones sin mejora antes de detener el entrenamiento.
+        validation_every (int): Épocas entre validaciones.
+        shuffle_batches (bool): Si los batches se toman de una permutación distinta en cada época.
+        initial_rules (list): Reglas enviadas para el entrenamiento, [{"rule", "mass", "label"}].
+        warm_start_iteration_id (int): Iteración desde cuyo modelo se continuó el entrenamiento, si corresponde.
+        folds (int): Cantidad de folds de la validación cruzada, None si se entrenó con un único split.
 
         # Estado de entrenamiento
         training_status (str): Estado actual del entrenamiento ("pending", "running", "completed", "failed").
         training_message (str): Mensaje descriptivo del estado o error ocurrido.
         training_start_time (datetime): Hora de inicio del entrenamiento.
         training_end_time (datetime): Hora de finalización del entrenamiento.
+        training_curve (dict): Curva de entrenamiento, un arreglo por métrica con un valor por época
+            ("loss", "epoch_time" y los tiempos por fase "forward", "backward", "optim", "norm").
 
         # Métricas de desempeño
         accuracy (float): Exactitud del modelo.
@@ -62,6 +71,9 @@ class Iteration(Base):
         confusion_matrix (dict): Matriz de confusión resultante.
         classification_report (dict): Reporte de clasificación detallado.
         roc_auc (float): Área bajo la curva ROC.
+        cv_results (dict): Resultados de la validación cruzada: métricas de cada fold ("folds"),
+            su media ("mean"), desviación estándar ("std") y el fold cuyo modelo se conservó ("best_fold").
+            Con validación cruzada las métricas escalares son la media entre folds.
 
     Relaciones:
         experiment (Experiment): Experimento al que pertenece la iteración.
@@ -90,12 +102,20 @@ class Iteration(Base):
     min_dloss = Column(Float, nullable=True)
     precompute_rules = Column(Boolean, default=False)
     force_precompute = Column(Boolean, default=False)
+    validation_size = Column(Float, nullable=True)
+    patience = Column(Integer, nullable=True)
+    validation_every = Column(Integer, nullable=True)
+    shuffle_batches = Column(Boolean, default=False)
+    initial_rules = Column(JSON, nullable=True)
+    warm_start_iteration_id = Column(Integer, nullable=True)
+    folds = Column(Integer, nullable=True)
 
     # Training status
     training_status = Column(Enum(Status), nullable=True)  # e.g., "pending", "running", "completed", "error"
     training_message = Column(String, nullable=True)  # Message for training status
     training_start_time = Column(DateTime, nullable=True)
     training_end_time = Column(DateTime, nullable=True)
+    training_curve = Column(JSON, nullable=True)  # {"loss": [...], "epoch_time": [...], ...} one value per epoch
 
     # Metrics
     accuracy = Column(Float, nullable=True)
@@ -105,6 +125,7 @@ class Iteration(Base):
     confusion_matrix = Column(JSON, nullable=True)
     classification_report = Column(JSON, nullable=True)
     roc_auc = Column(Float, nullable=True)
+    cv_results = Column(JSON, nullable=True)
     
     # Relationships
     experiment = relationship("Experiment", back_populates="iterations")
\ No newline at end of file
@@ -1,5 +1,5 @@
 from fastapi import APIRouter
-from routes import auth, datasets, experiments, train, predict, rules
+from routes import auth, datasets, experiments, train, predict, rules, offload
 
 api_router = APIRouter()
 
@@ -9,4 +9,5 @@ api_router.include_router(datasets.api_router, prefix="/datasets", tags=["datase
 api_router.include_router(experiments.api_router, prefix="/experiments", tags=["experiments"])
 api_router.include_router(train.api_router, prefix="/train", tags=["train"])
 api_router.include_router(predict.api_router, prefix="/predict", tags=["predict"])
-api_router.include_router(rules.api_router, prefix="/rules", tags=["rules"])
\ No newline at end of file
+api_router.include_router(rules.api_router, prefix="/rules", tags=["rules"])
+api_router.include_router(offload.api_router, prefix="/offload", tags=["offload"])
\ No newline at end of file
@@ -1,5 +1,6 @@
 import json
 import os
+from collections import Counter
 from fastapi import APIRouter, Depends, HTTPException, Form, File, UploadFile
 from typing import List
 from sqlalchemy.orm import Session
@@ -12,9 +13,13 @@ from core.config import settings
 from schemas.dataset import DatasetOut
 import pandas as pd
 import numpy as np
-from sklearn.calibration import LabelEncoder
-from utils.loadDataset import load_datasets
+from utils.loadDataset import load_datasets, remove_cache, scan_dataset_file
+from utils.upload import save_blob
+from utils.encoding import vocabulary, read_vocabulary, write_vocabulary
+from utils.datasetStats import load_preview, read_stats, save_stats
 from utils.sanitize import sanitize_json
+from dsmodels.registry import model_registry
+from core.offload import offloader
 
 api_router = APIRouter()
 
@@ -34,56 +39,142 @@ async def preview_dataset(
     current_user: User = Depends(get_current_user_from_cookie),
     db: Session = Depends(get_db)
 ):
+    dataset = db.query(Datasets).filter(Datasets.id == dataset_id, Datasets.user_id == current_user.id).first()
+    if not dataset:
+        raise HTTPException(status_code=404, detail="Dataset no encontrado")
     dataset_files = db.query(DatasetFile).filter(DatasetFile.dataset_id == dataset_id).all()
-    columns = db.query(Datasets).filter(Datasets.id == dataset_id, Datasets.user_id == current_user.id).first().columns
     if not dataset_files or len(dataset_files) == 0:
         raise HTTPException(status_code=404, detail="Dataset no encontrado")
+    return await offloader.run("preview", preview_data, dataset_files, dataset.columns)
+
+
+def preview_data(dataset_files, columns):
     dataset_data = []
-    datasets = load_datasets(dataset_files, columns=columns)
-    for dataset in datasets:
-        df = dataset["data"]
-        stats = []
-        n_rows = len(df)
-        for col in df.columns:
-            uniques = df[col].unique()
-            if pd.api.types.is_numeric_dtype(df[col]):
-                numeric_vals = df[col].dropna().astype(float)
-                bins = min(uniques.size, 10)
-                counts, bin_edges = np.histogram(numeric_vals, bins=bins)
-                histogram = []
-                for i in range(len(counts)):
-                    histogram.append({
-                        "bin": f"{bin_edges[i]:.2f} - {bin_edges[i+1]:.2f}",
-                        "count": int(counts[i])
-                    })
-            else:
-                histogram = None
-                if uniques.size <= 10:
-                    histogram = []
-                    value_counts = df[col].value_counts()
-                    for val, count in value_counts.items():
-                        histogram.append({
-                            "bin": str(val),
-                            "count": int(count)
-                        })
-            
-            stats.append({
-                "column": str(col),
-                "type": str(df[col].dtype),
-                "nulls": int(df[col].isnull().sum()),
-                "nullPercent": float(df[col].isnull().sum() / n_rows * 100),
-                "uniqueCount": int(uniques.size),
-                "min": float(round(df[col].min(), 2)) if pd.api.types.is_numeric_dtype(df[col]) else None,
-                "max": float(round(df[col].max(), 2)) if pd.api.types.is_numeric_dtype(df[col]) else None,
-                "mean": float(round(df[col].mean(), 2)) if pd.api.types.is_numeric_dtype(df[col]) else None,
-                "histogram": histogram
-            })
-        min_rows = min(n_rows, 1000)
-        dataset_data.append({ "data": df.head(min_rows).to_dict(orient='records'), "stats": stats, "type": dataset["dataset_type"]})
+    for dataset_file in dataset_files:
+        #estadisticas precalculadas al subir el dataset
+        data, stats = load_preview(dataset_file, columns=columns)
+        dataset_data.append({ "data": data.to_dict(orient='records'), "stats": stats, "type": dataset_file.dataset_type})
 
     return sanitize_json(dataset_data)
 
 
+def parse_upload(dataset_file, columns, target_column):
+    """
+    Recorre un archivo subido por bloques una sola vez, validando sus columnas y dejando el
+    cache columnar, las estadisticas y el vocabulario de las columnas categoricas para las
+    siguientes lecturas. Un archivo ya subido con las mismas columnas no se vuelve a recorrer.
+    Returns:
+        dict: Resumen del archivo, ver scan_dataset_file.
+    """
+    summary = read_vocabulary(dataset_file, columns)
+    #un archivo ya subido con las mismas columnas ya tiene su vocabulario y sus estadisticas
+    if summary is None or (target_column not in summary["categories"] and target_column not in summary["numeric_values"]) \
+            or read_stats(dataset_file, columns) is None:
+        summary = scan_dataset_file(dataset_file, columns, target_column)
+        write_vocabulary(dataset_file, summary, columns)
+        #las estadisticas se acumulan en la misma pasada, sin releer el archivo completo
+        save_stats(dataset_file, summary["stats"], columns)
+    return summary
+
+
+def columns_encoder_for(summaries, target_column, n_classes, max_categories=None):
+    """
+    Codificación de las columnas categoricas y, si hace falta, de la columna objetivo, a
+    partir de las frecuencias juntadas al recorrer cada archivo. Las columnas con más de
+    max_categories valores agrupan los menos frecuentes en OTHER_CATEGORY.
+    """
+    categories = {}
+    target_values = Counter()
+    for summary in summaries:
+        for column, counts in summary["categories"].items():
+            categories.setdefault(column, Counter()).update(counts)
+        target_values.update(summary["numeric_values"].get(target_column, {}))
+    columns_encoder = {}
+    for column, counts in categories.items():
+        #la columna objetivo siempre conserva todas sus clases
+        columns_encoder[column] = vocabulary(counts, None if column == target_column else max_categories)
+    #si es que la columna objetivo tiene valores numericos mayores que las clases hacer un mapeo
+    if target_column not in columns_encoder:
+        print("Checking target column for numeric labels...", target_column)
+        print("Unique values in target column:", list(target_values))
+        if any(val >= n_classes for val in target_values):
+            label_to_num = {str(label): idx for idx, label in enumerate(sorted(target_values))}
+            columns_encoder[target_column] = label_to_num
+    else:
+        target_values = categories[target_column]
+    #si la cantidad de valores de la columna objetivo son más que el numero de clases falla
+    if n_classes != len(target_values):
+        raise HTTPException(status_code=400, detail="Número de clases no coincide con los valores únicos en la columna objetivo")
+    return columns_encoder
+
+
+def file_type_for(filename):
+    """
+    Tipo de un archivo subido según su extensión.
+    """
+    ext = filename.split(".")[-1].lower()
+    if ext not in ["csv", "xlsx", "xls", "parquet"]:
+        raise HTTPException(status_code=400, detail=f"Tipo de archivo no soportado: {ext}")
+    return ext, FileType.CSV if ext == "csv" else FileType.EXCEL if ext in ["xlsx", "xls"] else FileType.PARQUET
+
+
+async def store_upload(file, dataset_id, dataset_type, header):
+    """
+    Guarda un archivo subido por bloques en el almacenamiento direccionado por contenido.
+    Un archivo idéntico a uno ya subido comparte el archivo almacenado, su cache y sus estadísticas.
+    Returns:
+        DatasetFile: Archivo sin guardar en la base de datos.
+    """
+    ext, type_file = file_type_for(file.filename)
+    file_path, digest, size, reused = await save_blob(file, settings.DATASETS_FOLDER, ext)
+    print(f"Archivo {file.filename} guardado en {file_path} ({size} bytes{', ya existía' if reused else ''})")
+    return DatasetFile(
+        dataset_id=dataset_id,
+        file_path=file_path,
+        type_file=type_file,
+        dataset_type=dataset_type,
+        header=header,
+        content_hash=digest
+    )
+
+
+def find_duplicate(db, dataset, dataset_files):
+    """
+    Busca un dataset ya subido con los mismos archivos y la misma configuración, cuya
+    codificación de columnas se puede reutilizar sin volver a recorrer los archivos.
+    """
+    hashes = sorted(dataset_file.content_hash for dataset_file in dataset_files)
+    candidates = db.query(Datasets).join(DatasetFile).filter(
+        DatasetFile.content_hash == hashes[0],
+        Datasets.id != dataset.id,
+        Datasets.columns_encoder.isnot(None)
+    ).all()
+    for candidate in candidates:
+        if (candidate.columns != dataset.columns or candidate.target_column != dataset.target_column
+                or candidate.n_classes != dataset.n_classes):
+            continue
+        files = candidate.files
+        if sorted(f.content_hash or "" for f in files) != hashes:
+            continue
+        if all(f.header == dataset_files[0].header for f in files):
+            return candidate
+    return None
+
+
+def release_dataset_file(db, dataset_file):
+    """
+    Elimina el archivo almacenado y su cache si ningún DatasetFile lo referencia.
+    """
+    references = db.query(DatasetFile).filter(DatasetFile.file_path == dataset_file.file_path).count()
+    if references > 0:
+        return
+    try:
+        os.remove(dataset_file.file_path)
+    except Exception as e:
+        print(f"Error al eliminar el archivo {dataset_file.file_path}: {e}")
+    remove_cache(dataset_file)
+
+
 @api_router.post("/upload")
 async def upload_dataset(
     name: str = Form(...),
@@ -118,6 +209,8 @@ async def upload_dataset(
             raise HTTPException(status_code=400, detail="Una de las columnas está vacía")
     if header is None:
         raise HTTPException(status_code=400, detail="Debe especificar si el archivo tiene encabezados")
+    for file in files:
+        file_type_for(file.filename)
     new_dataset = Datasets(
         name=name,
         user_id=current_user.id,
@@ -130,87 +223,35 @@ async def upload_dataset(
     db.add(new_dataset)
     db.commit()
     db.refresh(new_dataset)
-    datasets = []
-    if len(files) == 1:
-        file = files[0]
-        ext = file.filename.split(".")[-1].lower()
-        if ext not in ["csv", "xlsx", "xls", "parquet"]:
-            raise HTTPException(status_code=400, detail=f"Tipo de archivo no soportado: {ext}")
-
-        # Definir tipo de archivo
-        type_file = FileType.CSV if ext == "csv" else FileType.EXCEL if ext in ["xlsx", "xls"] else FileType.PARQUET
-        
-        #guardar dataset
-        file_path = f"{settings.DATASETS_FOLDER}/{new_dataset.id}_{file.filename}"
-        with open(file_path, "wb") as f:
-            content = await file.read()
-            f.write(content)
-        if type_file == FileType.CSV:
-            datasets.append(pd.read_csv(file_path, header=0 if header else None, names=columns))
-        elif type_file == FileType.EXCEL:
-            datasets.append(pd.read_excel(file_path, header=0 if header else None, names=columns))
+    dataset_files = []
+    for file in files:
+        if len(files) == 1:
+            dataset_type = DatasetType.ALL
         else:
-            datasets.append(pd.read_parquet(file_path, columns=columns))
-        dataset_file = DatasetFile(
-            dataset_id=new_dataset.id,
-            file_path=file_path,
-            type_file=type_file,
-            dataset_type=DatasetType.ALL,
-            header=header
-        )
-        db.add(dataset_file)
-        db.commit()
-        db.refresh(dataset_file)
-    else:
-        for file in files:
-            ext = file.filename.split(".")[-1].lower()
-            if ext not in ["csv", "xlsx", "xls", "parquet"]:
-                raise HTTPException(status_code=400, detail=f"Tipo de archivo no soportado: {ext}")
-
-            # Definir tipo de archivo
-            type_file = FileType.CSV if ext == "csv" else FileType.EXCEL if ext in ["xlsx", "xls"] else FileType.PARQUET
-
-            # Guardar dataset
-            file_path = f"{settings.DATASETS_FOLDER}/{new_dataset.id}_{file.filename}"
-            with open(file_path, "wb") as f:
-                content = await file.read()
-                f.write(content)
-            if type_file == FileType.CSV:
-                datasets.append(pd.read_csv(file_path, header=0 if header else None, names=columns))
-            elif type_file == FileType.EXCEL:
-                datasets.append(pd.read_excel(file_path, header=0 if header else None, names=columns))
-            else:
-                datasets.append(pd.read_parquet(file_path, columns=columns))
-            dataset_file = DatasetFile(
-                dataset_id=new_dataset.id,
-                file_path=file_path,
-                type_file=type_file,
-                dataset_type=DatasetType.TRAINING if file == files[0] else DatasetType.TESTING,
-                header=header
-            )
-            db.add(dataset_file)
-            db.commit()
-            db.refresh(dataset_file)
+            dataset_type = DatasetType.TRAINING if file == files[0] else DatasetType.TESTING
+        dataset_files.append(await store_upload(file, new_dataset.id, dataset_type, header))
 
-    X = pd.concat(datasets)
-    columns_encoder = {}
-    for column in X.select_dtypes(exclude=["number"]).columns:
-        print(column)
-        encoder = LabelEncoder()
-        encoder.fit_transform(X[column])
-        label_to_num = {label: idx for idx, label in enumerate(encoder.classes_)}
-        columns_encoder[column] = label_to_num
-    #si es que la columna objetivo tiene valores numericos mayores que las clases hacer un mapeo
-    if target_column not in columns_encoder:
-        print("Checking target column for numeric labels...", target_column)
-        unique_values = X[target_column].unique()
-        print("Unique values in target column:", unique_values, unique_values.dtype)
-        if any(val >= n_classes for val in unique_values):
-            label_to_num = {str(label): idx for idx, label in enumerate(sorted(unique_values))}
-            columns_encoder[target_column] = label_to_num
-    #si la cantidad de valores de la columna objetivo son más que el numero de clases falla
-    if n_classes != X[target_column].nunique():
-        raise HTTPException(status_code=400, detail="Número de clases no coincide con los valores únicos en la columna objetivo")
+    duplicate = find_duplicate(db, new_dataset, dataset_files)
+    if duplicate is not None:
+        #mismos archivos y configuracion, se reutiliza la codificacion sin parsear
+        print(f"Dataset {new_dataset.id} duplicado del dataset {duplicate.id}")
+        columns_encoder = duplicate.columns_encoder
+    else:
+        summaries = []
+        try:
+            for dataset_file in dataset_files:
+                summaries.append(await offloader.run("upload", parse_upload, dataset_file, columns, target_column))
+        except ValueError as e:
+            for dataset_file in dataset_files:
+                release_dataset_file(db, dataset_file)
+            raise HTTPException(status_code=400, detail=f"Archivo no válido: {e}")
+        for dataset_file, summary in zip(dataset_files, summaries):
+            print(f"Archivo {dataset_file.file_path}: {summary['n_rows']} filas")
+    for dataset_file in dataset_files:
+        db.add(dataset_file)
+    db.commit()
+    if duplicate is None:
+        columns_encoder = await offloader.run("upload", columns_encoder_for, summaries, target_column, n_classes, settings.MAX_CATEGORIES)
     print(columns_encoder)
     new_dataset.columns_encoder = columns_encoder
     db.commit()
@@ -233,6 +274,7 @@ async def delete_dataset(
         #Eliminar iteraciones asociadas
         iterations = db.query(Iteration).filter(Iteration.experiment_id == experiment.id).all()
         for iteration in iterations:
+            model_registry.invalidate(iteration.id)
             if iteration.model_path and os.path.exists(iteration.model_path):
                 try:
                     os.remove(iteration.model_path)
@@ -242,15 +284,12 @@ async def delete_dataset(
         db.delete(experiment)
     db.commit()
     
-    # Eliminar archivos asociados
+    # Eliminar archivos asociados, el archivo almacenado solo si otro dataset no lo usa
     dataset_files = db.query(DatasetFile).filter(DatasetFile.dataset_id == dataset_id).all()
     for dataset_file in dataset_files:
-        try:
-            os.remove(dataset_file.file_path)
-        except Exception as e:
-            print(f"Error al eliminar el archivo {dataset_file.file_path}: {e}")
         db.delete(dataset_file)
-    
     db.delete(dataset)
     db.commit()
+    for dataset_file in dataset_files:
+        release_dataset_file(db, dataset_file)
     return {"info": f"Dataset '{dataset.name}' eliminado exitosamente"}
\ No newline at end of file
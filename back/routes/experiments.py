@@ -5,7 +5,6 @@ import zipfile
 import io
 from fastapi.responses import StreamingResponse
 from sklearn.model_selection import train_test_split
-from sklearn.preprocessing import label_binarize
 from sqlalchemy.orm import Session, joinedload
 from utils.sanitize import sanitize_json
 from database import get_db
@@ -16,12 +15,17 @@ from schemas.experiment import ExperimentOut
 from .auth import get_current_user_from_cookie
 from datetime import datetime
 from dsmodels import classifier, DSParser
+from dsmodels.registry import model_registry
+from dsmodels.evaluation import evaluate_model
+from core.offload import offloader
 from core.config import settings
 import pandas as pd
 import numpy as np
-from sklearn.metrics import accuracy_score, confusion_matrix, f1_score, precision_score, recall_score, classification_report, roc_auc_score
 import os
 from utils.loadDataset import load_datasets
+from utils.datasetStats import load_preview
+from utils.upload import save_upload
+from utils.encoding import ColumnsEncoder
 
 
 api_router = APIRouter()
@@ -56,6 +60,7 @@ async def delete_experiment(experiment_id: int, db: Session = Depends(get_db), c
         raise HTTPException(status_code=404, detail="Experiment not found")
     iterations = db.query(Iteration).filter(Iteration.experiment_id == experiment_id).all()
     for iteration in iterations:
+        model_registry.invalidate(iteration.id)
         if os.path.exists(iteration.model_path):
             os.remove(iteration.model_path)
         db.delete(iteration)
@@ -70,57 +75,24 @@ async def get_experiment_dataset(experiment_id: int, db: Session = Depends(get_d
     if not dataset_files:
         raise HTTPException(status_code=404, detail="No dataset files found for this experiment")
     dataset = db.query(Datasets).join(Experiment).filter(Experiment.id == experiment_id, Experiment.user_id == current_user.id).first()
-    dataset_data = []
-    datasets= load_datasets(dataset_files, columns=dataset.columns)
-    for dataset in datasets:
-        df = dataset["data"]
-        stats = []
-        n_rows = len(df)
-        for col in df.columns:
-            uniques = df[col].unique()
-            if pd.api.types.is_numeric_dtype(df[col]):
-                numeric_vals = df[col].dropna().astype(float)
-                bins = min(uniques.size, 10)
-                counts, bin_edges = np.histogram(numeric_vals, bins=bins)
-                histogram = []
-                for i in range(len(counts)):
-                    histogram.append({
-                        "bin": f"{bin_edges[i]:.2f} - {bin_edges[i+1]:.2f}",
-                        "count": int(counts[i])
-                    })
-            else:
-                histogram = None
-                if uniques.size <= 10:
-                    histogram = []
-                    value_counts = df[col].value_counts()
-                    for val, count in value_counts.items():
-                        histogram.append({
-                            "bin": str(val),
-                            "count": int(count)
-                        })
-            
-            stats.append({
-                "column": str(col),
-                "type": str(df[col].dtype),
-                "nulls": int(df[col].isnull().sum()),
-                "nullPercent": float(df[col].isnull().sum() / n_rows * 100),
-                "uniqueCount": int(uniques.size),
-                "min": float(round(df[col].min(), 2)) if pd.api.types.is_numeric_dtype(df[col]) else None,
-                "max": float(round(df[col].max(), 2)) if pd.api.types.is_numeric_dtype(df[col]) else None,
-                "mean": float(round(df[col].mean(), 2)) if pd.api.types.is_numeric_dtype(df[col]) else None,
-                "histogram": histogram
-            })
-        min_rows = min(n_rows, 1000)
-        data = df.head(min_rows)
-        #remplazar NaN por None
-        data = data.where(pd.notnull(data), None)
-        dataset_data.append({ "data": data.to_dict(orient='records'), "stats": stats, "type": dataset["dataset_type"]})
+    dataset_data = await offloader.run("preview", experiment_preview_data, dataset_files, dataset.columns)
     dataset = db.query(Datasets).join(Experiment).filter(Experiment.id == experiment_id, Experiment.user_id == current_user.id).first()
     return sanitize_json({
         "data": dataset_data,
         "info": dataset
     })
     
+def experiment_preview_data(dataset_files, columns):
+    dataset_data = []
+    for dataset_file in dataset_files:
+        #estadisticas precalculadas al subir el dataset
+        data, stats = load_preview(dataset_file, columns=columns)
+        #remplazar NaN por None
+        data = data.where(pd.notnull(data), None)
+        dataset_data.append({ "data": data.to_dict(orient='records'), "stats": stats, "type": dataset_file.dataset_type})
+    return dataset_data
+
+
 @api_router.get("/dataset/{experiment_id}/columns")
 async def get_experiment_dataset_columns(experiment_id: int, db: Session = Depends(get_db), current_user: User = Depends(get_current_user_from_cookie)):
     dataset = db.query(Datasets).join(Experiment).filter(Experiment.id == experiment_id, Experiment.user_id == current_user.id).first()
@@ -139,6 +111,7 @@ async def delete_experiment_iteration(iteration_id: int, db: Session = Depends(g
     iteration = db.query(Iteration).filter(Iteration.id == iteration_id, Experiment.user_id == current_user.id).first()
     if not iteration:
         raise HTTPException(status_code=404, detail="Iteration not found")
+    model_registry.invalidate(iteration.id)
     db.delete(iteration)
     db.commit()
     return {"detail": "Iteration deleted"}
@@ -233,121 +206,12 @@ async def upload_experiment_iteration(
     dataset_files = db.query(DatasetFile).join(Datasets).join(Experiment).filter(Experiment.id == experiment_id, Experiment.user_id == current_user.id).all()
     if not dataset_files:
         raise HTTPException(status_code=404, detail="No dataset files found for this experiment")
-    datasets = load_datasets(dataset_files, columns=dataset.columns)
-    label_to_num = None
-    if len(datasets) == 1:
-        X = datasets[0]["data"]
-        X.columns = X.columns.map(str)
-        X = X[dataset.columns]
-        if drop_nulls:
-            X = X.dropna()
-        if drop_duplicates:
-            X = X.drop_duplicates()
-        y = X[dataset.target_column]
-        X = X.drop(columns=[dataset.target_column])
-        for key, column_encoder in dataset.columns_encoder.items():
-            if key in X.columns:
-                X[key] = X[key].replace(column_encoder)
-            if key == dataset.target_column:
-                y = y.astype(str)
-                y = y.replace(column_encoder)
-                label_to_num = {label: num for label, num in column_encoder.items()}
-        _, X_test, _, y_test = train_test_split(X, y, test_size=test_size, random_state=split_seed, shuffle=shuffle)
-    elif len(datasets) == 2:
-        print(datasets[0]["dataset_type"], datasets[1]["dataset_type"])
-        X_test = datasets[1]["data"] if datasets[0]["dataset_type"] == DatasetType.TRAINING else datasets[0]["data"]
-        X_test.columns = X_test.columns.map(str)
-        if drop_nulls:
-            X_test = X_test.dropna()
-        if drop_duplicates:
-            X_test = X_test.drop_duplicates()
-        y_test = X_test[dataset.target_column]
-        X_test = X_test.drop(columns=[dataset.target_column])
-        for key, column_encoder in dataset.columns_encoder.items():
-            if key in X_test.columns:
-                X_test[key] = X_test[key].replace(column_encoder)
-            if key == dataset.target_column:
-                y_test = y_test.astype(str)
-                y_test = y_test.replace(column_encoder)
-                label_to_num = {label: num for label, num in column_encoder.items()}
-    else:
-        return HTTPException(status_code=400, detail="More than 2 dataset files found")
-    if not label_to_num:
-        label_to_num = {str(label): label for label in y_test.unique()}
-    contents = await file.read()
+    X_test, y_test, label_to_num = await offloader.run("upload_iteration", load_test_split, dataset, dataset_files, test_size, split_seed, shuffle, drop_nulls, drop_duplicates)
     model_path = f"{settings.MODELS_FOLDER}/uploaded_model_{experiment_id}_{int(datetime.now().timestamp())}.bin"
-    with open(model_path, "wb") as f:
-        f.write(contents)
+    await save_upload(file, model_path)
     try:
-        ds = classifier.DSClassifierMultiQ(
-            num_classes=dataset.n_classes,
-            lr=learning_rate,
-            max_iter=max_epochs,
-            min_iter=min_epochs,
-            batch_size=batch_size,
-            lossfn=loss_function,
-            optim=optimizer,
-            debug_mode=True,
-            device=settings.DEVICE
-        )
-        parser = DSParser.DSParser()
-        ds.model.load_rules_bin(model_path)
-        for rule in ds.model.preds:
-            parser.lambda_rule_to_json(rule.ld, X_test.columns.tolist())
-        X_test_np = X_test.to_numpy()
-        y_pred = ds.predict(X_test_np)
-        print(y_pred)
-        print(y_test)
-        try:
-            acc = accuracy_score(y_test, y_pred)
-        except Exception as e:
-            print("Error calculating accuracy:", e)
-            acc = 0.0
-        try:
-            y_proba = ds.predict_proba(X_test_np)
-            classes = list(label_to_num.values())
-            n_classes = len(classes)
-
-            # Binarizar etiquetas solo si hay más de 2 clases
-            if n_classes > 2:
-                y_true_bin = label_binarize(y_test, classes=classes)
-                roc = roc_auc_score(
-                    y_true_bin,
-                    y_proba,
-                    average='macro',
-                    multi_class='ovr'
-                )
-            else:
-                # Para clasificación binaria
-                # Asegurarse de que y_test sea 1D
-                y_true_bin = label_binarize(y_test, classes=classes).ravel()
-                # Tomar la probabilidad de la clase positiva (columna 1)
-                roc = roc_auc_score(y_true_bin, y_proba[:, 1])
-        except Exception as e:
-            print("--------------------------------")
-            print(f"Error calculating ROC AUC: {e}")
-            print("--------------------------------")
-            roc = 0.0
-        try:
-            precision = precision_score(y_test, y_pred, average='weighted')
-        except:
-            precision = 0.0
-        try:
-            recall = recall_score(y_test, y_pred, average='weighted')
-        except:
-            recall = 0.0
-        try:
-            f1 = f1_score(y_test, y_pred, average='weighted')
-        except:
-            f1 = 0.0
-        try:
-            confusion = confusion_matrix(y_test, y_pred)
-        except:
-            confusion = np.zeros((dataset.n_classes, dataset.n_classes))
-        try:
-            report = classification_report(y_test, y_pred, output_dict=True)
-        except:
-            report = {}
+        #carga del modelo y evaluacion fuera del event loop
+        metrics = await offloader.run("upload_iteration", evaluate_uploaded_model, model_path, X_test, y_test, label_to_num, dataset.columns_encoder, dataset.n_classes, learning_rate, max_epochs, min_epochs, batch_size, loss_function, optimizer)
     except Exception as e:
         #eliminar el modelo guardado
         os.remove(model_path)
@@ -371,13 +235,7 @@ async def upload_experiment_iteration(
         loss_function=loss_function,
         precompute_rules=precompute_rules,
         force_precompute=force_precompute,
-        accuracy=acc,
-        precision=precision,
-        recall=recall,
-        f1_score=f1,
-        confusion_matrix=confusion.tolist(),
-        classification_report=report,
-        roc_auc=roc,
+        **metrics,
         training_status=Status.COMPLETED,
         training_message="Model uploaded successfully",
         training_start_time=datetime.now(),
@@ -389,6 +247,75 @@ async def upload_experiment_iteration(
     return new_iteration
 
 
+def load_test_split(dataset, dataset_files, test_size, split_seed, shuffle, drop_nulls, drop_duplicates):
+    """
+    Carga el conjunto de prueba con el que se evalúa un modelo subido y codifica sus etiquetas.
+    Las features se codifican al armar la matriz de evaluación.
+    Returns:
+        tuple: (X_test, y_test, label_to_num)
+    """
+    datasets = load_datasets(dataset_files, columns=dataset.columns)
+    label_to_num = None
+    if len(datasets) == 1:
+        X = datasets[0]["data"]
+        X.columns = X.columns.map(str)
+        X = X[dataset.columns]
+        if drop_nulls:
+            X = X.dropna()
+        if drop_duplicates:
+            X = X.drop_duplicates()
+        y = X[dataset.target_column]
+        X = X.drop(columns=[dataset.target_column])
+        encoder = ColumnsEncoder(dataset.columns_encoder)
+        if encoder.encodes(dataset.target_column):
+            y, label_to_num = encoder.encode_target(y, dataset.target_column)
+        _, X_test, _, y_test = train_test_split(X, y, test_size=test_size, random_state=split_seed, shuffle=shuffle)
+    elif len(datasets) == 2:
+        print(datasets[0]["dataset_type"], datasets[1]["dataset_type"])
+        X_test = datasets[1]["data"] if datasets[0]["dataset_type"] == DatasetType.TRAINING else datasets[0]["data"]
+        X_test.columns = X_test.columns.map(str)
+        if drop_nulls:
+            X_test = X_test.dropna()
+        if drop_duplicates:
+            X_test = X_test.drop_duplicates()
+        y_test = X_test[dataset.target_column]
+        X_test = X_test.drop(columns=[dataset.target_column])
+        encoder = ColumnsEncoder(dataset.columns_encoder)
+        if encoder.encodes(dataset.target_column):
+            y_test, label_to_num = encoder.encode_target(y_test, dataset.target_column)
+    else:
+        raise HTTPException(status_code=400, detail="More than 2 dataset files found")
+    if not label_to_num:
+        label_to_num = {str(label): label for label in y_test.unique()}
+    return X_test, y_test, label_to_num
+
+
+def evaluate_uploaded_model(model_path, X_test, y_test, label_to_num, columns_encoder, n_classes, learning_rate, max_epochs, min_epochs, batch_size, loss_function, optimizer):
+    """
+    Carga el modelo subido y calcula sus métricas sobre el conjunto de prueba.
+    """
+    ds = classifier.DSClassifierMultiQ(
+        num_classes=n_classes,
+        lr=learning_rate,
+        max_iter=max_epochs,
+        min_iter=min_epochs,
+        batch_size=batch_size,
+        lossfn=loss_function,
+        optim=optimizer,
+        debug_mode=True,
+        device=settings.DEVICE
+    )
+    parser = DSParser.DSParser()
+    ds.model.load_rules_bin(model_path)
+    for rule in ds.model.preds:
+        parser.lambda_rule_to_json(rule.ld, X_test.columns.tolist())
+    #features codificadas directo a una matriz float32
+    X_test_np = ColumnsEncoder(columns_encoder).feature_matrix(X_test)
+    #una sola pasada del modelo para todas las metricas
+    metrics, _ = evaluate_model(ds, X_test_np, y_test, label_to_num, n_classes)
+    return metrics
+
+
 @api_router.get("/{experiment_id}/metrics")
 async def get_experiment_metrics(
     experiment_id: int, 
@@ -426,8 +353,7 @@ async def get_results(
     if not dataset:
         raise HTTPException(status_code=404, detail="Dataset not found")
     ds_parser = DSParser.DSParser()
-    cr = classifier.DSClassifierMultiQ(dataset.n_classes)
-    cr.model.load_rules_bin(iteration.model_path)
+    cr = model_registry.get(iteration.id, iteration.model_path, dataset.n_classes)
     columns = [x for x in dataset.columns if x != dataset.target_column]
     rules = cr.model.preds
     masses = cr.model._params
@@ -0,0 +1,14 @@
+from fastapi import APIRouter, Depends
+from models import User
+from .auth import get_current_user_from_cookie
+from core.offload import offloader
+
+api_router = APIRouter()
+
+
+@api_router.get("/stats")
+async def offload_stats(current_user: User = Depends(get_current_user_from_cookie)):
+    """
+    Estado del pool de trabajo de CPU de las rutas: ejecuciones en espera y en curso y tiempos por ruta.
+    """
+    return offloader.stats()
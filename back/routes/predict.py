@@ -6,6 +6,7 @@ from sklearn.calibration import LabelEncoder
 from sklearn.model_selection import train_test_split
 from sqlalchemy.orm import Session
 from utils.sanitize import sanitize_json
+from utils.encoding import ColumnsEncoder
 from database import get_db
 from models import User, Experiment, DatasetFile, Datasets, Iteration
 from models.dataset_file import FileType, DatasetType
@@ -15,6 +16,8 @@ from core.config import settings
 import pandas as pd
 import numpy as np
 from dsmodels import classifier
+from dsmodels.registry import model_registry
+from core.offload import offloader
 api_router = APIRouter()
 
 
@@ -37,10 +40,8 @@ async def predict(
     if not dataset:
         raise HTTPException(status_code=404, detail="Dataset not found")
     data = await request.json()
-    print("Data received for prediction:", data)
     try:
-        model = classifier.DSClassifierMultiQ(num_classes=dataset.n_classes)
-        model.model.load_rules_bin(iteration.model_path)
+        model = model_registry.get(iteration.id, iteration.model_path, dataset.n_classes)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error loading model: {str(e)}")
     columns = [col.strip() for col in dataset.columns if col != dataset.target_column]
@@ -49,27 +50,27 @@ async def predict(
     df = pd.DataFrame(data["predictData"], columns=columns)
     if df.empty:
         raise HTTPException(status_code=404, detail="No data provided for prediction")
-    columnEncoder = dataset.columns_encoder 
-    df.columns = df.columns.map(str)
-    for key, column_encoder in columnEncoder.items():
-        if key in df.columns:
-            df[key] = df[key].replace(column_encoder)
-    df.replace("", np.nan, inplace=True)
-    #convertir a numérico donde sea posible
-    for col in df.select_dtypes(include=['object']).columns:
-        df[col] = pd.to_numeric(df[col], errors='ignore')
     try:
-        print("Data for prediction:\n", df)
+        #codificacion y forward de todo el batch fuera del event loop
+        probabilities, classes, rules = await offloader.run("predict", explain_rows, model, df, dataset.columns_encoder)
         predictions = []
-        for _, row in df.iterrows():
-            pred = model.predict_explain(row.to_numpy())
-            print("Prediction:", pred[2], type(pred[2]))
+        for i in range(len(classes)):
             predictions.append({
-                "class": int(pred[1]),
-                "probabilities": sanitize_json(pred[0].tolist()),
-                "rules": pred[2].to_dict("records")
+                "class": int(classes[i]),
+                "probabilities": sanitize_json(probabilities[i].tolist()),
+                "rules": rules[i]
             })
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error during prediction: {str(e)}")
 
-    return {"predictions": sanitize_json(predictions), "labels": iteration.label_encoder}
\ No newline at end of file
+    return {"predictions": sanitize_json(predictions), "labels": iteration.label_encoder}
+
+
+def explain_rows(model, df, columnEncoder):
+    """
+    Codifica las filas a predecir y las evalúa en un solo forward, con las reglas que aplican.
+    """
+    df.columns = df.columns.map(str)
+    #columnas categoricas codificadas y el resto convertido a numero, los vacios quedan como NaN
+    X = ColumnsEncoder(columnEncoder).feature_matrix(df)
+    return model.predict_explain_batch(X)
\ No newline at end of file
@@ -7,10 +7,13 @@ from sqlalchemy.orm import Session
 from database import get_db
 from .auth import get_current_user_from_cookie
 from dsmodels import classifier, DSParser
+from dsmodels.registry import model_registry
 import numpy as np
 from models.dataset_file import DatasetType
 from sklearn.model_selection import train_test_split
 from utils.loadDataset import load_datasets
+from utils.encoding import ColumnsEncoder
+from core.offload import offloader
 
 api_router = APIRouter()
 
@@ -22,101 +25,106 @@ async def generate_rules(
     current_user: User = Depends(get_current_user_from_cookie)
 ):
     try:
-        selectedColumns = rule_params.selectedColumns
-        breakRules = rule_params.breakRules
-        singleRule = rule_params.singleRule
-        multipleRule = rule_params.multipleRule
-        dropNulls = rule_params.dropNulls
-        dropDuplicates = rule_params.dropDuplicates
-        testSize = rule_params.testSize
-        splitSeed = rule_params.splitSeed
-        shuffle = rule_params.shuffle
         dataset_files = db.query(DatasetFile).join(Datasets).join(Experiment).filter(Experiment.id == experiment_id, Experiment.user_id == current_user.id).all()
         if not dataset_files:
             raise HTTPException(status_code=404, detail="No dataset files found for this experiment")
         dataset = db.query(Datasets).join(Experiment).filter(Experiment.id == experiment_id, Experiment.user_id == current_user.id).first()
-        datasets = load_datasets(dataset_files, datasetTypes=[DatasetType.TRAINING, DatasetType.ALL], columns=dataset.columns)
-        if not datasets:
-            raise HTTPException(status_code=404, detail="No training dataset found for this experiment")
-        X = datasets[0]["data"]
-        if dropNulls:
-            X = X.dropna()
-            if X.empty:
-                raise HTTPException(status_code=400, detail="Dataset is empty after dropping nulls")
-        if dropDuplicates:
-            X = X.drop_duplicates()
-            if X.empty:
-                raise HTTPException(status_code=400, detail="Dataset is empty after dropping duplicates")
-        if len(dataset_files) == 1: # Si solo hay un archivo, hacemos el split
-            X, _ = train_test_split(X, test_size=testSize, random_state=splitSeed, shuffle=shuffle)
-        dataset = db.query(Datasets).join(Experiment).filter(Experiment.id == experiment_id, Experiment.user_id == current_user.id).first()
-        columnEncoder = dataset.columns_encoder # dict para pasar las columnas categoricas a numeros
         if not dataset:
             raise HTTPException(status_code=404, detail="Dataset not found")
-        X.columns = X.columns.map(str)
-        #nos quedamos con selectedColumns
-        X = X[selectedColumns]
-        for key, column_encoder in dataset.columns_encoder.items():
-            if key in X.columns:
-                X[key] = X[key].map(column_encoder)
-        X_np = X.to_numpy()
         # Get the experiment from the database
         experiment = db.query(Experiment).filter(Experiment.id == experiment_id).first()
         if not experiment:
             raise HTTPException(status_code=404, detail="Experiment not found")
-
-        # Generate rules using the DSParser
-        ds_parser = DSParser.DSParser()
-        cr = classifier.DSClassifierMultiQ(dataset.n_classes)
-        if singleRule:
-            cr.model.generate_statistic_single_rules(X_np, breakRules, selectedColumns)
-        if multipleRule:
-            cr.model.generate_mult_pair_rules(X_np, selectedColumns)
-        rules = cr.model.preds
-        masses = cr.model._params
-        masses = [m.tolist() for m in masses]  # Convertir a float para JSON serializable
-        #redondear masses a 3 decimales
-        for i in range(len(masses)):
-            mass = masses[i]
-            mass = [round(m, 3) for m in mass]
-            # la ultima masa se ajusta para que todas sumen 1
-            mass[-1] = round(1 - sum(mass[:-1]), 3)
-            masses[i] = mass
-
-        encoded_rules = []
-        labels = []
-        for rule in rules:
-            coverage = X.apply(rule.ld, axis=1).sum()
-            if coverage == 0:
-                continue # Saltar reglas que no cubren ningun caso
-            vars = rule.ld.__defaults__
-            #pasamos los valores np.float a float
-            vars = [float(v) if isinstance(v, np.float64) else v for v in vars]
-            lambda_fn = ds_parser.lambda_rule_to_json(rule.ld, vars)
-            encoded_rules.append(lambda_fn)
-            #manejamos los labels para que aquellos en que la regla se haya aplicado label encoder se vea el valor original
-            index = False
-            for key, column_encoder in dataset.columns_encoder.items():
-                if key in rule.caption:
-                    #separamos en signo igual
-                    parts = rule.caption.split("=")
-                    if len(parts) == 2:
-                        labels.append(f"{parts[0]} = {list(column_encoder.keys())[list(column_encoder.values()).index(int(float(parts[1].strip())))]}")
-                        index = True
-                    break
-            if not index:
-                labels.append(rule.caption)
-        for rule, vars in encoded_rules:
-            keys = ds_parser.json_index(rule, vars)
-            #elimina duplicados
-            keys = list(set(keys))
-            for key in keys:
-                value = vars.get(key, None)
-                vars[key] = selectedColumns[value] if value is not None and value < len(selectedColumns) else value
-        return sanitize_json({"rules": encoded_rules, "masses": masses, "labels": labels, "columnsEncoder": columnEncoder})
+        #la carga del dataset y la generacion de reglas corren fuera del event loop
+        return await offloader.run("generate_rules", generate_rules_data, rule_params, dataset_files, dataset.columns, dataset.columns_encoder, dataset.n_classes)
     except Exception as e:
         print("Error generating rules:", e)
         raise HTTPException(status_code=500, detail=f"Error generating rules: {e}")
+
+
+def generate_rules_data(rule_params, dataset_files, dataset_columns, columnEncoder, n_classes):
+    """
+    Genera las reglas sobre el split de entrenamiento y las codifica como JSON.
+    """
+    selectedColumns = rule_params.selectedColumns
+    breakRules = rule_params.breakRules
+    singleRule = rule_params.singleRule
+    multipleRule = rule_params.multipleRule
+    dropNulls = rule_params.dropNulls
+    dropDuplicates = rule_params.dropDuplicates
+    testSize = rule_params.testSize
+    splitSeed = rule_params.splitSeed
+    shuffle = rule_params.shuffle
+    datasets = load_datasets(dataset_files, datasetTypes=[DatasetType.TRAINING, DatasetType.ALL], columns=dataset_columns)
+    if not datasets:
+        raise HTTPException(status_code=404, detail="No training dataset found for this experiment")
+    X = datasets[0]["data"]
+    if dropNulls:
+        X = X.dropna()
+        if X.empty:
+            raise HTTPException(status_code=400, detail="Dataset is empty after dropping nulls")
+    if dropDuplicates:
+        X = X.drop_duplicates()
+        if X.empty:
+            raise HTTPException(status_code=400, detail="Dataset is empty after dropping duplicates")
+    if len(dataset_files) == 1: # Si solo hay un archivo, hacemos el split
+        X, _ = train_test_split(X, test_size=testSize, random_state=splitSeed, shuffle=shuffle)
+    X.columns = X.columns.map(str)
+    #nos quedamos con selectedColumns
+    X = X[selectedColumns]
+    X = ColumnsEncoder(columnEncoder).transform(X)
+    X_np = X.to_numpy()
+
+    # Generate rules using the DSParser
+    ds_parser = DSParser.DSParser()
+    cr = classifier.DSClassifierMultiQ(n_classes)
+    if singleRule:
+        cr.model.generate_statistic_single_rules(X_np, breakRules, selectedColumns)
+    if multipleRule:
+        cr.model.generate_mult_pair_rules(X_np, selectedColumns)
+    rules = cr.model.preds
+    masses = cr.model._params
+    masses = [m.tolist() for m in masses]  # Convertir a float para JSON serializable
+    #redondear masses a 3 decimales
+    for i in range(len(masses)):
+        mass = masses[i]
+        mass = [round(m, 3) for m in mass]
+        # la ultima masa se ajusta para que todas sumen 1
+        mass[-1] = round(1 - sum(mass[:-1]), 3)
+        masses[i] = mass
+
+    encoded_rules = []
+    labels = []
+    #cobertura de todas las reglas en una sola evaluación por columnas
+    coverages = cr.rule_activation_matrix(X_np).getnnz(axis=0)
+    for rule, coverage in zip(rules, coverages):
+        if coverage == 0:
+            continue # Saltar reglas que no cubren ningun caso
+        vars = rule.ld.__defaults__
+        #pasamos los valores np.float a float
+        vars = [float(v) if isinstance(v, np.float64) else v for v in vars]
+        lambda_fn = ds_parser.lambda_rule_to_json(rule.ld, vars)
+        encoded_rules.append(lambda_fn)
+        #manejamos los labels para que aquellos en que la regla se haya aplicado label encoder se vea el valor original
+        index = False
+        for key, column_encoder in columnEncoder.items():
+            if key in rule.caption:
+                #separamos en signo igual
+                parts = rule.caption.split("=")
+                if len(parts) == 2:
+                    labels.append(f"{parts[0]} = {list(column_encoder.keys())[list(column_encoder.values()).index(int(float(parts[1].strip())))]}")
+                    index = True
+                break
+        if not index:
+            labels.append(rule.caption)
+    for rule, vars in encoded_rules:
+        keys = ds_parser.json_index(rule, vars)
+        #elimina duplicados
+        keys = list(set(keys))
+        for key in keys:
+            value = vars.get(key, None)
+            vars[key] = selectedColumns[value] if value is not None and value < len(selectedColumns) else value
+    return sanitize_json({"rules": encoded_rules, "masses": masses, "labels": labels, "columnsEncoder": columnEncoder})
     
     
 @api_router.post("/coverage/{experiment_id}")
@@ -131,27 +139,30 @@ async def coverage_rules(
         if not dataset_files:
             raise HTTPException(status_code=404, detail="No dataset files found for this experiment")
         dataset = db.query(Datasets).join(Experiment).filter(Experiment.id == experiment_id, Experiment.user_id == current_user.id).first()
-        datasets = load_datasets(dataset_files, datasetTypes=[DatasetType.TRAINING, DatasetType.ALL], columns=dataset.columns)
-        if not datasets:
-            raise HTTPException(status_code=404, detail="No training dataset found for this experiment")
-        X = datasets[0]["data"]
-        dataset = db.query(Datasets).join(Experiment).filter(Experiment.id == experiment_id, Experiment.user_id == current_user.id).first()
-        columnEncoder = dataset.columns_encoder # dict para pasar las columnas categoricas a numeros
         if not dataset:
             raise HTTPException(status_code=404, detail="Dataset not found")
-        #aplicamos columnEncoder
-        for key, column_encoder in columnEncoder.items():
-            if key in X.columns:
-                X[key] = X[key].map(column_encoder)
-        ds_parser = DSParser.DSParser()
-        fn = ds_parser.json_to_lambda(rule["rule"], X.columns.tolist())
-        #calculamos el numero de filas que cumplen la regla
-        coverage = X.apply(fn, axis=1).sum()
-        return {"coverage": int(coverage), "total": len(X), "percentage": round(coverage / len(X) * 100, 2)}
+        return await offloader.run("coverage", coverage_data, rule, dataset_files, dataset.columns, dataset.columns_encoder)
     except Exception as e:
         print("Error calculating coverage:", e)
         raise HTTPException(status_code=500, detail="Error calculating coverage")
 
+
+def coverage_data(rule, dataset_files, dataset_columns, columnEncoder):
+    """
+    Filas del dataset de entrenamiento que cumplen la regla.
+    """
+    datasets = load_datasets(dataset_files, datasetTypes=[DatasetType.TRAINING, DatasetType.ALL], columns=dataset_columns)
+    if not datasets:
+        raise HTTPException(status_code=404, detail="No training dataset found for this experiment")
+    X = datasets[0]["data"]
+    #aplicamos columnEncoder
+    X = ColumnsEncoder(columnEncoder).transform(X)
+    ds_parser = DSParser.DSParser()
+    fn = ds_parser.json_to_mask(rule["rule"], X.columns.tolist())
+    #calculamos el numero de filas que cumplen la regla
+    coverage = int(fn(X).sum())
+    return {"coverage": int(coverage), "total": len(X), "percentage": round(coverage / len(X) * 100, 2)}
+
     
 @api_router.get("/iteration/{iteration_id}")
 async def get_iteration_rules(
@@ -164,8 +175,7 @@ async def get_iteration_rules(
     path = iteration.model_path
     if not path or path == "":
         raise HTTPException(status_code=404, detail="Model not found for this iteration")
-    model = classifier.DSClassifierMultiQ(dataset.n_classes)
-    model.model.load_rules_bin(path)
+    model = model_registry.get(iteration.id, path, dataset.n_classes)
     rules = []
     for i in range(len(model.model.preds)):
         rules.append({
@@ -1,4 +1,8 @@
+import itertools
 import json
+import os
+import uuid
+import pandas as pd
 from fastapi import APIRouter, Depends, HTTPException, Request, WebSocket, WebSocketDisconnect
 from sklearn.calibration import LabelEncoder
 from sklearn.model_selection import train_test_split
@@ -12,48 +16,53 @@ from .auth import get_current_user_from_cookie
 from datetime import datetime
 from core.config import settings
 import asyncio
-import threading
-from dsmodels.train import train_model
+from core.executor import create_executor, STOP_MESSAGE
+from core.jobQueue import JobQueue
+from core.progressBus import progress_bus
+from core.offload import offloader
+from dsmodels.train import train_model, train_fold, precompute_activations, fail_expired_job
 from utils.loadDataset import load_datasets
+from utils.encoding import ColumnsEncoder
+from utils.trainingData import save_split, remove_split, save_folds, fold_assignment
 
 api_router = APIRouter()
 
+# hiperparámetros que se pueden barrer, comparten datos y reglas
+SWEEP_PARAMS = ["learningRate", "batchSize", "optimFunction", "lossFunction"]
+
 
 # --------------------------
-# Worker que procesa la cola
+# Workers que procesan la cola
 # --------------------------
-def worker_loop():
-    while True:
-        func, args, task_id = settings.TASK_QUEUE.get()
-        try:
-            print(f"Starting task {task_id}")
-            func(*args, tasks_id=task_id)
-        except Exception as e:
-            print(f"Error en worker: {e}")
-        finally:
-            settings.TASK_QUEUE.task_done()
-
-
-# Lanzar los workers en threads separados
-for _ in range(settings.MAX_WORKERS):
-    t = threading.Thread(target=worker_loop, daemon=True)
-    t.start()
-    
+# los trabajos pendientes de una ejecución anterior se retoman al iniciar
+job_queue = JobQueue(
+    settings.JOB_QUEUE_URL,
+    lease_seconds=settings.JOB_LEASE_SECONDS,
+    max_jobs_per_user=settings.MAX_JOBS_PER_USER,
+    max_attempts=settings.JOB_MAX_ATTEMPTS,
+    on_failed=fail_expired_job,
+)
+training_executor = create_executor(settings.TRAIN_EXECUTOR, job_queue, settings.MAX_WORKERS)
+training_executor.start()
 
-@api_router.post("/train-model/{experiment_id}")
-async def train_model_post(
-    experiment_id: int,
-    request: Request,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user_from_cookie)
-):
-    data = await request.json()
-    dataset = db.query(Datasets).join(Experiment).filter(Experiment.id == experiment_id, Experiment.user_id == current_user.id).first()
-    if not dataset:
-        raise HTTPException(status_code=404, detail="Dataset not found")
-    dataset_files = db.query(DatasetFile).join(Datasets).join(Experiment).filter(Experiment.id == experiment_id, Experiment.user_id == current_user.id).all()
-    if not dataset_files:
-        raise HTTPException(status_code=404, detail="No dataset files found for this experiment")
+
+def enqueued_message(max_epochs):
+    return json.dumps({
+        "epoch": 0,
+        "loss": 0,
+        "max": max_epochs,
+        "status": "Task enqueued",
+        "time": 0,
+        "eta": 0
+        })
+
+
+def load_training_split(data, dataset, dataset_files):
+    """
+    Carga los archivos del dataset, aplica la limpieza pedida y codifica las columnas.
+    Returns:
+        tuple: (X_train, X_test, y_train, y_test, label_to_num)
+    """
     datasets = load_datasets(dataset_files, columns=dataset.columns)
     drop_na = data.get("dropNulls", True)
     drop_duplicates = data.get("dropDuplicates", True)
@@ -75,13 +84,10 @@ async def train_model_post(
                 raise HTTPException(status_code=400, detail="Dataset is empty after dropping duplicates")
         y = X[dataset.target_column]
         X = X.drop(columns=[dataset.target_column])
-        for key, column_encoder in dataset.columns_encoder.items():
-            if key in X.columns:
-                X[key] = X[key].replace(column_encoder)
-            if key == dataset.target_column:
-                y = y.astype(str)
-                y = y.replace(column_encoder)
-                label_to_num = {label: num for label, num in column_encoder.items()}
+        encoder = ColumnsEncoder(dataset.columns_encoder)
+        X = encoder.transform(X)
+        if encoder.encodes(dataset.target_column):
+            y, label_to_num = encoder.encode_target(y, dataset.target_column)
         
         X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=test_size, random_state=split_seed, shuffle=shuffle)
     elif len(datasets) == 2:
@@ -103,28 +109,61 @@ async def train_model_post(
         y_test = X_test[dataset.target_column]
         X_train = X_train.drop(columns=[dataset.target_column])
         X_test = X_test.drop(columns=[dataset.target_column])
-        for key, column_encoder in dataset.columns_encoder.items():
-            if key in X_test.columns:
-                X_test[key] = X_test[key].replace(column_encoder)
-                X_train[key] = X_train[key].replace(column_encoder)
-            if key == dataset.target_column:
-                y_test = y_test.astype(str)
-                y_train = y_train.astype(str)
-                y_test = y_test.replace(column_encoder)
-                y_train = y_train.replace(column_encoder)
-                label_to_num = {label: num for label, num in column_encoder.items()}
+        encoder = ColumnsEncoder(dataset.columns_encoder)
+        X_train = encoder.transform(X_train)
+        X_test = encoder.transform(X_test)
+        if encoder.encodes(dataset.target_column):
+            y_train, label_to_num = encoder.encode_target(y_train, dataset.target_column)
+            y_test, _ = encoder.encode_target(y_test, dataset.target_column)
     else:
-        return HTTPException(status_code=400, detail="More than 2 dataset files found")
+        raise HTTPException(status_code=400, detail="More than 2 dataset files found")
     
     if not label_to_num:
         label_to_num = {str(label): label for label in y_train.unique()}
-    max_epochs = data.get("maxEpochs", 100)
-    min_epochs = data.get("minEpochs", 10)
-    batch_size = data.get("batchSize", 4000)
-    loss_function = data.get("lossFunction", "MSE").upper()
-    optim_function = data.get("optimFunction", "adam").lower()
-    learning_rate = data.get("learningRate", 0.001)
-    min_dloss = data.get("minDloss", 0.0001)
+    return X_train, X_test, y_train, y_test, label_to_num
+
+
+def training_params(data):
+    """
+    Hiperparámetros de entrenamiento de la request, con los nombres de train_model.
+    """
+    params = {
+        "max_iter": data.get("maxEpochs", 100),
+        "min_iter": data.get("minEpochs", 10),
+        "batch_size": data.get("batchSize", 4000),
+        "loss_function": data.get("lossFunction", "MSE").upper(),
+        "optimizer": data.get("optimFunction", "adam").lower(),
+        "learning_rate": data.get("learningRate", 0.001),
+        "min_dloss": data.get("minDloss", 0.0001),
+        "validation_size": data.get("validationSize", 0.0),
+        "patience": data.get("patience", None),
+        "validation_every": data.get("validationEvery", 1),
+        "shuffle_batches": bool(data.get("shuffleBatches", False)),
+    }
+    if params["validation_size"] < 0 or params["validation_size"] >= 1:
+        raise HTTPException(status_code=400, detail="Validation size must be between 0 and 1")
+    if params["patience"] is not None and params["patience"] <= 0:
+        raise HTTPException(status_code=400, detail="Patience must be positive")
+    if params["validation_every"] <= 0:
+        raise HTTPException(status_code=400, detail="Validation interval must be positive")
+    return params
+
+
+def job_priority(data):
+    """
+    Prioridad en la cola pedida por el usuario, un entero entre 0 y MAX_JOB_PRIORITY para que
+    nadie pase por delante de todos los demás usuarios.
+    """
+    priority = data.get("priority", 0)
+    if not isinstance(priority, int) or isinstance(priority, bool) or priority < 0 or priority > settings.MAX_JOB_PRIORITY:
+        raise HTTPException(status_code=400, detail=f"Priority must be an integer between 0 and {settings.MAX_JOB_PRIORITY}")
+    return priority
+
+
+def training_rules(data):
+    """
+    Reglas de la request como tuplas (condición, masa, etiqueta).
+    """
     rules = data.get("rules", [])
     masses = data.get("masses", [])
     labels = data.get("labels", [])
@@ -132,96 +171,289 @@ async def train_model_post(
         raise HTTPException(status_code=404, detail="No rules provided for training")
     if len(rules) != len(masses) or len(rules) != len(labels) or len(masses) != len(labels):
         raise HTTPException(status_code=404, detail="The rules are bad")
-    rules = zip(rules, masses, labels)
-    
+    return list(zip(rules, masses, labels))
+
+
+def create_iteration(db, experiment_id, data, params, rules, label_to_num, warm_start_id=None, folds=None):
+    """
+    Crea la iteración pendiente de un entrenamiento.
+    """
     iteration = Iteration(
         created_at=datetime.now(),
         experiment_id=experiment_id,
         trained = False,
         model_path = "",
-        train_test_split = test_size,
-        train_test_split_seed = split_seed,
-        shuffle = shuffle,
-        delete_nulls = drop_na,
-        drop_duplicates = drop_duplicates,
-        min_epochs = min_epochs,
-        max_epochs = max_epochs,
-        batch_size = batch_size,
-        loss_function = loss_function,
-        optimizer = optim_function,
-        learning_rate = learning_rate,
-        min_dloss = min_dloss,
+        train_test_split = data.get("testSize", 0.2),
+        train_test_split_seed = data.get("splitSeed", 42),
+        shuffle = data.get("shuffle", True),
+        delete_nulls = data.get("dropNulls", True),
+        drop_duplicates = data.get("dropDuplicates", True),
+        min_epochs = params["min_iter"],
+        max_epochs = params["max_iter"],
+        batch_size = params["batch_size"],
+        loss_function = params["loss_function"],
+        optimizer = params["optimizer"],
+        learning_rate = params["learning_rate"],
+        min_dloss = params["min_dloss"],
+        validation_size = params["validation_size"],
+        patience = params["patience"],
+        validation_every = params["validation_every"],
+        shuffle_batches = params["shuffle_batches"],
+        initial_rules = sanitize_json([{"rule": rule, "mass": mass, "label": label} for rule, mass, label in rules]),
+        warm_start_iteration_id = warm_start_id,
+        folds = folds,
         training_status = Status.PENDING,
         label_encoder = sanitize_json(label_to_num)
     )
     db.add(iteration)
     db.commit()
     db.refresh(iteration)
+    return iteration
+
+
+def save_shared_split(name, X_train, X_test, y_train, y_test, rules, n_classes, folds=None, seed=42):
+    """
+    Guarda un split compartido por varios entrenamientos, con las activaciones de las reglas
+    y, para una validación cruzada, la asignación de folds sobre X_train.
+    Returns:
+        str: Carpeta del split.
+    """
+    data_path = save_split(os.path.join(settings.JOBS_FOLDER, f"{name}_{uuid.uuid4().hex}"), X_train, X_test, y_train, y_test)
+    try:
+        if folds is not None:
+            save_folds(data_path, fold_assignment(y_train, folds, seed))
+        precompute_activations(data_path, rules, n_classes)
+    except Exception as e:
+        remove_split(data_path)
+        raise HTTPException(status_code=400, detail=f"Error evaluating the rules: {e}")
+    return data_path
+
+
+def save_cv_split(X_train, X_test, y_train, y_test, all_rows, rules, n_classes, folds, seed=42):
+    """
+    Guarda el split compartido de una validación cruzada, ver save_shared_split.
+    Args:
+        all_rows (bool): Si es True los folds cubren también las filas de X_test.
+    Returns:
+        str: Carpeta del split.
+    """
+    if all_rows:
+        X_train, y_train = pd.concat([X_train, X_test]), pd.concat([y_train, y_test])
+    return save_shared_split("cv", X_train, X_train.iloc[:0], y_train, y_train.iloc[:0], rules, n_classes, folds, seed)
+
+
+@api_router.post("/train-model/{experiment_id}")
+async def train_model_post(
+    experiment_id: int,
+    request: Request,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user_from_cookie)
+):
+    data = await request.json()
+    dataset = db.query(Datasets).join(Experiment).filter(Experiment.id == experiment_id, Experiment.user_id == current_user.id).first()
+    if not dataset:
+        raise HTTPException(status_code=404, detail="Dataset not found")
+    dataset_files = db.query(DatasetFile).join(Datasets).join(Experiment).filter(Experiment.id == experiment_id, Experiment.user_id == current_user.id).all()
+    if not dataset_files:
+        raise HTTPException(status_code=404, detail="No dataset files found for this experiment")
+    priority = job_priority(data)
+    X_train, X_test, y_train, y_test, label_to_num = await offloader.run("train", load_training_split, data, dataset, dataset_files)
+    params = training_params(data)
+    rules = training_rules(data)
+    #continuar desde el modelo de una iteracion anterior del mismo experimento
+    warm_start_id = data.get("warmStartIteration", None)
+    warm_start_path = None
+    warm_start_rules = None
+    if warm_start_id is not None:
+        previous = db.query(Iteration).join(Experiment).filter(
+            Iteration.id == warm_start_id,
+            Iteration.experiment_id == experiment_id,
+            Experiment.user_id == current_user.id
+        ).first()
+        if not previous:
+            raise HTTPException(status_code=404, detail="Warm start iteration not found")
+        if not previous.trained or not previous.model_path or not os.path.exists(previous.model_path):
+            raise HTTPException(status_code=400, detail="Warm start iteration has no trained model")
+        warm_start_path = previous.model_path
+        if previous.initial_rules is not None:
+            warm_start_rules = [(r["rule"], r["mass"], r["label"]) for r in previous.initial_rules]
+    #validacion cruzada en k folds en vez de un unico split
+    folds = data.get("folds", None)
+    if folds is not None:
+        #un texto o un float llegaría a range() y fallaría con un error 500
+        if not isinstance(folds, int) or isinstance(folds, bool) or folds < 2 or folds > settings.MAX_FOLDS:
+            raise HTTPException(status_code=400, detail=f"Folds must be between 2 and {settings.MAX_FOLDS}")
+        if warm_start_id is not None:
+            raise HTTPException(status_code=400, detail="Warm start is not supported with cross validation")
+        #con un archivo los folds cubren todas las filas, con dos solo el archivo de entrenamiento
+        all_rows = len(dataset_files) == 1
+        if folds > len(y_train) + (len(y_test) if all_rows else 0):
+            raise HTTPException(status_code=400, detail="More folds than rows in the dataset")
+        data_path = await offloader.run("train", save_cv_split, X_train, X_test, y_train, y_test, all_rows, rules,
+                                        dataset.n_classes, folds, data.get("splitSeed", 42))
+
+    iteration = create_iteration(db, experiment_id, data, params, rules, label_to_num, warm_start_id, folds)
     task_id = str(iteration.id)
-    # Encolar el entrenamiento
-    settings.TASK_QUEUE.put((train_model, (
-        X_train,
-        X_test,
-        y_train,
-        y_test,
-        max_epochs,
-        min_epochs,
-        batch_size,
-        loss_function,
-        optim_function,
-        learning_rate,
-        min_dloss,
-        rules,
-        dataset.n_classes,
-        label_to_num,
-        db,
-    ), task_id))
-    settings.TASKS_PROGRESS[task_id] = json.dumps({
-        "epoch": 0,
-        "loss": 0,
-        "max": max_epochs,
-        "status": "Task enqueued",
-        "time": 0,
-        "eta": 0
-        })
+    progress_bus.publish(task_id, enqueued_message(params["max_iter"]))
+    if folds is not None:
+        # Encolar un trabajo por fold, que corren en paralelo sobre el mismo split; se encolan
+        # juntos para que un fold que termina antes no elimine el split de los demás
+        training_executor.submit_many(train_fold, [({
+            **params,
+            "fold": fold,
+            "folds": folds,
+            "rules": rules,
+            "n_classes": dataset.n_classes,
+            "label_to_num": label_to_num,
+            }, task_id) for fold in range(folds)], data_path, user_id=current_user.id, priority=priority)
+        return {"task_id": task_id, "status": "Task enqueued"}
+    # Encolar el entrenamiento, submit escribe el split en disco
+    await offloader.run("train", training_executor.submit, train_model, {
+        "data": (X_train, X_test, y_train, y_test),
+        **params,
+        "rules": rules,
+        "n_classes": dataset.n_classes,
+        "label_to_num": label_to_num,
+        "warm_start_path": warm_start_path,
+        "warm_start_rules": warm_start_rules,
+    }, task_id, user_id=current_user.id, priority=priority)
     return {"task_id": task_id, "status": "Task enqueued"}
 
 
+@api_router.post("/sweep/{experiment_id}")
+async def sweep_post(
+    experiment_id: int,
+    request: Request,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user_from_cookie)
+):
+    """
+    Barrido de hiperparámetros: una iteración por cada punto de la grilla "grid".
+    Los datos se cargan, codifican y dividen una sola vez y las activaciones de las reglas
+    se calculan una vez; todos los entrenamientos leen el mismo split.
+    """
+    data = await request.json()
+    dataset = db.query(Datasets).join(Experiment).filter(Experiment.id == experiment_id, Experiment.user_id == current_user.id).first()
+    if not dataset:
+        raise HTTPException(status_code=404, detail="Dataset not found")
+    dataset_files = db.query(DatasetFile).join(Datasets).join(Experiment).filter(Experiment.id == experiment_id, Experiment.user_id == current_user.id).all()
+    if not dataset_files:
+        raise HTTPException(status_code=404, detail="No dataset files found for this experiment")
+    grid = data.get("grid", {})
+    if not grid or not isinstance(grid, dict):
+        raise HTTPException(status_code=400, detail="A parameter grid is required")
+    for key, values in grid.items():
+        if key not in SWEEP_PARAMS:
+            raise HTTPException(status_code=400, detail=f"Parameter {key} cannot be swept")
+        if not isinstance(values, list) or len(values) == 0:
+            raise HTTPException(status_code=400, detail=f"Parameter {key} needs a non empty list of values")
+    points = [dict(zip(grid.keys(), values)) for values in itertools.product(*grid.values())]
+    if len(points) > settings.MAX_SWEEP_POINTS:
+        raise HTTPException(status_code=400, detail=f"The sweep has more than {settings.MAX_SWEEP_POINTS} configurations")
+    priority = job_priority(data)
+    rules = training_rules(data)
+    #validar todos los puntos antes de crear iteraciones
+    configs = [training_params({**data, **point}) for point in points]
+    X_train, X_test, y_train, y_test, label_to_num = await offloader.run("sweep", load_training_split, data, dataset, dataset_files)
+    #split y activaciones compartidos por todos los entrenamientos del barrido
+    data_path = await offloader.run("sweep", save_shared_split, "sweep", X_train, X_test, y_train, y_test, rules, dataset.n_classes)
+    jobs = []
+    for params in configs:
+        iteration = create_iteration(db, experiment_id, data, params, rules, label_to_num)
+        task_id = str(iteration.id)
+        progress_bus.publish(task_id, enqueued_message(params["max_iter"]))
+        jobs.append(({
+            **params,
+            "rules": rules,
+            "n_classes": dataset.n_classes,
+            "label_to_num": label_to_num,
+        }, task_id))
+    #todos los puntos se encolan juntos, el split se elimina cuando termina el último
+    training_executor.submit_many(train_model, jobs, data_path, user_id=current_user.id, priority=priority)
+    task_ids = [task_id for _, task_id in jobs]
+    return {"task_ids": task_ids, "status": "Sweep enqueued"}
+
+
+def final_message(iteration):
+    """
+    Último mensaje de progreso de una iteración que ya terminó.
+    Returns:
+        str | None: Mensaje, o None si la iteración no terminó.
+    """
+    if iteration.training_status == Status.COMPLETED:
+        return "Training finished ✅"
+    if iteration.training_status == Status.STOPPED:
+        return STOP_MESSAGE
+    if iteration.training_status == Status.ERROR:
+        return f"Error during training: {iteration.training_message}"
+    return None
+
+
 @api_router.websocket("/ws/{task_id}")
 async def websocket_endpoint(websocket: WebSocket, task_id: str, db: Session = Depends(get_db)):
     await websocket.accept()
+    # el progreso se recibe por el bus, solo cuando cambia
+    updates = progress_bus.subscribe(task_id)
+    receiver = asyncio.ensure_future(websocket.receive_text())
+    update = asyncio.ensure_future(updates.get())
+    finished = False
     try:
-        while True:
-            try:
-                data = await asyncio.wait_for(websocket.receive_text(), timeout=1.0)
-                if data == "stop":
-                    data = {
-                        "status": "Training stopped by user"
-                    }
-                    settings.TASKS_PROGRESS[task_id] = json.dumps(data)
-            except asyncio.TimeoutError:
-                pass
-            # Enviar estado actual
-            status = settings.TASKS_PROGRESS.get(task_id, "Task not found or finished")
-            #manejar caso en que no haya estado y task queue este vacia
-            if status == "Task not found or finished" and settings.TASK_QUEUE.empty():
+        if progress_bus.get(task_id) is None:
+            #tareas retomadas de la cola persistente que aun no reportan progreso; en una validacion
+            #cruzada el ultimo fold puede haber terminado mientras otros siguen pendientes
+            if job_queue.is_pending(task_id):
+                job = job_queue.get(task_id)
+                progress_bus.publish(task_id, enqueued_message(job.payload.get("max_iter", 0)))
+            else:
+                iteration = db.query(Iteration).filter(Iteration.id == int(task_id)).first()
+                #la tarea ya terminó y su estado se olvidó, se responde desde la iteración
+                status = final_message(iteration) if iteration else None
+                if status is not None:
+                    await websocket.send_text(status)
+                    await websocket.close()
+                    return
+                #manejar caso en que no haya estado ni trabajo pendiente en la cola
                 status = "Error: Task not found"
                 #actualizamos el estado en la base de datos
-                iteration = db.query(Iteration).filter(Iteration.id == int(task_id)).first()
                 if iteration:
                     iteration.training_status = Status.ERROR
                     iteration.training_end_time = datetime.now()
                     iteration.training_message = status
                     db.commit()
-            await websocket.send_text(status)
-            if status.startswith("Training finished") or status.startswith("Error"):
-                if task_id in settings.TASKS_PROGRESS:
-                    del settings.TASKS_PROGRESS[task_id]
-                break
-            await asyncio.sleep(1)
-        await websocket.close() 
+                await websocket.send_text(status)
+                await websocket.close()
+                return
+        last_status = None
+        while True:
+            done, _ = await asyncio.wait({receiver, update}, return_when=asyncio.FIRST_COMPLETED)
+            if receiver in done:
+                data = receiver.result()
+                receiver = asyncio.ensure_future(websocket.receive_text())
+                if data == "stop":
+                    progress_bus.request_stop(task_id, STOP_MESSAGE)
+                    #se responde de inmediato, descartando el progreso anterior a la detención
+                    if update.done():
+                        update = asyncio.ensure_future(updates.get())
+                    last_status = STOP_MESSAGE
+                    await websocket.send_text(STOP_MESSAGE)
+                    continue
+            if update.done():
+                status = update.result()
+                update = asyncio.ensure_future(updates.get())
+                if status != last_status:
+                    last_status = status
+                    await websocket.send_text(status)
+                if status.startswith("Training finished") or status.startswith("Error"):
+                    finished = True
+                    break
+        await websocket.close()
     except WebSocketDisconnect:
         print(f"Cliente desconectado: {task_id}")
+    finally:
+        receiver.cancel()
+        update.cancel()
+        # el estado final se olvida cuando el último cliente lo recibió
+        progress_bus.unsubscribe(task_id, updates, discard=finished)
 
 
 @api_router.get("/iteration/{iteration_id}")
@@ -233,4 +465,47 @@ async def get_iteration_data(
     iteration = db.query(Iteration).filter(Iteration.id == iteration_id).first()
     if not iteration:
         raise HTTPException(status_code=404, detail="Iteration not found")
-    return iteration
\ No newline at end of file
+    return iteration
+
+
+def curve_page(curve, offset, limit):
+    """
+    Página de la curva con las épocas [offset, offset + limit). Las series por época se cortan
+    por posición y las de validación ("val_*") por su val_epoch, que es más corta que loss.
+    """
+    val_idx = [i for i, epoch in enumerate(curve.get("val_epoch", [])) if offset <= epoch < offset + limit]
+    return {
+        metric: [values[i] for i in val_idx] if metric.startswith("val_") else values[offset:offset + limit]
+        for metric, values in curve.items()
+    }
+
+
+@api_router.get("/iteration/{iteration_id}/curve")
+async def get_iteration_curve(
+    iteration_id: int,
+    offset: int = 0,
+    limit: int = 1000,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user_from_cookie)
+):
+    """
+    Curva de entrenamiento de una iteración por páginas de épocas. Durante el entrenamiento
+    se puede consultar con offset igual al total anterior para recibir solo las épocas nuevas.
+    Las métricas de validación se miden cada validationEvery épocas, la página incluye las
+    que tienen su val_epoch en las épocas de la página.
+    """
+    if offset < 0 or limit <= 0:
+        raise HTTPException(status_code=400, detail="Invalid offset or limit")
+    iteration = db.query(Iteration).join(Experiment).filter(Iteration.id == iteration_id, Experiment.user_id == current_user.id).first()
+    if not iteration:
+        raise HTTPException(status_code=404, detail="Iteration not found")
+    curve = iteration.training_curve or {}
+    total = len(curve.get("loss", []))
+    return sanitize_json({
+        "total": total,
+        "offset": offset,
+        "limit": limit,
+        "training_status": iteration.training_status,
+        "curve": curve_page(curve, offset, limit),
+    })
+
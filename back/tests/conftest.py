@@ -1,7 +1,11 @@
+import os
+import time
 import pytest
 from fastapi.testclient import TestClient
 from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker
+# los workers de entrenamiento, también los procesos, abren su sesión sobre la base de datos de los tests
+os.environ["DATABASE_URL"] = "sqlite:///./tests.db"
 from main import app
 from database import Base, get_db
 from models.user import User
@@ -9,7 +13,7 @@ from routes.auth import get_current_user_from_cookie
 
 
 # Base de datos temporal (SQLite)
-SQLALCHEMY_DATABASE_URL = "sqlite:///./tests.db"
+SQLALCHEMY_DATABASE_URL = os.environ["DATABASE_URL"]
 engine = create_engine(SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False})
 TestingSessionLocal = sessionmaker(bind=engine, autoflush=False, autocommit=False)
 
@@ -36,9 +40,30 @@ def client():
     """Cliente de prueba para la API"""
     return TestClient(app)
 
+def stop_training_jobs(timeout=10):
+    """
+    Detiene los entrenamientos que dejó un test: las iteraciones del siguiente test reutilizan
+    los mismos ids, y un fold que falla cancelaría los folds de otra tarea con el mismo id.
+    """
+    from core.jobQueue import JobStatus, TrainingJob
+    from core.progressBus import progress_bus
+    from routes.train import job_queue
+    with job_queue.Session() as db:
+        pending = db.query(TrainingJob.task_id).filter(TrainingJob.status.in_([JobStatus.QUEUED, JobStatus.RUNNING])).distinct().all()
+    for (task_id,) in pending:
+        job_queue.cancel(task_id, "Test finished")
+        progress_bus.request_stop(task_id)
+    deadline = time.time() + timeout
+    while any(job_queue.is_pending(task_id) for (task_id,) in pending) and time.time() < deadline:
+        time.sleep(0.05)
+    for (task_id,) in pending:
+        progress_bus.finish(task_id)
+
+
 @pytest.fixture(autouse=True)
 def clear_tables():
     yield  # aquí se ejecuta el test
+    stop_training_jobs()
     # limpiar todas las tablas
     db = TestingSessionLocal()
     for table in reversed(Base.metadata.sorted_tables):
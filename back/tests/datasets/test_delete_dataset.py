@@ -98,4 +98,46 @@ def test_delete_dataset(client, tmp_path):
 def test_delete_nonexistent_dataset(client):
     response = client.delete("/dsgd/api/datasets/9999")
     assert response.status_code == 404
-    assert response.json()["detail"] == "Dataset not found"
\ No newline at end of file
+    assert response.json()["detail"] == "Dataset not found"
+
+def test_delete_shared_dataset_file(client, tmp_path):
+    """Dos datasets con el mismo archivo comparten una copia, que se elimina con el último"""
+    import hashlib
+    import os
+    from core.config import settings
+
+    df = pd.DataFrame({
+        "feature1": [1, 2, 3],
+        "feature2": ["A", "B", "C"],
+        "target": [0, 1, 0]
+    })
+    csv_path = tmp_path / "shared.csv"
+    df.to_csv(csv_path, index=False)
+    stored_path = os.path.join(settings.DATASETS_FOLDER, hashlib.sha256(csv_path.read_bytes()).hexdigest() + ".csv")
+
+    for name in ["Original", "Copia"]:
+        files = {"files": ("shared.csv", open(csv_path, "rb"), "text/csv")}
+        data = {
+            "name": name,
+            "columns": json.dumps(["feature1", "feature2", "target"]),
+            "target_column": "target",
+            "n_classes": 2,
+            "n_rows": 3,
+            "header": "true",
+        }
+        response = client.post("/dsgd/api/datasets/upload", data=data, files=files)
+        assert response.status_code == 200
+    assert os.path.exists(stored_path)
+
+    datasets = client.get("/dsgd/api/datasets/").json()
+    assert len(datasets) == 2
+
+    response = client.delete(f"/dsgd/api/datasets/{datasets[0]['id']}")
+    assert response.status_code == 200
+    assert os.path.exists(stored_path)
+    response = client.get(f"/dsgd/api/datasets/preview/{datasets[1]['id']}")
+    assert response.status_code == 200
+
+    response = client.delete(f"/dsgd/api/datasets/{datasets[1]['id']}")
+    assert response.status_code == 200
+    assert not os.path.exists(stored_path)
@@ -56,4 +56,8 @@ def test_preview_dataset(client, tmp_path):
     assert preview_data["stats"][2]["nulls"] == 0
     assert preview_data["stats"][2]["min"] == 0
     assert preview_data["stats"][2]["max"] == 1
-    assert preview_data["stats"][2]["mean"] == 0.33
\ No newline at end of file
+    assert preview_data["stats"][2]["mean"] == 0.33
+    # la previsualizacion corre en el pool y queda en sus metricas
+    stats = client.get("/dsgd/api/offload/stats").json()
+    assert stats["routes"]["preview"]["completed"] >= 1
+    assert stats["routes"]["preview"]["running"] == 0
@@ -106,4 +106,66 @@ def test_upload_dataset_2_files(client, tmp_path):
     assert datasets[0]["n_classes"] == 2
     assert set(datasets[0]["columns"]) == {"feature1", "feature2", "target"}
     assert datasets[0]["target_column"] == "target"
-    
\ No newline at end of file
+
+
+def test_upload_dataset_wrong_columns(client, tmp_path):
+    df = pd.DataFrame({
+        "feature1": [1, 2, 3],
+        "target": [0, 1, 0]
+    })
+    csv_path = tmp_path / "test.csv"
+    df.to_csv(csv_path, index=False)
+
+    files = {"files": ("test.csv", open(csv_path, "rb"), "text/csv")}
+    data = {
+        "name": "Mi Dataset",
+        "columns": json.dumps(["feature1", "feature2", "target"]),
+        "target_column": "target",
+        "n_classes": 2,
+        "n_rows": 3,
+        "header": "true",
+    }
+
+    response = client.post("/dsgd/api/datasets/upload", data=data, files=files)
+    assert response.status_code == 400
+    assert "columnas" in response.json()["detail"]
+
+
+def test_upload_dataset_stats_without_full_read(client, tmp_path, monkeypatch):
+    """Las estadisticas se calculan al recorrer la subida, sin leer el archivo completo"""
+    import utils.datasetStats
+    import utils.loadDataset
+
+    def full_read(*args, **kwargs):
+        raise AssertionError("el archivo no se debe leer completo")
+    monkeypatch.setattr(utils.loadDataset, "read_dataset_file", full_read)
+    monkeypatch.setattr(utils.datasetStats, "read_dataset_file", full_read)
+
+    df = pd.DataFrame({
+        "feature1": [4.5, 2.0, None, 8.0],
+        "feature2": ["Q", "R", "Q", "S"],
+        "target": [0, 1, 0, 1]
+    })
+    csv_path = tmp_path / "stats.csv"
+    df.to_csv(csv_path, index=False)
+
+    files = {"files": ("stats.csv", open(csv_path, "rb"), "text/csv")}
+    data = {
+        "name": "Stats",
+        "columns": json.dumps(["feature1", "feature2", "target"]),
+        "target_column": "target",
+        "n_classes": 2,
+        "n_rows": 4,
+        "header": "true",
+    }
+    response = client.post("/dsgd/api/datasets/upload", data=data, files=files)
+    assert response.status_code == 200
+    dataset_id = client.get("/dsgd/api/datasets/").json()[0]["id"]
+
+    response = client.get(f"/dsgd/api/datasets/preview/{dataset_id}")
+    assert response.status_code == 200
+    stats = {column["column"]: column for column in response.json()[0]["stats"]}
+    assert stats["feature1"]["nulls"] == 1
+    assert stats["feature1"]["mean"] == 4.83
+    assert stats["feature1"]["max"] == 8.0
+    assert {b["bin"]: b["count"] for b in stats["feature2"]["histogram"]} == {"Q": 2, "R": 1, "S": 1}
@@ -0,0 +1,206 @@
+import numpy as np
+import pytest
+import torch
+
+pytest.importorskip("dsgd")
+from dsmodels.classifier import DSClassifierMultiQ
+
+
+def test_indexed_batch_keeps_large_indices():
+    ds = DSClassifierMultiQ(2, device="cpu")
+    X = np.arange(6, dtype=np.float32).reshape(3, 2)
+    features = ds._feature_tensor(X)
+    # sin copia de X
+    assert features.data_ptr() == X.__array_interface__["data"][0]
+    idx = torch.tensor([2, 0])
+    batch = ds._indexed_batch(idx, features)
+    np.testing.assert_array_equal(batch.numpy(), [[2, 4, 5], [0, 0, 1]])
+    # indices sobre 2**24 no se pueden representar en float32
+    big = torch.tensor([2 ** 24 + 1])
+    features = torch.zeros((2 ** 24 + 2, 1), dtype=torch.float32)
+    assert int(ds._indexed_batch(big, features)[0, 0].item()) == 2 ** 24 + 1
+
+
+def test_fit_restores_best_validation_masses():
+    from dsgd import DSRule
+    from dsmodels.DSParser import DSParser
+    rng = np.random.default_rng(0)
+    X = rng.integers(1, 4, (200, 2)).astype(np.float32)
+    y = (X[:, 0] >= 2).astype(int)
+    ds = DSClassifierMultiQ(2, max_iter=40, min_iter=2, device="cpu", vectorized=True, batch_size=50, lr=0.05,
+                            min_dloss=-1)
+    for column in ["feature1", "feature2"]:
+        rule = DSParser().json_to_lambda({"left": column, "op": ">=", "right": 2}, ["feature1", "feature2"])
+        ds.model.add_rule(DSRule(rule, column))
+    ds.fit(X[:150], y[:150], validation_data=(X[150:], y[150:]), patience=3, validation_every=2)
+    assert len(ds.history_["val_loss"]) == len(ds.history_["val_epoch"])
+    assert ds.best_epoch_ in ds.history_["val_epoch"]
+    # las masas finales son las de la mejor validacion
+    y_score = torch.tensor(ds.predict_proba(X[150:]))
+    y_val = torch.nn.functional.one_hot(torch.tensor(y[150:]), 2).float()
+    loss = torch.nn.functional.mse_loss(y_score, y_val).item()
+    assert loss == pytest.approx(min(ds.history_["val_loss"]), rel=1e-5)
+
+
+def test_index_batches():
+    from dsmodels.classifier import IndexBatches
+    y = torch.arange(10) * 10
+    batches = IndexBatches(y, 4)
+    assert len(batches) == 3
+    idx = [b[0].tolist() for b in batches]
+    assert idx == [[0, 1, 2, 3], [4, 5, 6, 7], [8, 9]]
+    shuffled = IndexBatches(y, 4, shuffle=True, seed=0)
+    first = [(i.clone(), yi.clone()) for i, yi in shuffled]
+    second = [(i.clone(), yi.clone()) for i, yi in shuffled]
+    for i, yi in first:
+        # los targets siguen a sus indices
+        assert torch.equal(yi, i * 10)
+    assert sorted(torch.cat([i for i, _ in first]).tolist()) == list(range(10))
+    # cada epoca usa una permutacion nueva
+    assert not torch.equal(torch.cat([i for i, _ in first]), torch.cat([i for i, _ in second]))
+
+
+def test_fit_with_precomputed_activations():
+    from dsgd import DSRule
+    from dsmodels.DSParser import DSParser
+    rng = np.random.default_rng(0)
+    X = rng.integers(1, 4, (100, 2)).astype(np.float32)
+    y = (X[:, 0] >= 2).astype(int)
+    models = []
+    for _ in range(2):
+        ds = DSClassifierMultiQ(2, max_iter=5, min_iter=2, device="cpu", vectorized=True, batch_size=25, lr=0.05)
+        for column in ["feature1", "feature2"]:
+            rule = DSParser().json_to_lambda({"left": column, "op": ">=", "right": 2}, ["feature1", "feature2"])
+            ds.model.add_rule(DSRule(rule, column))
+        models.append(ds)
+    activations = models[0].rule_activation_matrix(X)
+    models[0].fit(X, y, activations=activations)
+    models[1].fit(X, y)
+    np.testing.assert_allclose(models[0].predict_proba(X), models[1].predict_proba(X))
+
+
+def dempster_scores(rule_masses, n_classes):
+    """Combinacion de Dempster calculada a mano sobre los conjuntos focales, y la commonality
+    normalizada de cada clase en la masa combinada"""
+    theta = frozenset(range(n_classes))
+    combined = {theta: 1.0}
+    for m_sing, m_uncert in rule_masses:
+        rule = {frozenset([c]): m for c, m in enumerate(m_sing)}
+        rule[theta] = m_uncert
+        result, conflict = {}, 0.0
+        for a, m_a in combined.items():
+            for b, m_b in rule.items():
+                if a & b:
+                    result[a & b] = result.get(a & b, 0.0) + m_a * m_b
+                else:
+                    conflict += m_a * m_b
+        combined = {focal: m / (1 - conflict) for focal, m in result.items()}
+    q = np.array([sum(m for focal, m in combined.items() if c in focal) for c in range(n_classes)])
+    return q / q.sum()
+
+
+def test_vectorized_combination_matches_dempster():
+    """La combinacion vectorizada coincide con la regla de Dempster calculada a mano, también
+    en una fila sin reglas activas"""
+    from dsgd import DSRule
+    from dsmodels.DSParser import DSParser
+    columns = ["feature1", "feature2"]
+    conditions = [
+        {"left": "feature1", "op": ">=", "right": 2},
+        {"left": "feature2", "op": ">=", "right": 2},
+        {"left": "feature1", "op": ">=", "right": 3},
+    ]
+    masses = [
+        ([0.5, 0.1, 0.1], 0.3),
+        ([0.1, 0.4, 0.2], 0.3),
+        ([0.0, 0.2, 0.6], 0.2),
+    ]
+    ds = DSClassifierMultiQ(3, device="cpu", vectorized=True)
+    for condition, (m_sing, m_uncert) in zip(conditions, masses):
+        rule = DSParser().json_to_lambda(condition, columns)
+        ds.model.add_rule(DSRule(rule, str(condition)), m_sing, m_uncert)
+    # la ultima fila no la cubre ninguna regla
+    X = np.array([[3, 3], [2, 1], [1, 2], [3, 1], [2, 2], [1, 1]], dtype=np.float32)
+    A = np.array([[1, 1, 1], [1, 0, 0], [0, 1, 0], [1, 0, 1], [1, 1, 0], [0, 0, 0]], dtype=np.float32)
+    expected = np.array([dempster_scores([masses[j] for j in np.flatnonzero(row)], 3) for row in A])
+    np.testing.assert_allclose(expected[-1], np.full(3, 1 / 3))
+
+    scores = ds._combine(torch.from_numpy(A)).detach().numpy()
+    np.testing.assert_allclose(scores, expected, rtol=1e-5, atol=1e-6)
+    # y a traves de la matriz de activaciones de las reglas
+    np.testing.assert_allclose(ds.predict_proba(X), expected, rtol=1e-5, atol=1e-6)
+
+
+def test_predict_explain_batch_matches_predict_explain():
+    """El explain en batch da las mismas probabilidades, clases y reglas que predict_explain fila a fila"""
+    from dsgd import DSRule
+    from dsmodels.DSParser import DSParser
+    columns = ["feature1", "feature2"]
+    conditions = [
+        {"left": "feature1", "op": ">=", "right": 2},
+        {"left": "feature2", "op": ">=", "right": 2},
+        {"left": "feature1", "op": ">=", "right": 3},
+    ]
+    masses = [
+        ([0.5, 0.1], 0.4),
+        ([0.15, 0.45], 0.4),
+        ([0.7, 0.05], 0.25),
+    ]
+    ds = DSClassifierMultiQ(2, device="cpu")
+    for condition, (m_sing, m_uncert) in zip(conditions, masses):
+        rule = DSParser().json_to_lambda(condition, columns)
+        ds.model.add_rule(DSRule(rule, str(condition)), m_sing, m_uncert)
+    X = np.array([[3, 3], [2, 1], [1, 2], [1, 1]], dtype=np.float32)
+
+    probabilities, classes, explanations = ds.predict_explain_batch(X)
+    for i, x in enumerate(X):
+        pred, cls, df_rls, _ = ds.predict_explain(x)
+        np.testing.assert_allclose(probabilities[i], pred, rtol=1e-5)
+        assert classes[i] == cls
+        expected = df_rls.to_dict(orient="records")
+        assert [row["rule"] for row in explanations[i]] == [row["rule"] for row in expected]
+        for row, expected_row in zip(explanations[i], expected):
+            for key in ["0", "1", "uncertainty"]:
+                assert row[key] == pytest.approx(expected_row[key], rel=1e-6)
+    # la ultima fila no la cubre ninguna regla
+    assert explanations[-1] == []
+
+
+def test_stopped_training_keeps_best_validation_masses(tmp_path):
+    from dsgd import DSRule
+    from dsmodels.DSParser import DSParser
+    from dsmodels.train import fit_with_progress
+
+    class StopAfter:
+        def __init__(self, epochs):
+            self.epochs = epochs
+            self.best = None
+
+        def update(self, task_id, msg):
+            # copia de las mejores masas hasta el momento, antes de la detención
+            if ds._validation is not None and ds._validation["best_masses"] is not None:
+                self.best = [p.clone() for p in ds._validation["best_masses"]]
+
+        def stopped(self, task_id):
+            return len(ds.history_["loss"]) >= self.epochs
+
+    rng = np.random.default_rng(0)
+    X = rng.integers(1, 4, (200, 2)).astype(np.float32)
+    y = (X[:, 0] >= 2).astype(int)
+    columns = ["feature1", "feature2"]
+    ds = DSClassifierMultiQ(2, max_iter=40, min_iter=2, device="cpu", vectorized=True, batch_size=50, lr=0.05,
+                            min_dloss=-1, debug_mode=True)
+    for column in columns:
+        rule = DSParser().json_to_lambda({"left": column, "op": ">=", "right": 2}, columns)
+        ds.model.add_rule(DSRule(rule, column))
+    # la validación tiene las etiquetas invertidas, la mejor época es la primera
+    progress = StopAfter(6)
+    assert fit_with_progress(ds, X[:150], y[:150], columns, progress, "t", validation_data=(X[150:], 1 - y[150:]))
+    assert ds.best_epoch_ == 0
+    assert len(ds.history_["loss"]) == 6
+    path = str(tmp_path / "model.bin")
+    ds.model.save_rules_bin(path)
+    saved = DSClassifierMultiQ(2, device="cpu")
+    saved.model.load_rules_bin(path)
+    for mass, best in zip(saved.model.parameters(), progress.best):
+        torch.testing.assert_close(mass.detach(), best)
@@ -0,0 +1,58 @@
+import numpy as np
+import pytest
+from sklearn.metrics import accuracy_score, classification_report, confusion_matrix, f1_score, precision_score, recall_score, roc_auc_score
+from dsmodels.evaluation import confusion, evaluate_model, report_from_confusion
+
+
+def assert_report_equal(report, expected):
+    assert report.keys() == expected.keys()
+    for key, value in expected.items():
+        assert report[key] == pytest.approx(value)
+
+
+class FixedModel:
+    """
+    Modelo con probabilidades fijas que cuenta las pasadas sobre los datos.
+    """
+
+    def __init__(self, y_proba):
+        self.y_proba = y_proba
+        self.calls = 0
+
+    def predict_proba(self, X):
+        self.calls += 1
+        return self.y_proba
+
+
+@pytest.mark.parametrize("n_classes", [2, 4])
+def test_evaluate_model_matches_sklearn(n_classes):
+    rng = np.random.default_rng(n_classes)
+    y_test = rng.integers(0, n_classes, 200)
+    y_proba = rng.random((200, n_classes))
+    y_proba /= y_proba.sum(axis=1, keepdims=True)
+    model = FixedModel(y_proba)
+    label_to_num = {str(i): i for i in range(n_classes)}
+    metrics, y_pred = evaluate_model(model, np.zeros((200, 1)), y_test, label_to_num, n_classes)
+    assert model.calls == 1
+    np.testing.assert_array_equal(y_pred, y_proba.argmax(axis=1))
+    assert metrics["accuracy"] == pytest.approx(accuracy_score(y_test, y_pred))
+    assert metrics["precision"] == pytest.approx(precision_score(y_test, y_pred, average="weighted"))
+    assert metrics["recall"] == pytest.approx(recall_score(y_test, y_pred, average="weighted"))
+    assert metrics["f1_score"] == pytest.approx(f1_score(y_test, y_pred, average="weighted"))
+    assert metrics["confusion_matrix"] == confusion_matrix(y_test, y_pred).tolist()
+    assert_report_equal(metrics["classification_report"], classification_report(y_test, y_pred, output_dict=True))
+    if n_classes == 2:
+        assert metrics["roc_auc"] == pytest.approx(roc_auc_score(y_test, y_proba[:, 1]))
+    else:
+        assert metrics["roc_auc"] == pytest.approx(roc_auc_score(y_test, y_proba, multi_class="ovr"))
+
+
+def test_report_with_unpredicted_class():
+    # la clase 2 nunca se predice y la clase 3 nunca aparece en y_true
+    y_true = np.array([0, 0, 1, 1, 2, 2])
+    y_pred = np.array([0, 1, 1, 1, 3, 0])
+    labels, matrix = confusion(y_true, y_pred)
+    np.testing.assert_array_equal(labels, [0, 1, 2, 3])
+    np.testing.assert_array_equal(matrix, confusion_matrix(y_true, y_pred))
+    expected = classification_report(y_true, y_pred, output_dict=True, zero_division=0)
+    assert_report_equal(report_from_confusion(labels, matrix), expected)
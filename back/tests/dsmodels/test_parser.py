@@ -1,5 +1,7 @@
 import pytest
 import ast
+import numpy as np
+import pandas as pd
 from dsmodels.DSParser import DSParser
 
 
@@ -151,4 +153,42 @@ def test_json_to_lambda_complex():
     func = parser.json_to_lambda(json_cond, ["x", "y"])
     assert func([6, 7]) is True
     assert func([4, 7]) is False
-    assert func([6, 9]) is False
\ No newline at end of file
+    assert func([6, 9]) is False
+
+def test_json_to_mask_eval():
+    parser = DSParser()
+    X = np.array([[6, 4], [4, 7], [6, 9]])
+    json_cond = {"op": "and", "values": [
+        {"left": "x", "op": ">", "right": 5},
+        {"left": {"op": "+", "left": "y", "right": 2}, "op": "<", "right": 10}
+    ]}
+    mask = parser.json_to_mask(json_cond, ["x", "y"])
+    func = parser.json_to_lambda(json_cond, ["x", "y"])
+    assert mask(X).tolist() == [func(row) for row in X]
+
+def test_json_to_mask_chained_compare():
+    parser = DSParser()
+    X = np.array([[0], [1], [2], [3]])
+    json_cond = [{"left": 0, "op": "<", "right": "x"}, {"left": "x", "op": "<", "right": 3}]
+    mask = parser.json_to_mask(json_cond, ["x"])
+    assert mask(X).tolist() == [False, True, True, False]
+
+def test_json_to_mask_dataframe_nan():
+    parser = DSParser()
+    df = pd.DataFrame({"y": [1.0, None, 3.0], "x": [6, 7, None]})
+    json_cond = {"op": "or", "values": [
+        {"left": "x", "op": ">", "right": 6},
+        {"left": "y", "op": "!=", "right": 1}
+    ]}
+    columns = ["x", "y"]
+    mask = parser.json_to_mask(json_cond, columns)
+    func = parser.json_to_lambda(json_cond, columns)
+    expected = [func(row) for row in df[columns].to_numpy(dtype=float)]
+    assert mask(df).tolist() == expected == [False, True, True]
+
+def test_json_to_mask_dataframe_missing_columns():
+    parser = DSParser()
+    df = pd.DataFrame({"y": [1.0, 2.0], "z": [6, 7]})
+    mask = parser.json_to_mask({"left": "x", "op": ">", "right": 6}, ["x", "y"])
+    with pytest.raises(ValueError, match="x"):
+        mask(df)
@@ -0,0 +1,55 @@
+from dsmodels.recorder import ProgressRecorder
+
+
+class FakeSession:
+    def __init__(self):
+        self.commits = 0
+
+    def commit(self):
+        self.commits += 1
+
+
+class FakeIteration:
+    training_message = None
+    training_curve = None
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_flush_by_time():
+    db, iteration, clock = FakeSession(), FakeIteration(), FakeClock()
+    recorder = ProgressRecorder(db, iteration, flush_seconds=2, clock=clock)
+    losses = []
+    curve = {"loss": losses}
+    for epoch in range(10):
+        losses.append(1.0 / (epoch + 1))
+        recorder.record(f"epoch {epoch}", curve)
+        clock.now += 0.5
+    # 10 mensajes en 5 segundos, se escribe cada 2 segundos
+    assert db.commits == 2
+    recorder.flush(curve)
+    assert db.commits == 3
+    assert iteration.training_message == "epoch 9"
+    assert iteration.training_curve == {"loss": losses}
+    # la curva guardada es una copia
+    assert iteration.training_curve["loss"] is not losses
+
+
+def test_flush_by_epochs():
+    db, iteration, clock = FakeSession(), FakeIteration(), FakeClock()
+    recorder = ProgressRecorder(db, iteration, flush_seconds=60, flush_epochs=3, clock=clock)
+    losses = []
+    for epoch in range(7):
+        losses.append(float(epoch))
+        recorder.record(f"epoch {epoch}", {"loss": losses})
+    assert db.commits == 2
+    assert iteration.training_curve == {"loss": [0.0, 1.0, 2.0, 3.0, 4.0, 5.0]}
+    recorder.flush()
+    assert iteration.training_message == "epoch 6"
+    assert iteration.training_curve["loss"][-1] == 6.0
@@ -0,0 +1,35 @@
+import numpy as np
+import pytest
+
+pytest.importorskip("dsgd")
+from dsgd import DSRule
+from dsmodels.DSParser import DSParser
+from dsmodels.classifier import DSClassifierMultiQ
+from dsmodels.train import warm_start_masses
+
+
+def test_warm_start_masses(tmp_path):
+    columns = ["feature1", "feature2"]
+    kept = {"left": "feature1", "op": ">=", "right": 2}
+    tweaked = {"left": "feature2", "op": ">=", "right": 2}
+    new = {"left": "feature2", "op": "<", "right": 1}
+    ds = DSClassifierMultiQ(2, device="cpu")
+    for condition in [kept, tweaked]:
+        rule = DSParser().json_to_lambda(condition, columns)
+        ds.model.add_rule(DSRule(rule, "rule"), m_sing=[0.6, 0.3], m_uncert=0.1)
+    path = str(tmp_path / "model.dsb")
+    ds.model.save_rules_bin(path)
+    trained = ds.model._params[0].detach().tolist()
+
+    previous = [(kept, [0.1, 0.1, 0.8], 0), (tweaked, [0.1, 0.1, 0.8], 1)]
+    # el orden de las llaves de la condicion no afecta el emparejamiento
+    reordered = {"right": 2, "op": ">=", "left": "feature1"}
+    rules = [(reordered, [0.1, 0.1, 0.8], 0), (tweaked, [0.5, 0.2, 0.3], 1), (new, [0.1, 0.1, 0.8], 1)]
+    masses = warm_start_masses(path, 2, rules, previous)
+    np.testing.assert_allclose(masses[0], trained)
+    # masa modificada y regla nueva parten de la masa enviada
+    assert masses[1] is None
+    assert masses[2] is None
+    # sin reglas previas registradas todas las reglas conocidas continuan
+    masses = warm_start_masses(path, 2, rules)
+    assert masses[1] is not None and masses[2] is None
@@ -1,5 +1,6 @@
 import pandas as pd
 import json
+from core.offload import offloader
 def test_get_experiment_dataset(client, tmp_path):
     response = client.get("/dsgd/api/experiments/")
     assert response.status_code == 200
@@ -49,8 +50,11 @@ def test_get_experiment_dataset(client, tmp_path):
     assert experiment["dataset_id"] == dataset_id
 
     # Verificar que el experimento se puede obtener
+    previews = offloader.stats()["routes"].get("preview", {}).get("completed", 0)
     response = client.get(f"/dsgd/api/experiments/dataset/{experiment['id']}")
     assert response.status_code == 200
+    # la vista previa se lee en el pool de offload, fuera del event loop
+    assert offloader.stats()["routes"]["preview"]["completed"] == previews + 1
     dataset = response.json()
     #check data
     assert len(dataset["data"]) == 1
@@ -0,0 +1,68 @@
+import json
+import numpy as np
+import pandas as pd
+import pytest
+
+pytest.importorskip("dsgd")
+from dsgd import DSRule
+from dsmodels.DSParser import DSParser
+from dsmodels.classifier import DSClassifierMultiQ
+from dsmodels.registry import model_registry
+
+
+def test_post_predict_batch(client, tmp_path):
+    """La prediccion de la ruta coincide con predict_explain_batch del modelo guardado"""
+    df = pd.DataFrame({
+        "feature1": [1, 2, 3, 1, 1, 2, 3, 1, 2, 3],
+        "feature2": ["A", "B", "C", "A", "A", "B", "C", "A", "B", "C"],
+        "target": [0, 1, 0, 0, 0, 1, 0, 0, 1, 1]
+    })
+    csv_path = tmp_path / "predict.csv"
+    df.to_csv(csv_path, index=False)
+    files = {"files": ("predict.csv", open(csv_path, "rb"), "text/csv")}
+    data = {
+        "name": "Mi Dataset",
+        "columns": json.dumps(["feature1", "feature2", "target"]),
+        "target_column": "target",
+        "n_classes": 2,
+        "n_rows": 10,
+        "header": "true",
+    }
+    response = client.post("/dsgd/api/datasets/upload", data=data, files=files)
+    assert response.status_code == 200
+    dataset_id = client.get("/dsgd/api/datasets/").json()[0]["id"]
+    experiment = client.post("/dsgd/api/experiments/", data={"name": "Mi Experimento", "dataset_id": dataset_id}).json()
+
+    # reglas sobre feature2 codificada (A=0, B=1, C=2)
+    columns = ["feature1", "feature2"]
+    ds = DSClassifierMultiQ(2, device="cpu")
+    for condition, m_sing, m_uncert in [
+        ({"left": "feature1", "op": ">=", "right": 2}, [0.2, 0.5], 0.3),
+        ({"left": "feature2", "op": "==", "right": 2}, [0.6, 0.1], 0.3),
+    ]:
+        rule = DSParser().json_to_lambda(condition, columns)
+        ds.model.add_rule(DSRule(rule, str(condition)), m_sing, m_uncert)
+    model_path = tmp_path / "model.bin"
+    ds.model.save_rules_bin(str(model_path))
+    with open(model_path, "rb") as f:
+        response = client.post(
+            f"/dsgd/api/experiments/{experiment['id']}/upload",
+            data={"test_size": 0.3, "split_seed": 42},
+            files={"file": ("model.bin", f, "application/octet-stream")},
+        )
+    assert response.status_code == 200
+    iteration_id = response.json()["id"]
+
+    predict_data = [[1, "A"], [2, "B"], [3, "C"], [1, "C"]]
+    response = client.post(f"/dsgd/api/predict/{iteration_id}", json={"predictData": predict_data})
+    assert response.status_code == 200
+    predictions = response.json()["predictions"]
+    assert iteration_id in model_registry
+
+    expected_proba, expected_classes, expected_rules = ds.predict_explain_batch(
+        np.array([[1, 0], [2, 1], [3, 2], [1, 2]], dtype=np.float32))
+    assert [p["class"] for p in predictions] == expected_classes.tolist()
+    for prediction, proba, rules in zip(predictions, expected_proba, expected_rules):
+        np.testing.assert_allclose(prediction["probabilities"], proba, rtol=1e-5)
+        assert [r["rule"] for r in prediction["rules"]] == [r["rule"] for r in rules]
+    model_registry.invalidate(iteration_id)
@@ -0,0 +1,101 @@
+import json
+import os
+import time
+import numpy as np
+import pandas as pd
+import pytest
+from core.config import settings
+
+
+def create_experiment(client, tmp_path):
+    df = pd.DataFrame({
+        "feature1": list(range(20)),
+        "target": [0, 1] * 10
+    })
+    csv_path = tmp_path / "test.csv"
+    df.to_csv(csv_path, index=False)
+    files = {"files": ("test.csv", open(csv_path, "rb"), "text/csv")}
+    data = {
+        "name": "Mi Dataset",
+        "columns": json.dumps(["feature1", "target"]),
+        "target_column": "target",
+        "n_classes": 2,
+        "n_rows": 20,
+        "header": "true",
+    }
+    response = client.post("/dsgd/api/datasets/upload", data=data, files=files)
+    assert response.status_code == 200
+    dataset_id = client.get("/dsgd/api/datasets/").json()[0]["id"]
+    response = client.post("/dsgd/api/experiments/", data={"name": "Mi Experimento", "dataset_id": dataset_id})
+    return response.json()
+
+
+def test_train_model_cross_validation(client, tmp_path):
+    experiment = create_experiment(client, tmp_path)
+    body = {
+        "minEpochs": 1,
+        "maxEpochs": 1,
+        "rules": [{"left": "feature1", "op": ">=", "right": 10}],
+        "labels": ["feature1>=10"],
+        "masses": [[0.1, 0.1, 0.8]],
+    }
+
+    for folds in [1, 21, 50, "4", 2.5, True]:
+        response = client.post(f"/dsgd/api/train/train-model/{experiment['id']}", json={**body, "folds": folds})
+        assert response.status_code == 400
+
+    response = client.post(f"/dsgd/api/train/train-model/{experiment['id']}", json={**body, "folds": 4})
+    assert response.status_code == 200
+    task_id = response.json()["task_id"]
+    iteration = client.get(f"/dsgd/api/train/iteration/{task_id}").json()
+    assert iteration["folds"] == 4
+    # los folds se encolan juntos, en la misma transacción y sobre el mismo split
+    from core.jobQueue import TrainingJob
+    from routes.train import job_queue
+    with job_queue.Session() as db:
+        jobs = db.query(TrainingJob).filter(TrainingJob.task_id == task_id).all()
+    assert sorted(job.payload["fold"] for job in jobs) == [0, 1, 2, 3]
+    assert len({(job.created_at, job.data_path) for job in jobs}) == 1
+
+
+def test_cross_validation_results(client, tmp_path):
+    experiment = create_experiment(client, tmp_path)
+    body = {
+        "minEpochs": 1,
+        "maxEpochs": 2,
+        "dropDuplicates": False,
+        "rules": [{"left": "feature1", "op": ">=", "right": 10}, {"left": "feature1", "op": "<", "right": 5}],
+        "labels": ["feature1>=10", "feature1<5"],
+        "masses": [[0.1, 0.1, 0.8], [0.2, 0.2, 0.6]],
+        "folds": 4,
+    }
+    response = client.post(f"/dsgd/api/train/train-model/{experiment['id']}", json=body)
+    assert response.status_code == 200
+    task_id = response.json()["task_id"]
+    deadline = time.time() + 30
+    while True:
+        iteration = client.get(f"/dsgd/api/train/iteration/{task_id}").json()
+        if iteration["training_status"] not in ("pending", "running"):
+            break
+        assert time.time() < deadline, "La validación cruzada no terminó"
+        time.sleep(0.1)
+    assert iteration["training_status"] == "completed"
+    cv_results = iteration["cv_results"]
+    folds = cv_results["folds"]
+    assert [result["fold"] for result in folds] == [0, 1, 2, 3]
+    metrics = ["accuracy", "precision", "recall", "f1_score", "roc_auc"]
+    for key in metrics:
+        values = [result[key] for result in folds]
+        assert cv_results["mean"][key] == pytest.approx(np.mean(values))
+        assert cv_results["std"][key] == pytest.approx(np.std(values))
+        assert iteration[key] == pytest.approx(np.mean(values))
+    # se conserva el modelo del fold con mejor exactitud, los demás se eliminan
+    accuracies = [result["accuracy"] for result in folds]
+    assert cv_results["best_fold"] == accuracies.index(max(accuracies))
+    assert iteration["trained"]
+    assert iteration["model_path"] == settings.MODELS_FOLDER + f"/model_{task_id}.bin"
+    assert os.path.exists(iteration["model_path"])
+    for fold in range(4):
+        assert not os.path.exists(settings.MODELS_FOLDER + f"/model_{task_id}_fold{fold}.bin")
+    # la matriz de confusión cubre todas las filas fuera de fold
+    assert sum(map(sum, iteration["confusion_matrix"])) == 20
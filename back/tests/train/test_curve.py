@@ -0,0 +1,75 @@
+import json
+import pandas as pd
+from datetime import datetime
+from models import Iteration
+from models.iteration import Status
+from tests.conftest import TestingSessionLocal
+
+
+def test_get_iteration_curve(client, tmp_path):
+    df = pd.DataFrame({
+        "feature1": [1, 2, 3, 1, 1, 2, 3, 1, 2, 3],
+        "target": [0, 1, 0, 0, 0, 1, 0, 0, 1, 0]
+    })
+    csv_path = tmp_path / "test.csv"
+    df.to_csv(csv_path, index=False)
+    files = {"files": ("test.csv", open(csv_path, "rb"), "text/csv")}
+    data = {
+        "name": "Mi Dataset",
+        "columns": json.dumps(["feature1", "target"]),
+        "target_column": "target",
+        "n_classes": 2,
+        "n_rows": 10,
+        "header": "true",
+    }
+    response = client.post("/dsgd/api/datasets/upload", data=data, files=files)
+    assert response.status_code == 200
+    dataset_id = client.get("/dsgd/api/datasets/").json()[0]["id"]
+    response = client.post("/dsgd/api/experiments/", data={"name": "Mi Experimento", "dataset_id": dataset_id})
+    experiment = response.json()
+
+    # iteracion con una curva de 5 epocas
+    db = TestingSessionLocal()
+    iteration = Iteration(
+        created_at=datetime.now(),
+        experiment_id=experiment["id"],
+        training_status=Status.RUNNING,
+        training_curve={
+            "loss": [0.5, 0.4, 0.3, 0.25, 0.2],
+            "epoch_time": [0.1, 0.1, 0.1, 0.1, 0.1],
+            "forward": [0.05, 0.05, 0.05, 0.05, 0.05],
+            # validacion cada 2 epocas
+            "val_epoch": [1, 3],
+            "val_loss": [0.45, 0.3],
+        },
+    )
+    db.add(iteration)
+    db.commit()
+    iteration_id = iteration.id
+    db.close()
+
+    response = client.get(f"/dsgd/api/train/iteration/{iteration_id}/curve", params={"offset": 1, "limit": 2})
+    assert response.status_code == 200
+    curve = response.json()
+    assert curve["total"] == 5
+    assert curve["training_status"] == "running"
+    assert curve["curve"]["loss"] == [0.4, 0.3]
+    assert curve["curve"]["forward"] == [0.05, 0.05]
+    # la validacion se pagina por su epoca
+    assert curve["curve"]["val_epoch"] == [1]
+    assert curve["curve"]["val_loss"] == [0.45]
+
+    response = client.get(f"/dsgd/api/train/iteration/{iteration_id}/curve", params={"offset": 3, "limit": 2})
+    assert response.json()["curve"]["loss"] == [0.25, 0.2]
+    assert response.json()["curve"]["val_epoch"] == [3]
+    assert response.json()["curve"]["val_loss"] == [0.3]
+
+    # solo las epocas nuevas
+    response = client.get(f"/dsgd/api/train/iteration/{iteration_id}/curve", params={"offset": 5})
+    assert response.json()["curve"]["loss"] == []
+    assert response.json()["curve"]["val_loss"] == []
+
+    response = client.get(f"/dsgd/api/train/iteration/{iteration_id}/curve", params={"offset": -1})
+    assert response.status_code == 400
+    response = client.get("/dsgd/api/train/iteration/9999/curve")
+    assert response.status_code == 404
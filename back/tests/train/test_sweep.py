@@ -0,0 +1,128 @@
+import json
+import os
+import time
+import pandas as pd
+from core.config import settings
+
+
+def create_experiment(client, tmp_path):
+    df = pd.DataFrame({
+        "feature1": [1, 2, 3, 1, 1, 2, 3, 1, 2, 3],
+        "feature2": [3, 4, 5, 3, 3, 4, 5, 3, 4, 5],
+        "target": [0, 1, 0, 0, 0, 1, 0, 0, 1, 0]
+    })
+    csv_path = tmp_path / "test.csv"
+    df.to_csv(csv_path, index=False)
+    files = {"files": ("test.csv", open(csv_path, "rb"), "text/csv")}
+    data = {
+        "name": "Mi Dataset",
+        "columns": json.dumps(["feature1", "feature2", "target"]),
+        "target_column": "target",
+        "n_classes": 2,
+        "n_rows": 10,
+        "header": "true",
+    }
+    response = client.post("/dsgd/api/datasets/upload", data=data, files=files)
+    assert response.status_code == 200
+    dataset_id = client.get("/dsgd/api/datasets/").json()[0]["id"]
+    response = client.post("/dsgd/api/experiments/", data={"name": "Mi Experimento", "dataset_id": dataset_id})
+    assert response.status_code == 200
+    return response.json()
+
+
+def test_sweep(client, tmp_path):
+    experiment = create_experiment(client, tmp_path)
+    body = {
+        "minEpochs": 1,
+        "maxEpochs": 1,
+        "rules": [{"left": "feature1", "op": ">=", "right": 2}, {"left": "feature2", "op": "<", "right": 4}],
+        "labels": ["feature1>=2", "feature2<4"],
+        "masses": [[0.1, 0.1, 0.8], [0.2, 0.2, 0.6]],
+        "grid": {"learningRate": [0.01, 0.1], "batchSize": [4, 8]},
+    }
+    response = client.post(f"/dsgd/api/train/sweep/{experiment['id']}", json=body)
+    assert response.status_code == 200
+    task_ids = response.json()["task_ids"]
+    # una iteracion por punto de la grilla
+    assert len(task_ids) == 4
+    configs = set()
+    for task_id in task_ids:
+        iteration = client.get(f"/dsgd/api/train/iteration/{task_id}").json()
+        configs.add((iteration["learning_rate"], iteration["batch_size"]))
+    assert configs == {(0.01, 4), (0.01, 8), (0.1, 4), (0.1, 8)}
+
+
+def test_sweep_bad_grid(client, tmp_path):
+    experiment = create_experiment(client, tmp_path)
+    body = {
+        "rules": [{"left": "feature1", "op": ">=", "right": 2}],
+        "labels": ["feature1>=2"],
+        "masses": [[0.1, 0.1, 0.8]],
+    }
+    response = client.post(f"/dsgd/api/train/sweep/{experiment['id']}", json=body)
+    assert response.status_code == 400
+    response = client.post(f"/dsgd/api/train/sweep/{experiment['id']}", json={**body, "grid": {"maxEpochs": [1, 2]}})
+    assert response.status_code == 400
+    response = client.post(f"/dsgd/api/train/sweep/{experiment['id']}", json={**body, "grid": {"learningRate": []}})
+    assert response.status_code == 400
+
+
+def test_sweep_jobs_share_split(client, tmp_path, monkeypatch):
+    import dsmodels.train
+    from routes.train import job_queue
+    loaded = []
+
+    def spy_load_activations(data_path):
+        activations = load_activations(data_path)
+        loaded.append((data_path, activations is not None))
+        return activations
+
+    load_activations = dsmodels.train.load_activations
+    monkeypatch.setattr(dsmodels.train, "load_activations", spy_load_activations)
+    experiment = create_experiment(client, tmp_path)
+    body = {
+        "minEpochs": 1,
+        "maxEpochs": 1,
+        "dropDuplicates": False,
+        "rules": [{"left": "feature1", "op": ">=", "right": 2}, {"left": "feature2", "op": "<", "right": 4}],
+        "labels": ["feature1>=2", "feature2<4"],
+        "masses": [[0.1, 0.1, 0.8], [0.2, 0.2, 0.6]],
+        "grid": {"learningRate": [0.01, 0.1]},
+    }
+    response = client.post(f"/dsgd/api/train/sweep/{experiment['id']}", json=body)
+    assert response.status_code == 200
+    task_ids = response.json()["task_ids"]
+    data_paths = {job_queue.get(task_id).data_path for task_id in task_ids}
+    assert len(data_paths) == 1
+    data_path = data_paths.pop()
+    deadline = time.time() + 30
+    while any(job_queue.is_pending(task_id) for task_id in task_ids) or os.path.exists(data_path):
+        assert time.time() < deadline, "El barrido no terminó"
+        time.sleep(0.1)
+    # cada trabajo entrena sobre el split compartido con las activaciones precalculadas
+    # trabajos de otros tests pueden seguir corriendo en los workers
+    assert [entry for entry in loaded if entry[0] == data_path] == [(data_path, True)] * len(task_ids)
+    for task_id in task_ids:
+        iteration = client.get(f"/dsgd/api/train/iteration/{task_id}").json()
+        assert iteration["training_status"] == "completed"
+
+
+def test_priority_validation(client, tmp_path):
+    experiment = create_experiment(client, tmp_path)
+    body = {
+        "minEpochs": 1,
+        "maxEpochs": 1,
+        "rules": [{"left": "feature1", "op": ">=", "right": 2}],
+        "labels": ["feature1>=2"],
+        "masses": [[0.1, 0.1, 0.8]],
+    }
+    # la prioridad es un entero pequeño, nadie se adelanta a todos los demás usuarios
+    for priority in [-1, settings.MAX_JOB_PRIORITY + 1, 10**9, "1", 1.5, True]:
+        response = client.post(f"/dsgd/api/train/train-model/{experiment['id']}", json={**body, "priority": priority})
+        assert response.status_code == 400
+        response = client.post(f"/dsgd/api/train/sweep/{experiment['id']}", json={**body, "priority": priority, "grid": {"learningRate": [0.01]}})
+        assert response.status_code == 400
+    response = client.post(f"/dsgd/api/train/train-model/{experiment['id']}", json={**body, "priority": settings.MAX_JOB_PRIORITY})
+    assert response.status_code == 200
+    from routes.train import job_queue
+    assert job_queue.get(response.json()["task_id"]).priority == settings.MAX_JOB_PRIORITY
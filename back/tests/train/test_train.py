@@ -1,6 +1,10 @@
 import json
 import pandas as pd
 import random
+from datetime import datetime
+from models import Iteration
+from models.iteration import Status
+from tests.conftest import TestingSessionLocal
 
 
 def test_train_model_1file(client, tmp_path):
@@ -376,4 +380,52 @@ def test_train_ws(client, tmp_path):
     assert "label_encoder" in iteration
     assert "training_start_time" in iteration
     assert "training_end_time" in iteration
-    assert "training_message" in iteration
\ No newline at end of file
+    assert "training_message" in iteration
+
+def test_websocket_finished_iteration(client):
+    # una tarea que terminó sin clientes conectados se responde desde la iteración
+    db = TestingSessionLocal()
+    iteration = Iteration(created_at=datetime.now(), experiment_id=1, training_status=Status.COMPLETED)
+    db.add(iteration)
+    db.commit()
+    iteration_id = iteration.id
+    db.close()
+    with client.websocket_connect(f"/dsgd/api/train/ws/{iteration_id}") as websocket:
+        assert websocket.receive_text() == "Training finished ✅"
+    db = TestingSessionLocal()
+    assert db.query(Iteration).filter(Iteration.id == iteration_id).first().training_status == Status.COMPLETED
+    db.close()
+
+
+def test_websocket_pending_fold(client):
+    # el último fold terminó pero otro sigue en ejecución, la tarea no se da por perdida
+    from datetime import timedelta
+    from core.jobQueue import JobStatus, TrainingJob
+    from core.progressBus import progress_bus
+    from routes.train import job_queue
+    db = TestingSessionLocal()
+    iteration = Iteration(created_at=datetime.now(), experiment_id=1, training_status=Status.RUNNING)
+    db.add(iteration)
+    db.commit()
+    task_id = str(iteration.id)
+    db.close()
+    with job_queue.Session() as queue_db:
+        running = TrainingJob(task_id=task_id, task="m:f", payload={"max_iter": 7, "fold": 0}, status=JobStatus.RUNNING,
+                              worker_id="other", lease_expires_at=datetime.now() + timedelta(minutes=5), attempts=1, created_at=datetime.now())
+        done = TrainingJob(task_id=task_id, task="m:f", payload={"max_iter": 7, "fold": 1}, status=JobStatus.DONE,
+                           attempts=1, created_at=datetime.now(), finished_at=datetime.now())
+        queue_db.add_all([running, done])
+        queue_db.commit()
+    try:
+        with client.websocket_connect(f"/dsgd/api/train/ws/{task_id}") as websocket:
+            message = json.loads(websocket.receive_text())
+            assert message["status"] == "Task enqueued"
+            assert message["max"] == 7
+        db = TestingSessionLocal()
+        assert db.query(Iteration).filter(Iteration.id == int(task_id)).first().training_status == Status.RUNNING
+        db.close()
+    finally:
+        with job_queue.Session() as queue_db:
+            queue_db.query(TrainingJob).filter(TrainingJob.task_id == task_id).update({"status": JobStatus.DONE})
+            queue_db.commit()
+        progress_bus.finish(task_id)
@@ -0,0 +1,79 @@
+import threading
+from sqlalchemy import JSON, Column, Integer, MetaData, String, Table, create_engine, inspect, text
+import models
+from database import Base, session_for, upgrade_schema
+
+
+def test_worker_sessions(tmp_path):
+    url = f"sqlite:///{tmp_path / 'worker.db'}"
+    db = session_for(url)
+    try:
+        assert db.execute(text("PRAGMA journal_mode")).scalar() == "wal"
+        assert db.get_bind().pool.size() >= 1
+    finally:
+        db.close()
+    # cada trabajo tiene su propia sesión, compartiendo el engine
+    assert session_for(url) is not session_for(url)
+    assert session_for(url).get_bind() is session_for(url).get_bind()
+
+
+def test_worker_sessions_from_threads(tmp_path):
+    url = f"sqlite:///{tmp_path / 'threads.db'}"
+    db = session_for(url)
+    db.execute(text("CREATE TABLE t (x INTEGER)"))
+    db.commit()
+    db.close()
+    errors = []
+
+    def job(i):
+        session = session_for(url)
+        try:
+            for _ in range(20):
+                session.execute(text("INSERT INTO t VALUES (:x)"), {"x": i})
+                session.commit()
+        except Exception as e:
+            errors.append(e)
+        finally:
+            session.close()
+
+    threads = [threading.Thread(target=job, args=(i,)) for i in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert errors == []
+    db = session_for(url)
+    assert db.execute(text("SELECT COUNT(*) FROM t")).scalar() == 80
+    db.close()
+
+
+def test_upgrade_schema(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'old.db'}")
+    old = MetaData()
+    Table("items", old, Column("id", Integer, primary_key=True), Column("name", String))
+    old.create_all(engine)
+    with engine.begin() as conn:
+        conn.execute(text("INSERT INTO items (id, name) VALUES (1, 'a')"))
+
+    # la version nueva del modelo agrega columnas a la tabla existente
+    new = MetaData()
+    Table(
+        "items", new,
+        Column("id", Integer, primary_key=True),
+        Column("name", String),
+        Column("content_hash", String(64), index=True, nullable=True),
+        Column("curve", JSON, nullable=True),
+    )
+    assert upgrade_schema(engine, new) == ["items.content_hash", "items.curve"]
+    inspector = inspect(engine)
+    assert {column["name"] for column in inspector.get_columns("items")} == {"id", "name", "content_hash", "curve"}
+    assert [index["column_names"] for index in inspector.get_indexes("items")] == [["content_hash"]]
+    with engine.connect() as conn:
+        assert conn.execute(text("SELECT name, content_hash, curve FROM items")).all() == [("a", None, None)]
+    assert upgrade_schema(engine, new) == []
+
+
+def test_upgrade_schema_current_models(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'current.db'}")
+    Base.metadata.create_all(bind=engine)
+    assert upgrade_schema(engine) == []
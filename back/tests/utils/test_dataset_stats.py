@@ -0,0 +1,81 @@
+import os
+import pandas as pd
+from pathlib import Path
+
+from models.dataset_file import FileType, DatasetType
+from utils.datasetStats import compute_stats, load_preview, read_head, stats_path, write_stats
+from utils.loadDataset import cache_path, read_dataset_file, remove_cache
+
+
+class MockDatasetFile:
+    def __init__(self, file_path, type_file, dataset_type, header=True):
+        self.file_path = file_path
+        self.type_file = type_file
+        self.dataset_type = dataset_type
+        self.header = header
+
+
+def test_compute_stats():
+    df = pd.DataFrame({
+        "feature1": [1, 2, 3, None],
+        "feature2": ["A", "B", "A", "C"]
+    })
+    stats = compute_stats(df)
+    assert stats[0]["column"] == "feature1"
+    assert stats[0]["nulls"] == 1
+    assert stats[0]["nullPercent"] == 25.0
+    assert stats[0]["min"] == 1
+    assert stats[0]["max"] == 3
+    assert stats[0]["mean"] == 2.0
+    assert sum(b["count"] for b in stats[0]["histogram"]) == 3
+    assert stats[1]["type"] == "object"
+    assert stats[1]["uniqueCount"] == 3
+    assert stats[1]["min"] is None
+    assert {b["bin"]: b["count"] for b in stats[1]["histogram"]} == {"A": 2, "B": 1, "C": 1}
+
+
+def test_load_preview_uses_snapshot(tmp_path: Path):
+    df = pd.DataFrame({"A": list(range(20)), "B": ["x", "y"] * 10})
+    csv_path = tmp_path / "preview.csv"
+    df.to_csv(csv_path, index=False)
+    dataset_file = MockDatasetFile(csv_path, FileType.CSV, DatasetType.ALL)
+
+    X = read_dataset_file(dataset_file, columns=["A", "B"])
+    stats = write_stats(dataset_file, X, columns=["A", "B"])
+    assert os.path.exists(stats_path(dataset_file, ["A", "B"]))
+
+    data, preview_stats = load_preview(dataset_file, columns=["A", "B"], n_rows=5)
+    assert preview_stats == stats
+    assert len(data) == 5
+    assert data.to_dict(orient="records")[0] == {"A": 0, "B": "x"}
+
+    remove_cache(dataset_file)
+    assert not os.path.exists(stats_path(dataset_file, ["A", "B"]))
+
+
+def test_load_preview_without_snapshot(tmp_path: Path):
+    df = pd.DataFrame({"A": [1, 2, 3]})
+    csv_path = tmp_path / "nostats.csv"
+    df.to_csv(csv_path, index=False)
+    dataset_file = MockDatasetFile(csv_path, FileType.CSV, DatasetType.ALL)
+
+    data, stats = load_preview(dataset_file)
+    assert data.equals(df)
+    assert stats == compute_stats(df)
+    assert os.path.exists(stats_path(dataset_file))
+    remove_cache(dataset_file)
+
+
+def test_read_head_ignores_stale_cache(tmp_path: Path):
+    df = pd.DataFrame({"A": [1, 2, 3]})
+    csv_path = tmp_path / "stale.csv"
+    df.to_csv(csv_path, index=False)
+    dataset_file = MockDatasetFile(csv_path, FileType.CSV, DatasetType.ALL)
+    read_dataset_file(dataset_file, columns=["A"])
+    path = cache_path(dataset_file, ["A"])
+
+    # el archivo cambia despues de generar el cache
+    pd.DataFrame({"A": [7, 8]}).to_csv(csv_path, index=False)
+    os.utime(csv_path, (os.path.getmtime(path) + 10, os.path.getmtime(path) + 10))
+    assert read_head(dataset_file, ["A"], n_rows=5)["A"].tolist() == [7, 8]
+    remove_cache(dataset_file)
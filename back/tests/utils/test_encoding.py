@@ -0,0 +1,87 @@
+from collections import Counter
+from pathlib import Path
+import numpy as np
+import pandas as pd
+
+from models.dataset_file import FileType, DatasetType
+from utils.encoding import OTHER_CATEGORY, ColumnsEncoder, vocabulary, encode_column, read_vocabulary, write_vocabulary
+from utils.loadDataset import remove_cache, scan_dataset_file
+
+
+class MockDatasetFile:
+    def __init__(self, file_path, type_file, dataset_type, header=True):
+        self.file_path = file_path
+        self.type_file = type_file
+        self.dataset_type = dataset_type
+        self.header = header
+
+
+def test_vocabulary_without_limit():
+    counts = Counter({"b": 1, "a": 5, "c": 2})
+    assert vocabulary(counts) == {"a": 0, "b": 1, "c": 2}
+
+
+def test_vocabulary_max_categories():
+    """Se conservan los valores más frecuentes y el resto se agrupa"""
+    counts = Counter({"a": 5, "b": 1, "c": 2, "d": 2, "e": 7})
+    encoder = vocabulary(counts, max_categories=3)
+    assert encoder == {"a": 0, "e": 1, OTHER_CATEGORY: 2}
+    # con menos valores que el limite no se agrupa
+    assert OTHER_CATEGORY not in vocabulary(counts, max_categories=5)
+
+
+def test_encode_column():
+    values = pd.Series(["a", "b", None, "z", "7"])
+    encoded = encode_column(values, {"a": 0, "b": 1, OTHER_CATEGORY: 2})
+    assert encoded.dtype == np.float32
+    assert encoded[[0, 1, 3, 4]].tolist() == [0, 1, 2, 2]
+    assert np.isnan(encoded[2])
+    # sin OTHER_CATEGORY los valores desconocidos se mantienen si son numéricos
+    encoded = encode_column(values, {"a": 0, "b": 1})
+    assert encoded[4] == 7
+    assert np.isnan(encoded[3])
+
+
+def test_columns_encoder_matches_replace():
+    """La codificación vectorizada da lo mismo que DataFrame.replace con el diccionario"""
+    rng = np.random.default_rng(0)
+    labels = np.array([f"c{i}" for i in range(1000)])
+    X = pd.DataFrame({
+        "cat": rng.choice(labels, 5000),
+        "num": rng.normal(size=5000),
+        "target": rng.choice(["no", "si"], 5000),
+    })
+    columns_encoder = {
+        "cat": {label: idx for idx, label in enumerate(sorted(labels))},
+        "target": {"no": 0, "si": 1},
+    }
+    encoder = ColumnsEncoder(columns_encoder)
+
+    matrix = encoder.feature_matrix(X, ["cat", "num"])
+    assert matrix.dtype == np.float32 and matrix.flags["C_CONTIGUOUS"]
+    expected = X[["cat", "num"]].replace({"cat": columns_encoder["cat"]}).to_numpy(dtype=np.float32)
+    np.testing.assert_array_equal(matrix, expected)
+
+    y, label_to_num = encoder.encode_target(X["target"], "target")
+    assert label_to_num == {"no": 0, "si": 1}
+    assert y.tolist() == X["target"].replace(columns_encoder["target"]).tolist()
+    assert y.index.equals(X.index)
+
+    transformed = encoder.transform(X.copy())
+    np.testing.assert_array_equal(transformed["cat"].to_numpy(), matrix[:, 0])
+
+
+def test_vocabulary_roundtrip(tmp_path: Path):
+    df = pd.DataFrame({"A": [1, 2, 3], "B": ["x", "y", "x"], "target": [0, 1, 1]})
+    csv_path = tmp_path / "vocab.csv"
+    df.to_csv(csv_path, index=False)
+    dataset_file = MockDatasetFile(csv_path, FileType.CSV, DatasetType.ALL)
+    columns = ["A", "B", "target"]
+
+    assert read_vocabulary(dataset_file, columns) is None
+    summary = scan_dataset_file(dataset_file, columns, "target")
+    write_vocabulary(dataset_file, summary, columns)
+    summary.pop("stats")
+    assert read_vocabulary(dataset_file, columns) == summary
+    remove_cache(dataset_file)
+    assert read_vocabulary(dataset_file, columns) is None
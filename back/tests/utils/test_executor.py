@@ -0,0 +1,174 @@
+import multiprocessing
+import os
+import time
+import numpy as np
+import pandas as pd
+from core.executor import ProcessExecutor, ThreadExecutor, LocalProgress, STOP_MESSAGE, create_executor, task_name
+from core.jobQueue import JobQueue, JobStatus, TrainingJob
+from core.progressBus import progress_bus
+from utils.trainingData import load_split, remove_split, save_split
+
+
+def fake_train(data_path=None, tasks_id=None, progress=None, offset=0):
+    X_train, X_test, y_train, y_test, columns = load_split(data_path)
+    progress.update(tasks_id, f"{len(X_train)},{len(X_test)},{int(np.sum(y_train)) + offset}")
+
+
+def fail_train(data_path=None, tasks_id=None, progress=None):
+    raise ValueError("fallo inmediato")
+
+
+def wait_for_stop(data_path=None, tasks_id=None, progress=None):
+    deadline = time.time() + 10
+    while not progress.stopped(tasks_id):
+        if time.time() > deadline:
+            raise TimeoutError("no se detuvo")
+        time.sleep(0.02)
+
+
+def report_daemon(data_path=None, tasks_id=None, progress=None):
+    progress.update(tasks_id, str(multiprocessing.current_process().daemon))
+
+
+def make_data():
+    X = pd.DataFrame({"a": [1.0, 2.0, 3.0, 4.0], "b": [0, 1, 0, 1]})
+    y = pd.Series([0, 1, 0, 1])
+    return X.iloc[:3], X.iloc[3:], y.iloc[:3], y.iloc[3:]
+
+
+def make_queue(tmp_path):
+    return JobQueue(f"sqlite:///{tmp_path / 'queue.db'}")
+
+
+def test_create_executor(tmp_path):
+    assert isinstance(create_executor("thread", make_queue(tmp_path), 1), ThreadExecutor)
+    assert isinstance(create_executor("process", make_queue(tmp_path), 1), ProcessExecutor)
+
+
+def test_thread_executor_run(tmp_path):
+    executor = ThreadExecutor(make_queue(tmp_path), 1)
+    executor.submit(fake_train, {"data": make_data(), "offset": np.int64(10)}, "t-thread")
+    job = executor.job_queue.claim("w")
+    assert job.payload == {"offset": 10}
+    executor.run(job)
+    remove_split(job.data_path)
+    assert progress_bus.get("t-thread") == "3,1,11"
+
+
+def test_process_executor_run(tmp_path):
+    executor = ProcessExecutor(make_queue(tmp_path), 1)
+    executor.submit(fake_train, {"data": make_data()}, "t-process")
+    job = executor.job_queue.claim("w")
+    assert os.path.exists(job.data_path)
+    executor.run(job)
+    remove_split(job.data_path)
+    assert progress_bus.get("t-process") == "3,1,1"
+
+
+def test_local_progress_stopped():
+    progress = LocalProgress()
+    progress.update("t-stop", "running")
+    assert not progress.stopped("t-stop")
+    progress_bus.request_stop("t-stop", STOP_MESSAGE)
+    assert progress.stopped("t-stop")
+    assert progress_bus.get("t-stop") == STOP_MESSAGE
+
+
+def test_finished_task_is_forgotten(tmp_path):
+    # sin clientes conectados el estado y la detención se olvidan al terminar el trabajo
+    executor = ThreadExecutor(make_queue(tmp_path), 1)
+    progress_bus.request_stop("t-forget", STOP_MESSAGE)
+    job = executor.submit(fake_train, {"data": make_data()}, "t-forget")
+    executor.start()
+    deadline = time.time() + 10
+    while executor.job_queue.is_pending("t-forget") or progress_bus.get("t-forget") is not None:
+        assert time.time() < deadline
+        time.sleep(0.05)
+    assert not progress_bus.stopped("t-forget")
+    assert not os.path.exists(job.data_path)
+
+
+def test_process_executor_daemon(tmp_path):
+    # el proceso del entrenamiento no sobrevive al servidor
+    executor = ProcessExecutor(make_queue(tmp_path), 1)
+    executor.submit(report_daemon, {"data": make_data()}, "t-daemon")
+    job = executor.job_queue.claim("w")
+    executor.run(job)
+    remove_split(job.data_path)
+    assert progress_bus.get("t-daemon") == "True"
+
+
+def test_shared_split_jobs_enqueued_together(tmp_path):
+    # un trabajo que falla de inmediato no elimina el split antes de que corran los demás
+    executor = ThreadExecutor(make_queue(tmp_path), 1)
+    executor.start()
+    data_path = save_split(str(tmp_path / "shared"), *make_data())
+    jobs = executor.job_queue.put_many([
+        {"task_id": task_id, "task": task_name(func), "payload": {}, "data_path": data_path}
+        for task_id, func in [("t-many-1", fail_train), ("t-many-2", fake_train), ("t-many-3", fake_train)]
+    ])
+    deadline = time.time() + 10
+    while executor.job_queue.data_in_use(data_path) or os.path.exists(data_path):
+        assert time.time() < deadline
+        time.sleep(0.05)
+    assert [executor.job_queue.get(job.task_id).status for job in jobs] == [JobStatus.FAILED, JobStatus.DONE, JobStatus.DONE]
+
+
+def test_submit_many(tmp_path):
+    executor = ThreadExecutor(make_queue(tmp_path), 1)
+    data_path = save_split(str(tmp_path / "shared"), *make_data())
+    jobs = executor.submit_many(fake_train, [({"offset": np.int64(1)}, "t-a"), ({}, "t-b")], data_path, user_id=3, priority=2)
+    assert [(job.task_id, job.data_path, job.user_id, job.priority) for job in jobs] == [
+        ("t-a", data_path, 3, 2), ("t-b", data_path, 3, 2)]
+    assert jobs[0].payload == {"offset": 1}
+    assert executor.job_queue.claim("w").task_id == "t-a"
+    remove_split(data_path)
+
+
+def wait_finished(job_queue, task_id):
+    deadline = time.time() + 10
+    while job_queue.is_pending(task_id):
+        assert time.time() < deadline
+        time.sleep(0.05)
+    with job_queue.Session() as db:
+        return db.query(TrainingJob).filter(TrainingJob.task_id == task_id).order_by(TrainingJob.id).all()
+
+
+def test_failed_job_cancels_task(tmp_path):
+    # un fold que falla detiene al que corre y cancela al encolado
+    executor = ThreadExecutor(make_queue(tmp_path), 2)
+    data_path = save_split(str(tmp_path / "shared"), *make_data())
+    executor.job_queue.put_many([
+        {"task_id": "t-cv-fail", "task": task_name(func), "payload": {}, "data_path": data_path}
+        for func in [wait_for_stop, fail_train, fake_train]
+    ])
+    executor.start()
+    jobs = wait_finished(executor.job_queue, "t-cv-fail")
+    assert [job.status for job in jobs] == [JobStatus.DONE, JobStatus.FAILED, JobStatus.FAILED]
+    assert jobs[1].error == "fallo inmediato"
+    assert jobs[2].error == "Cancelled, another job of the task failed: fallo inmediato"
+    assert not os.path.exists(data_path)
+    assert not progress_bus.stopped("t-cv-fail")
+
+
+def test_stopped_task_cancels_queued_jobs(tmp_path):
+    executor = ThreadExecutor(make_queue(tmp_path), 1)
+    data_path = save_split(str(tmp_path / "shared"), *make_data())
+    executor.job_queue.put_many([
+        {"task_id": "t-cv-stop", "task": task_name(func), "payload": {}, "data_path": data_path}
+        for func in [wait_for_stop, fake_train]
+    ])
+    executor.start()
+    # se detiene mientras corre el primer trabajo
+    deadline = time.time() + 10
+    while True:
+        with executor.job_queue.Session() as db:
+            if db.query(TrainingJob).filter(TrainingJob.task_id == "t-cv-stop", TrainingJob.status == JobStatus.RUNNING).first():
+                break
+        assert time.time() < deadline
+        time.sleep(0.02)
+    progress_bus.request_stop("t-cv-stop", STOP_MESSAGE)
+    jobs = wait_finished(executor.job_queue, "t-cv-stop")
+    assert [job.status for job in jobs] == [JobStatus.DONE, JobStatus.FAILED]
+    assert jobs[1].error == "Cancelled, the task was stopped"
+    assert not os.path.exists(data_path)
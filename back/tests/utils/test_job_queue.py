@@ -0,0 +1,150 @@
+import pytest
+from datetime import datetime, timedelta
+from sqlalchemy import update
+from core.jobQueue import JobQueue, JobStatus, TrainingJob
+
+
+def make_queue(tmp_path, **kwargs):
+    return JobQueue(f"sqlite:///{tmp_path / 'queue.db'}", **kwargs)
+
+
+def test_claim_by_priority(tmp_path):
+    job_queue = make_queue(tmp_path)
+    job_queue.put("1", "m:f", {})
+    job_queue.put("2", "m:f", {}, priority=5)
+    job_queue.put("3", "m:f", {})
+    assert job_queue.claim("w").task_id == "2"
+    assert job_queue.claim("w").task_id == "1"
+    assert job_queue.claim("w").task_id == "3"
+    assert job_queue.claim("w") is None
+
+
+def test_claim_per_user_cap(tmp_path):
+    job_queue = make_queue(tmp_path, max_jobs_per_user=1)
+    job_queue.put("1", "m:f", {}, user_id=1)
+    job_queue.put("2", "m:f", {}, user_id=1)
+    job_queue.put("3", "m:f", {}, user_id=2)
+    first = job_queue.claim("w")
+    assert first.task_id == "1"
+    # el usuario 1 ya tiene un trabajo en ejecución
+    assert job_queue.claim("w").task_id == "3"
+    assert job_queue.claim("w") is None
+    job_queue.finish(first.id, "w")
+    assert job_queue.claim("w").task_id == "2"
+
+
+def test_finish_and_pending(tmp_path):
+    job_queue = make_queue(tmp_path)
+    job_queue.put("1", "m:f", {"max_iter": 5})
+    assert job_queue.is_pending("1")
+    job = job_queue.claim("w")
+    assert job.status == JobStatus.RUNNING
+    assert job.payload == {"max_iter": 5}
+    job_queue.finish(job.id, "w", error="boom")
+    assert not job_queue.is_pending("1")
+    assert job_queue.get("1").status == JobStatus.FAILED
+    assert not job_queue.is_pending("2")
+
+
+def expire(job_queue, job):
+    with job_queue.Session() as db:
+        db.execute(
+            update(TrainingJob)
+            .where(TrainingJob.id == job.id)
+            .values(lease_expires_at=datetime.now() - timedelta(seconds=1))
+        )
+        db.commit()
+
+
+def test_expired_lease_is_reclaimed(tmp_path):
+    # simula un servidor reiniciado con un trabajo en ejecución
+    job_queue = make_queue(tmp_path, max_attempts=2)
+    job_queue.put("1", "m:f", {})
+    job = job_queue.claim("old")
+    assert job_queue.claim("new") is None
+    assert job_queue.heartbeat(job.id, "old")
+    expire(job_queue, job)
+    job = job_queue.claim("new")
+    assert job.task_id == "1" and job.worker_id == "new" and job.attempts == 2
+    assert not job_queue.heartbeat(job.id, "old")
+    # supera el máximo de intentos
+    expire(job_queue, job)
+    assert job_queue.claim("other") is None
+    assert job_queue.get("1").status == JobStatus.FAILED
+
+
+def test_data_in_use(tmp_path):
+    job_queue = make_queue(tmp_path)
+    job_queue.put("1", "m:f", {}, data_path="shared")
+    job_queue.put("2", "m:f", {}, data_path="shared")
+    first = job_queue.claim("w")
+    job_queue.finish(first.id, "w")
+    # el segundo trabajo sigue usando el split compartido
+    assert job_queue.data_in_use("shared")
+    second = job_queue.claim("w")
+    job_queue.finish(second.id, "w")
+    assert not job_queue.data_in_use("shared")
+
+
+def test_expired_lease_fails_job_and_releases_split(tmp_path):
+    failed = []
+    job_queue = make_queue(tmp_path, max_attempts=1, on_failed=lambda job: failed.append((job.task_id, job.status)))
+    shared = tmp_path / "shared"
+    shared.mkdir()
+    job_queue.put("1", "m:f", {}, data_path=str(shared))
+    job_queue.put("2", "m:f", {}, data_path=str(shared))
+    first = job_queue.claim("w")
+    expire(job_queue, first)
+    # el primer trabajo falla pero el segundo aun usa el split
+    second = job_queue.claim("w")
+    assert second.task_id == "2"
+    assert failed == [("1", JobStatus.FAILED)]
+    assert job_queue.get("1").status == JobStatus.FAILED
+    assert job_queue.get("1").error == "Worker lease expired too many times"
+    assert shared.exists()
+    expire(job_queue, second)
+    assert job_queue.claim("w") is None
+    assert failed == [("1", JobStatus.FAILED), ("2", JobStatus.FAILED)]
+    assert not shared.exists()
+
+
+def test_failed_hook_error_keeps_job(tmp_path):
+    def on_failed(job):
+        raise RuntimeError("database unavailable")
+
+    job_queue = make_queue(tmp_path, max_attempts=1, on_failed=on_failed)
+    job_queue.put("1", "m:f", {})
+    job = job_queue.claim("w")
+    expire(job_queue, job)
+    # si no se pudo marcar la iteracion el trabajo no se da por fallido
+    with pytest.raises(RuntimeError):
+        job_queue.claim("w")
+    assert job_queue.get("1").status == JobStatus.RUNNING
+
+
+def test_cancel_queued_jobs(tmp_path):
+    job_queue = make_queue(tmp_path)
+    job_queue.put("1", "m:f", {"fold": 0})
+    job_queue.put("1", "m:f", {"fold": 1})
+    job_queue.put("2", "m:f", {})
+    running = job_queue.claim("w")
+    # solo se cancelan los trabajos encolados de la tarea
+    assert job_queue.cancel("1", "Cancelled") == 1
+    assert job_queue.is_pending("1")
+    job_queue.finish(running.id, "w")
+    assert not job_queue.is_pending("1")
+    assert job_queue.get("1").error == "Cancelled"
+    assert job_queue.get("2").status == JobStatus.QUEUED
+
+
+def test_expired_lease_cancels_queued_siblings(tmp_path):
+    job_queue = make_queue(tmp_path, max_attempts=1, max_jobs_per_user=1)
+    job_queue.put("1", "m:f", {"fold": 0}, user_id=1)
+    job_queue.put("1", "m:f", {"fold": 1}, user_id=1)
+    job = job_queue.claim("w")
+    expire(job_queue, job)
+    assert job_queue.claim("w") is None
+    sibling = job_queue.get("1")
+    assert sibling.payload == {"fold": 1}
+    assert sibling.status == JobStatus.FAILED
+    assert sibling.error == "Cancelled, another job of the task failed: Worker lease expired too many times"
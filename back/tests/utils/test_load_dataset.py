@@ -1,9 +1,10 @@
+import os
 import pandas as pd
 import pytest
 from pathlib import Path
 
 from models.dataset_file import FileType, DatasetType
-from utils.loadDataset import load_datasets
+from utils.loadDataset import load_datasets, cache_path, remove_cache, read_dataset_file, scan_dataset_file
 
 class MockDatasetFile:
     def __init__(self, file_path, type_file, dataset_type, header=True):
@@ -96,3 +97,85 @@ def test_load_datasets_invalid_type(tmp_path: Path):
 
     with pytest.raises(ValueError, match="Unsupported file type"):
         load_datasets(dataset_files, fileTypes=[fake_type])
+
+
+def test_load_datasets_uses_cache(tmp_path: Path):
+    """Verifica que la segunda lectura usa el cache Parquet y que se regenera si cambia el archivo"""
+    df = pd.DataFrame({"A": [1, 2, 3], "B": ["x", "y", "z"]})
+    csv_path = tmp_path / "cached.csv"
+    df.to_csv(csv_path, index=False)
+    dataset_file = MockDatasetFile(csv_path, FileType.CSV, DatasetType.ALL, header=True)
+
+    first = load_datasets([dataset_file], columns=["A", "B"])[0]["data"]
+    path = cache_path(dataset_file, ["A", "B"])
+    assert os.path.exists(path)
+    second = load_datasets([dataset_file], columns=["A", "B"])[0]["data"]
+    assert first.equals(df)
+    assert second.equals(df)
+
+    # el archivo cambia despues de generar el cache
+    df2 = pd.DataFrame({"A": [4, 5], "B": ["u", "v"]})
+    df2.to_csv(csv_path, index=False)
+    os.utime(csv_path, (os.path.getmtime(path) + 10, os.path.getmtime(path) + 10))
+    third = load_datasets([dataset_file], columns=["A", "B"])[0]["data"]
+    assert third.equals(df2)
+
+    remove_cache(dataset_file)
+    assert not os.path.exists(path)
+
+
+def test_scan_dataset_file_by_chunks(tmp_path: Path):
+    """Verifica que el recorrido por bloques cuenta filas, junta categorias y deja el mismo cache que una lectura completa"""
+    df = pd.DataFrame({
+        "A": range(10),
+        "B": ["x", "y", "z", "x", "y", "z", "x", "y", "z", "w"],
+        "C": ["a", 1, 1, 1, 1, 1, "b", 1, 1, 1],
+        "target": [0, 1, 2, 0, 1, 2, 0, 1, 2, 0],
+    })
+    csv_path = tmp_path / "chunked.csv"
+    df.to_csv(csv_path, index=False)
+    dataset_file = MockDatasetFile(csv_path, FileType.CSV, DatasetType.ALL, header=True)
+    columns = ["A", "B", "C", "target"]
+
+    summary = scan_dataset_file(dataset_file, columns, "target", chunk_rows=3)
+    assert summary["n_rows"] == 10
+    assert summary["categories"]["B"] == {"x": 3, "y": 3, "z": 3, "w": 1}
+    # numerica en unos bloques y texto en otros, se lee como texto igual que pandas
+    assert summary["categories"]["C"] == {"1": 8, "a": 1, "b": 1}
+    assert "A" not in summary["categories"]
+    assert summary["numeric_values"] == {"target": {0: 4, 1: 3, 2: 3}}
+
+    expected = pd.read_csv(csv_path, header=0, names=columns)
+    cached = pd.read_parquet(cache_path(dataset_file, columns))
+    assert cached.equals(expected)
+    assert read_dataset_file(dataset_file, columns=columns).equals(expected)
+    remove_cache(dataset_file)
+
+
+def test_scan_dataset_file_invalid_columns(tmp_path: Path):
+    """Verifica que falla si el archivo no tiene las columnas declaradas"""
+    df = pd.DataFrame({"A": [1, 2], "B": [3, 4]})
+    csv_path = tmp_path / "columns.csv"
+    df.to_csv(csv_path, index=False)
+    dataset_file = MockDatasetFile(csv_path, FileType.CSV, DatasetType.ALL, header=True)
+
+    with pytest.raises(ValueError, match="columnas"):
+        scan_dataset_file(dataset_file, ["A", "B", "C"])
+    assert not os.path.exists(cache_path(dataset_file, ["A", "B", "C"]))
+
+
+def test_concurrent_cache_writes(tmp_path: Path):
+    """Escrituras simultáneas del mismo cache no comparten el archivo temporal"""
+    from concurrent.futures import ThreadPoolExecutor
+    from utils.loadDataset import write_cache
+    df = pd.DataFrame({"A": range(50_000), "B": ["x", "y"] * 25_000})
+    csv_path = tmp_path / "concurrent.csv"
+    df.to_csv(csv_path, index=False)
+    dataset_file = MockDatasetFile(csv_path, FileType.CSV, DatasetType.ALL, header=True)
+    path = cache_path(dataset_file, ["A", "B"])
+
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        list(pool.map(lambda _: write_cache(df, path), range(8)))
+    assert pd.read_parquet(path).equals(df)
+    assert [p for p in os.listdir(os.path.dirname(path)) if p.endswith(".tmp")] == []
+    remove_cache(dataset_file)
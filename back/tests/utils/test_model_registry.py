@@ -0,0 +1,80 @@
+import os
+from pathlib import Path
+
+from utils.modelRegistry import ModelRegistry
+
+
+class CountingLoader:
+    def __init__(self):
+        self.calls = 0
+
+    def __call__(self, model_path, n_classes):
+        self.calls += 1
+        return {"path": model_path, "n_classes": n_classes, "load": self.calls}
+
+
+def write_model(path: Path, size=10):
+    path.write_bytes(b"0" * size)
+    return str(path)
+
+
+def test_registry_reuses_loaded_model(tmp_path: Path):
+    loader = CountingLoader()
+    registry = ModelRegistry(loader)
+    path = write_model(tmp_path / "model.bin")
+
+    first = registry.get(1, path, 2)
+    second = registry.get(1, path, 2)
+    assert first is second
+    assert loader.calls == 1
+
+
+def test_registry_reloads_when_file_changes(tmp_path: Path):
+    loader = CountingLoader()
+    registry = ModelRegistry(loader)
+    path = write_model(tmp_path / "model.bin")
+
+    registry.get(1, path, 2)
+    stat = os.stat(path)
+    os.utime(path, (stat.st_atime, stat.st_mtime + 10))
+    model = registry.get(1, path, 2)
+    assert model["load"] == 2
+
+
+def test_registry_invalidate(tmp_path: Path):
+    loader = CountingLoader()
+    registry = ModelRegistry(loader)
+    path = write_model(tmp_path / "model.bin")
+
+    registry.get(1, path, 2)
+    registry.invalidate(1)
+    assert 1 not in registry
+    registry.get(1, path, 2)
+    assert loader.calls == 2
+
+
+def test_registry_evicts_least_recently_used(tmp_path: Path):
+    loader = CountingLoader()
+    registry = ModelRegistry(loader, max_models=2)
+    paths = [write_model(tmp_path / f"model_{i}.bin") for i in range(3)]
+
+    registry.get(0, paths[0], 2)
+    registry.get(1, paths[1], 2)
+    registry.get(0, paths[0], 2)
+    registry.get(2, paths[2], 2)
+    assert 0 in registry
+    assert 1 not in registry
+    assert 2 in registry
+    assert len(registry) == 2
+
+
+def test_registry_evicts_by_size(tmp_path: Path):
+    loader = CountingLoader()
+    registry = ModelRegistry(loader, max_bytes=15)
+    first = write_model(tmp_path / "first.bin", size=10)
+    second = write_model(tmp_path / "second.bin", size=10)
+
+    registry.get(1, first, 2)
+    registry.get(2, second, 2)
+    assert 1 not in registry
+    assert 2 in registry
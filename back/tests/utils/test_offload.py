@@ -0,0 +1,61 @@
+import asyncio
+import threading
+import time
+import pytest
+from core.offload import Offloader
+
+
+def test_route_limit_and_stats():
+    offloader = Offloader(4, route_limit=2)
+    lock = threading.Lock()
+    running = {"now": 0, "max": 0}
+
+    def work():
+        with lock:
+            running["now"] += 1
+            running["max"] = max(running["max"], running["now"])
+        time.sleep(0.05)
+        with lock:
+            running["now"] -= 1
+        return "ok"
+
+    async def main():
+        return await asyncio.gather(*[offloader.run("preview", work) for _ in range(6)])
+
+    assert asyncio.run(main()) == ["ok"] * 6
+    # el pool tiene 4 threads pero la ruta solo usa 2
+    assert running["max"] == 2
+    stats = offloader.stats()["routes"]["preview"]
+    assert stats["completed"] == 6
+    assert stats["queued"] == 0
+    assert stats["running"] == 0
+    assert stats["max_wait_time"] >= 0.05
+
+
+def test_errors_propagate():
+    offloader = Offloader(1)
+
+    def fail():
+        raise ValueError("boom")
+
+    with pytest.raises(ValueError):
+        asyncio.run(offloader.run("predict", fail))
+    assert offloader.stats()["routes"]["predict"]["failed"] == 1
+
+
+def test_event_loop_not_blocked():
+    offloader = Offloader(1)
+    ticks = []
+
+    async def ticker():
+        for _ in range(5):
+            ticks.append(time.perf_counter())
+            await asyncio.sleep(0.01)
+
+    async def main():
+        await asyncio.gather(offloader.run("upload", time.sleep, 0.1), ticker())
+
+    asyncio.run(main())
+    # el ticker avanza mientras el trabajo bloqueante corre en el pool
+    assert len(ticks) == 5
+    assert ticks[-1] - ticks[0] < 0.1
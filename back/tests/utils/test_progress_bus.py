@@ -0,0 +1,62 @@
+import asyncio
+import threading
+from core.progressBus import ProgressBus
+
+
+def test_publish_from_thread_and_replay():
+    async def scenario():
+        bus = ProgressBus()
+        bus.publish("1", "enqueued")
+        updates = bus.subscribe("1")
+        # al suscribirse se recibe el último estado
+        assert await asyncio.wait_for(updates.get(), 1) == "enqueued"
+        other = bus.subscribe("1")
+        assert await asyncio.wait_for(other.get(), 1) == "enqueued"
+        t = threading.Thread(target=bus.publish, args=("1", "epoch 1"))
+        t.start()
+        t.join()
+        assert await asyncio.wait_for(updates.get(), 1) == "epoch 1"
+        assert await asyncio.wait_for(other.get(), 1) == "epoch 1"
+        # los mensajes repetidos no se publican
+        bus.publish("1", "epoch 1")
+        await asyncio.sleep(0.05)
+        assert updates.empty()
+        bus.unsubscribe("1", other)
+        bus.unsubscribe("1", updates, discard=True)
+        assert bus.get("1") is None
+
+    asyncio.run(scenario())
+
+
+def test_slow_subscriber_keeps_latest():
+    async def scenario():
+        bus = ProgressBus()
+        updates = bus.subscribe("1")
+        for epoch in range(10):
+            bus.publish("1", f"epoch {epoch}")
+        await asyncio.sleep(0.05)
+        assert updates.get_nowait() == "epoch 9"
+        assert updates.empty()
+
+    asyncio.run(scenario())
+
+
+def test_stop_request():
+    bus = ProgressBus()
+    assert not bus.stopped("1")
+    bus.request_stop("1", "stop")
+    assert bus.stopped("1")
+    assert bus.get("1") == "stop"
+    # sin mensaje solo se marca la detención
+    bus.request_stop("2")
+    assert bus.stopped("2")
+    assert bus.get("2") is None
+
+
+def test_finish_forgets_task():
+    bus = ProgressBus()
+    bus.request_stop("1", "stop")
+    bus.publish("1", "Training finished")
+    bus.finish("1")
+    assert bus.get("1") is None
+    assert not bus.stopped("1")
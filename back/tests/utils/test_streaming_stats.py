@@ -0,0 +1,55 @@
+import numpy as np
+import pandas as pd
+from pathlib import Path
+
+from models.dataset_file import FileType, DatasetType
+from utils.datasetStats import compute_stats
+from utils.loadDataset import remove_cache, scan_dataset_file
+from utils.streamingStats import StreamingStats
+
+
+class MockDatasetFile:
+    def __init__(self, file_path, type_file, dataset_type, header=True):
+        self.file_path = file_path
+        self.type_file = type_file
+        self.dataset_type = dataset_type
+        self.header = header
+
+
+def test_scan_stats_match_full_read(tmp_path: Path):
+    """Las estadísticas acumuladas por bloques son las mismas que las de leer el archivo completo"""
+    df = pd.DataFrame({
+        "A": range(10),
+        "B": [1.5, 2.0, 3.25, 4.0, 5.0, 6.0, 7.0, 8.0, None, 10.0],
+        "C": ["x", "y", "z", "x", "y", "z", "x", "y", None, "w"],
+        "D": ["a", 1, 1, 1, 1, 1, "b", 1, 1, 1],
+        "target": [0, 1, 2, 0, 1, 2, 0, 1, 2, 0],
+    })
+    csv_path = tmp_path / "stats.csv"
+    df.to_csv(csv_path, index=False)
+    dataset_file = MockDatasetFile(csv_path, FileType.CSV, DatasetType.ALL)
+    columns = list(df.columns)
+
+    summary = scan_dataset_file(dataset_file, columns, "target", chunk_rows=3)
+    expected = compute_stats(pd.read_csv(csv_path, header=0, names=columns, dtype={"D": str}))
+    assert summary["stats"] == expected
+    remove_cache(dataset_file)
+
+
+def test_stats_over_distinct_limit():
+    """Sobre el límite de valores distintos los únicos y el histograma se estiman"""
+    rng = np.random.default_rng(1)
+    values = rng.integers(0, 50_000, size=200_000).astype(float)
+    stats = StreamingStats(["A"], max_distinct=1_000, sample_rows=20_000)
+    for start in range(0, values.size, 10_000):
+        stats.update(pd.DataFrame({"A": values[start:start + 10_000]}))
+    result = stats.result()[0]
+    expected = compute_stats(pd.DataFrame({"A": values}))[0]
+
+    assert result["min"] == expected["min"]
+    assert result["max"] == expected["max"]
+    assert result["mean"] == expected["mean"]
+    assert abs(result["uniqueCount"] - expected["uniqueCount"]) / expected["uniqueCount"] < 0.05
+    assert [b["bin"] for b in result["histogram"]] == [b["bin"] for b in expected["histogram"]]
+    for got, want in zip(result["histogram"], expected["histogram"]):
+        assert abs(got["count"] - want["count"]) / want["count"] < 0.05
@@ -0,0 +1,48 @@
+import numpy as np
+import pandas as pd
+from utils.trainingData import as_float_matrix, save_split, load_split, remove_split, fold_assignment
+
+
+def test_as_float_matrix():
+    X = pd.DataFrame({"a": [1, 2], "b": ["x", "y"], "c": [True, False], "d": pd.Series([3, 4], dtype=object)})
+    matrix, columns = as_float_matrix(X)
+    assert columns == ["a", "c", "d"]
+    assert matrix.dtype == np.float32
+    assert matrix.flags["C_CONTIGUOUS"]
+    np.testing.assert_array_equal(matrix, [[1, 1, 3], [2, 0, 4]])
+    # las columnas de prueba se toman en el mismo orden que las de entrenamiento
+    matrix, _ = as_float_matrix(X[["d", "a", "c"]], columns)
+    np.testing.assert_array_equal(matrix, [[1, 1, 3], [2, 0, 4]])
+
+
+def test_save_load_split(tmp_path):
+    X_train = pd.DataFrame({"a": [1.5, 2.5, 3.5], "b": ["x", "y", "z"], "c": [0, 1, 0]})
+    X_test = pd.DataFrame({"c": [1], "a": [4.5], "b": ["w"]})
+    y_train = pd.Series([0, 1, 0], dtype=object)
+    y_test = np.array([1])
+    path = save_split(str(tmp_path / "job"), X_train, X_test, y_train, y_test)
+    X_train_np, X_test_np, y_train_np, y_test_np, columns = load_split(path)
+    assert columns == ["a", "c"]
+    assert isinstance(X_train_np, np.memmap)
+    assert X_train_np.dtype == np.float32
+    np.testing.assert_array_equal(X_train_np, [[1.5, 0], [2.5, 1], [3.5, 0]])
+    np.testing.assert_array_equal(X_test_np, [[4.5, 1]])
+    assert y_train_np.dtype == np.int64
+    np.testing.assert_array_equal(y_train_np, [0, 1, 0])
+    np.testing.assert_array_equal(y_test_np, [1])
+    del X_train_np, X_test_np, y_train_np, y_test_np
+    remove_split(path)
+    assert not (tmp_path / "job").exists()
+
+
+def test_fold_assignment():
+    y = np.array([0] * 8 + [1] * 4)
+    folds = fold_assignment(y, 4, seed=0)
+    assert sorted(np.unique(folds)) == [0, 1, 2, 3]
+    # estratificado, cada fold tiene una fila de la clase minoritaria
+    for fold in range(4):
+        assert (y[folds == fold] == 1).sum() == 1
+    np.testing.assert_array_equal(folds, fold_assignment(y, 4, seed=0))
+    # sin filas suficientes de una clase no se estratifica
+    folds = fold_assignment(np.array([0, 0, 0, 0, 1]), 3)
+    assert sorted(np.unique(folds)) == [0, 1, 2]
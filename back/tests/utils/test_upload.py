@@ -0,0 +1,22 @@
+import asyncio
+import hashlib
+import io
+import os
+from pathlib import Path
+from fastapi import UploadFile
+
+from utils.upload import save_upload
+
+
+def test_save_upload_by_chunks(tmp_path: Path):
+    """Verifica que el archivo se guarda completo por bloques y con su hash"""
+    content = os.urandom(10_000)
+    file = UploadFile(file=io.BytesIO(content), filename="data.csv")
+    path = tmp_path / "data.csv"
+
+    digest, size = asyncio.run(save_upload(file, str(path), chunk_size=1024))
+
+    assert path.read_bytes() == content
+    assert size == len(content)
+    assert digest == hashlib.sha256(content).hexdigest()
+    assert not os.path.exists(f"{path}.part")
@@ -0,0 +1,136 @@
+import json
+import os
+import pandas as pd
+import numpy as np
+import pyarrow.parquet as pq
+from models.dataset_file import FileType, DatasetFile
+from utils.loadDataset import cache_is_fresh, cache_path, read_dataset_file, temp_path
+from utils.sanitize import sanitize_json
+from utils.streamingStats import histogram_entries
+
+
+def column_stats(values: pd.Series, n_rows: int):
+    """
+    Calcula las estadísticas de una columna que se muestran en la previsualización.
+    Args:
+        values (pd.Series): Valores de la columna.
+        n_rows (int): Número total de filas del archivo.
+    Returns:
+        dict: Tipo, nulos, valores únicos, min, max, media e histograma de la columna.
+    """
+    uniques = values.unique()
+    numeric = pd.api.types.is_numeric_dtype(values)
+    if numeric:
+        numeric_vals = values.dropna().astype(float)
+        bins = min(uniques.size, 10)
+        counts, bin_edges = np.histogram(numeric_vals, bins=bins)
+        histogram = histogram_entries(counts, bin_edges)
+    else:
+        histogram = None
+        if uniques.size <= 10:
+            histogram = []
+            value_counts = values.value_counts()
+            for val, count in value_counts.items():
+                histogram.append({
+                    "bin": str(val),
+                    "count": int(count)
+                })
+    nulls = int(values.isnull().sum())
+    return {
+        "column": str(values.name),
+        "type": str(values.dtype),
+        "nulls": nulls,
+        "nullPercent": float(nulls / n_rows * 100) if n_rows else 0.0,
+        "uniqueCount": int(uniques.size),
+        "min": float(round(values.min(), 2)) if numeric else None,
+        "max": float(round(values.max(), 2)) if numeric else None,
+        "mean": float(round(values.mean(), 2)) if numeric else None,
+        "histogram": histogram
+    }
+
+
+def compute_stats(X: pd.DataFrame):
+    """
+    Calcula las estadísticas de todas las columnas de un DataFrame.
+    """
+    return [column_stats(X[col], len(X)) for col in X.columns]
+
+
+def stats_path(dataset_file: DatasetFile, columns=None):
+    """
+    Ruta del snapshot de estadísticas de un archivo de dataset.
+    """
+    return cache_path(dataset_file, columns, extension="stats.json")
+
+
+def write_stats(dataset_file: DatasetFile, X: pd.DataFrame, columns=None):
+    """
+    Calcula y guarda el snapshot de estadísticas de un archivo de dataset.
+    Returns:
+        list: Estadísticas calculadas.
+    """
+    return save_stats(dataset_file, compute_stats(X), columns)
+
+
+def save_stats(dataset_file: DatasetFile, stats: list, columns=None):
+    """
+    Guarda el snapshot de estadísticas ya calculadas de un archivo de dataset, por ejemplo
+    las que acumula scan_dataset_file al recorrer la subida.
+    Returns:
+        list: Estadísticas guardadas.
+    """
+    stats = sanitize_json(stats)
+    path = stats_path(dataset_file, columns)
+    tmp_path = temp_path(path)
+    with open(tmp_path, "w") as f:
+        json.dump(stats, f)
+    os.replace(tmp_path, path)
+    return stats
+
+
+def read_stats(dataset_file: DatasetFile, columns=None):
+    """
+    Lee el snapshot de estadísticas si existe y es más reciente que el archivo original.
+    Returns:
+        list | None: Estadísticas guardadas o None si no hay un snapshot válido.
+    """
+    path = stats_path(dataset_file, columns)
+    if not cache_is_fresh(dataset_file, path):
+        return None
+    with open(path) as f:
+        return json.load(f)
+
+
+def read_head(dataset_file: DatasetFile, columns=None, n_rows=1000):
+    """
+    Lee solo las primeras filas de un archivo desde su versión Parquet, sin cargarlo completo.
+    """
+    if dataset_file.type_file == FileType.PARQUET:
+        path, select = dataset_file.file_path, columns
+    else:
+        path, select = cache_path(dataset_file, columns), None
+    #el cache se regenera si el archivo original es más reciente, igual que en read_dataset_file
+    if dataset_file.type_file == FileType.PARQUET or cache_is_fresh(dataset_file, path):
+        for batch in pq.ParquetFile(path).iter_batches(batch_size=n_rows, columns=select):
+            return batch.to_pandas()
+    return read_dataset_file(dataset_file, columns=columns).head(n_rows)
+
+
+def load_preview(dataset_file: DatasetFile, columns=None, n_rows=1000):
+    """
+    Retorna las primeras filas y las estadísticas por columna de un archivo de dataset.
+    Las estadísticas se leen del snapshot calculado al subir el dataset; si no existe
+    se calculan una vez y se guardan.
+    Args:
+        dataset_file (DatasetFile): Archivo de dataset.
+        columns (list[str], optional): Lista de nombres de columnas.
+        n_rows (int, optional): Número de filas a retornar.
+    Returns:
+        tuple: (pd.DataFrame con las primeras filas, lista de estadísticas).
+    """
+    stats = read_stats(dataset_file, columns)
+    if stats is None:
+        X = read_dataset_file(dataset_file, columns=columns)
+        stats = write_stats(dataset_file, X, columns)
+        return X.head(n_rows), stats
+    return read_head(dataset_file, columns, n_rows), stats
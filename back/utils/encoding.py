@@ -0,0 +1,183 @@
+import json
+import os
+from collections import Counter
+import numpy as np
+import pandas as pd
+from models.dataset_file import DatasetFile
+from utils.loadDataset import cache_is_fresh, cache_path, temp_path
+
+# Categoría que agrupa los valores que quedan fuera del vocabulario de una columna
+OTHER_CATEGORY = "__other__"
+
+
+def vocabulary(counts: Counter, max_categories=None):
+    """
+    Codificación de una columna categórica a partir de las frecuencias de sus valores.
+    Si la columna tiene más de max_categories valores se conservan los max_categories - 1
+    más frecuentes y el resto se agrupa en OTHER_CATEGORY, que recibe el último código.
+    Args:
+        counts (Counter): Frecuencia de cada valor.
+        max_categories (int, optional): Cantidad máxima de códigos, sin límite si es None o 0.
+    Returns:
+        dict: {valor: código}, con los valores ordenados.
+    """
+    values = list(counts)
+    truncated = bool(max_categories) and len(values) > max_categories
+    if truncated:
+        #los mas frecuentes, los empates se resuelven por el valor para que sea reproducible
+        values = sorted(values, key=lambda value: (-counts[value], str(value)))[:max(max_categories - 1, 0)]
+    encoder = {label: idx for idx, label in enumerate(sorted(values))}
+    if truncated:
+        encoder[OTHER_CATEGORY] = len(encoder)
+    return encoder
+
+
+class CategoricalLookup:
+    """
+    Codificación precalculada de una columna: las etiquetas como categorías de pandas y
+    sus códigos en un arreglo, para codificar columnas completas sin recorrer los valores
+    en Python.
+    """
+
+    def __init__(self, column_encoder: dict):
+        self.categories = pd.Index(list(column_encoder.keys()))
+        self.codes = np.asarray(list(column_encoder.values()), dtype=np.int64)
+        self.other = column_encoder.get(OTHER_CATEGORY)
+
+    def positions(self, values):
+        """
+        Posición de cada valor en las categorías, -1 para nulos y valores desconocidos.
+        """
+        return pd.Categorical(values, categories=self.categories).codes
+
+    def encode(self, values):
+        """
+        Codifica una columna de features como float32. Los valores desconocidos toman el
+        código de OTHER_CATEGORY si existe, si no se mantienen si son numéricos; los nulos
+        quedan como NaN.
+        """
+        values = pd.Series(values)
+        positions = self.positions(values)
+        known = positions >= 0
+        encoded = np.full(len(values), np.nan, dtype=np.float32)
+        encoded[known] = self.codes[positions[known]]
+        unknown = ~known & values.notna().to_numpy()
+        if unknown.any():
+            if self.other is not None:
+                encoded[unknown] = self.other
+            else:
+                encoded[unknown] = pd.to_numeric(values[unknown], errors="coerce").to_numpy(dtype=np.float32)
+        return encoded
+
+    def encode_labels(self, values):
+        """
+        Codifica la columna objetivo como enteros, comparando las etiquetas como texto.
+        Raises:
+            ValueError: Si hay etiquetas que no están en la codificación.
+        """
+        positions = self.positions(pd.Series(values).astype(str))
+        if (positions < 0).any():
+            raise ValueError("La columna objetivo tiene valores que no están en la codificación")
+        return self.codes[positions]
+
+
+class ColumnsEncoder:
+    """
+    Aplica el columns_encoder de un dataset con las tablas de búsqueda precalculadas una vez.
+    Lo usan el entrenamiento, la evaluación de modelos subidos, la predicción y las reglas.
+    """
+
+    def __init__(self, columns_encoder: dict):
+        self.columns_encoder = columns_encoder or {}
+        self.lookups = {column: CategoricalLookup(encoder) for column, encoder in self.columns_encoder.items()}
+
+    def transform(self, X: pd.DataFrame):
+        """
+        Codifica en su lugar las columnas categóricas de X como float32.
+        Returns:
+            pd.DataFrame: X con las columnas codificadas.
+        """
+        for column, lookup in self.lookups.items():
+            if column in X.columns:
+                X[column] = lookup.encode(X[column])
+        return X
+
+    def feature_matrix(self, X: pd.DataFrame, columns=None):
+        """
+        Matriz float32 contigua de las features en un solo paso: las columnas categóricas
+        se codifican directo en la matriz y las demás se convierten a número.
+        Args:
+            X (pd.DataFrame): Features.
+            columns (list[str], optional): Columnas a usar, por defecto todas.
+        Returns:
+            np.ndarray: Matriz float32 (filas, columnas).
+        """
+        columns = list(X.columns) if columns is None else columns
+        matrix = np.empty((len(X), len(columns)), dtype=np.float32)
+        for j, column in enumerate(columns):
+            if column in self.lookups:
+                matrix[:, j] = self.lookups[column].encode(X[column])
+            else:
+                matrix[:, j] = pd.to_numeric(X[column], errors="coerce").to_numpy(dtype=np.float32)
+        return matrix
+
+    def encodes(self, column):
+        return column in self.lookups
+
+    def encode_target(self, y: pd.Series, target_column: str):
+        """
+        Codifica la columna objetivo.
+        Returns:
+            tuple: (pd.Series con las clases, mapeo de etiquetas a clases)
+        """
+        labels = self.lookups[target_column].encode_labels(y)
+        return pd.Series(labels, index=y.index, name=y.name), dict(self.columns_encoder[target_column])
+
+
+def encode_column(values: pd.Series, column_encoder: dict):
+    """
+    Aplica la codificación de una sola columna, ver CategoricalLookup.encode.
+    """
+    return CategoricalLookup(column_encoder).encode(values)
+
+
+def vocabulary_path(dataset_file: DatasetFile, columns=None):
+    """
+    Ruta del vocabulario guardado de un archivo de dataset, junto a su cache.
+    """
+    return cache_path(dataset_file, columns, extension="vocab.json")
+
+
+def write_vocabulary(dataset_file: DatasetFile, summary: dict, columns=None):
+    """
+    Guarda el resumen de un archivo (filas y frecuencias de los valores categóricos), para
+    no volver a recorrerlo si se sube de nuevo con las mismas columnas.
+    """
+    data = {
+        "n_rows": summary["n_rows"],
+        "categories": {column: list(counts.items()) for column, counts in summary["categories"].items()},
+        "numeric_values": {column: list(counts.items()) for column, counts in summary["numeric_values"].items()},
+    }
+    path = vocabulary_path(dataset_file, columns)
+    tmp_path = temp_path(path)
+    with open(tmp_path, "w") as f:
+        json.dump(data, f)
+    os.replace(tmp_path, path)
+
+
+def read_vocabulary(dataset_file: DatasetFile, columns=None):
+    """
+    Lee el resumen guardado si existe y es más reciente que el archivo original.
+    Returns:
+        dict | None: Resumen con el formato de scan_dataset_file, o None si no hay uno válido.
+    """
+    path = vocabulary_path(dataset_file, columns)
+    if not cache_is_fresh(dataset_file, path):
+        return None
+    with open(path) as f:
+        data = json.load(f)
+    return {
+        "n_rows": data["n_rows"],
+        "categories": {column: Counter(dict(map(tuple, pairs))) for column, pairs in data["categories"].items()},
+        "numeric_values": {column: Counter(dict(map(tuple, pairs))) for column, pairs in data["numeric_values"].items()},
+    }
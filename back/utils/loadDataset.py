@@ -1,6 +1,16 @@
+import glob
+import hashlib
+import json
+import os
+import tempfile
+from collections import Counter
 import pandas as pd
 import numpy as np
+import pyarrow as pa
+import pyarrow.parquet as pq
+from core.config import settings
 from models.dataset_file import FileType, DatasetType, DatasetFile
+from utils.streamingStats import StreamingStats
 
 def load_datasets(dataset_files: list[DatasetFile], fileTypes=[FileType.CSV, FileType.EXCEL, FileType.PARQUET], datasetTypes=[DatasetType.TRAINING, DatasetType.TESTING, DatasetType.ALL], columns=None):
     """
@@ -20,17 +30,240 @@ def load_datasets(dataset_files: list[DatasetFile], fileTypes=[FileType.CSV, Fil
             continue
         if dataset_file.dataset_type not in datasetTypes:
             continue
-        if dataset_file.type_file == FileType.CSV:
-            X = pd.read_csv(dataset_file.file_path, header=0 if dataset_file.header else None, names=columns)
-        elif dataset_file.type_file == FileType.EXCEL:
-            X = pd.read_excel(dataset_file.file_path, header=0 if dataset_file.header else None, names=columns)
-        elif dataset_file.type_file == FileType.PARQUET:
-            X = pd.read_parquet(dataset_file.file_path, columns=columns)
-        else:
-            raise ValueError("Unsupported file type")
+        X = read_dataset_file(dataset_file, columns=columns)
         datasets.append({
             "data": X,
             "header": dataset_file.header,
             "dataset_type": dataset_file.dataset_type
         })
-    return datasets
\ No newline at end of file
+    return datasets
+
+
+def read_dataset_file(dataset_file: DatasetFile, columns=None):
+    """
+    Lee un archivo de dataset usando su cache columnar.
+    Los CSV y Excel se parsean una sola vez y se guardan como Parquet en CACHE_FOLDER,
+    las lecturas siguientes hacen memory-map del Parquet. El cache se regenera si el
+    archivo original es más reciente.
+    Args:
+        dataset_file (DatasetFile): Archivo a leer.
+        columns (list[str], optional): Lista de nombres de columnas a cargar.
+    Returns:
+        pd.DataFrame: Datos del archivo.
+    """
+    if dataset_file.type_file == FileType.PARQUET:
+        return pd.read_parquet(dataset_file.file_path, columns=columns, memory_map=True)
+    if dataset_file.type_file not in (FileType.CSV, FileType.EXCEL):
+        raise ValueError("Unsupported file type")
+    path = cache_path(dataset_file, columns)
+    if cache_is_fresh(dataset_file, path):
+        return pd.read_parquet(path, memory_map=True)
+    if dataset_file.type_file == FileType.CSV:
+        X = pd.read_csv(dataset_file.file_path, header=0 if dataset_file.header else None, names=columns)
+    else:
+        X = pd.read_excel(dataset_file.file_path, header=0 if dataset_file.header else None, names=columns)
+    write_cache(X, path)
+    return X
+
+
+def scan_dataset_file(dataset_file: DatasetFile, columns, target_column=None, chunk_rows=None):
+    """
+    Recorre un archivo subido por bloques de filas, sin cargarlo completo en memoria.
+    En la misma pasada valida las columnas, cuenta las filas, junta los valores de las
+    columnas categóricas con sus frecuencias para construir los encoders, acumula las
+    estadísticas de cada columna (ver StreamingStats) y, para los CSV, escribe el cache
+    columnar bloque a bloque.
+    Args:
+        dataset_file (DatasetFile): Archivo a recorrer.
+        columns (list[str]): Nombres de las columnas del dataset.
+        target_column (str, optional): Columna objetivo.
+        chunk_rows (int, optional): Filas por bloque, por defecto PARSE_CHUNK_ROWS.
+    Returns:
+        dict: {"n_rows": filas, "categories": {columna: Counter de valores},
+            "numeric_values": {columna objetivo: Counter de valores} si la columna objetivo es numérica,
+            "stats": estadísticas por columna con el formato de column_stats}
+    Raises:
+        ValueError: Si el archivo no tiene las columnas indicadas.
+    """
+    chunk_rows = chunk_rows or settings.PARSE_CHUNK_ROWS
+    summary = {"n_rows": 0, "categories": {}, "numeric_values": {}}
+    numeric_seen = set()
+    stats = StreamingStats(columns, settings.STATS_MAX_DISTINCT, settings.STATS_SAMPLE_ROWS)
+    writer = None
+    if dataset_file.type_file == FileType.CSV:
+        chunks = pd.read_csv(dataset_file.file_path, header=0 if dataset_file.header else None, chunksize=chunk_rows)
+        writer = ChunkedCacheWriter(cache_path(dataset_file, columns), columns)
+    elif dataset_file.type_file == FileType.EXCEL:
+        #Excel no se puede leer por partes, se lee completo una vez y queda el cache
+        X = pd.read_excel(dataset_file.file_path, header=0 if dataset_file.header else None)
+        check_columns(X.columns, columns)
+        X.columns = columns
+        write_cache(X, cache_path(dataset_file, columns))
+        chunks = [X]
+    elif dataset_file.type_file == FileType.PARQUET:
+        parquet = pq.ParquetFile(dataset_file.file_path)
+        missing = [col for col in columns if col not in parquet.schema_arrow.names]
+        if missing:
+            raise ValueError(f"Columnas no encontradas en el archivo: {', '.join(missing)}")
+        chunks = (batch.to_pandas() for batch in parquet.iter_batches(batch_size=chunk_rows, columns=columns))
+    else:
+        raise ValueError("Unsupported file type")
+    try:
+        for chunk in chunks:
+            if dataset_file.type_file == FileType.CSV:
+                check_columns(chunk.columns, columns)
+                chunk.columns = columns
+                writer.write(chunk)
+            summary["n_rows"] += len(chunk)
+            stats.update(chunk)
+            categorical = set(chunk.select_dtypes(exclude=["number"]).columns)
+            for column in chunk.columns:
+                if column in categorical:
+                    count_values(summary["categories"].setdefault(column, Counter()), chunk[column])
+                else:
+                    numeric_seen.add(column)
+            if target_column is not None and target_column not in categorical:
+                count_values(summary["numeric_values"].setdefault(target_column, Counter()), chunk[target_column])
+        if writer is not None:
+            writer.close()
+    except BaseException:
+        if writer is not None:
+            writer.abort()
+        raise
+    #columnas numéricas en unos bloques y de texto en otros: pandas las lee completas como texto,
+    #se vuelven a recorrer como texto para que el encoder tenga los mismos valores
+    mixed = [col for col in summary["categories"] if col in numeric_seen]
+    if mixed and dataset_file.type_file == FileType.CSV:
+        for column in mixed:
+            summary["categories"][column] = Counter()
+        for chunk in pd.read_csv(dataset_file.file_path, header=0 if dataset_file.header else None, names=columns, usecols=mixed, dtype=str, chunksize=chunk_rows):
+            for column in mixed:
+                count_values(summary["categories"][column], chunk[column])
+    if target_column in summary["categories"]:
+        summary["numeric_values"].pop(target_column, None)
+    summary["stats"] = stats.result(summary["categories"])
+    return summary
+
+
+def count_values(counts: Counter, values: pd.Series):
+    """
+    Suma a counts las frecuencias de los valores no nulos de un bloque.
+    """
+    for value, count in values.value_counts(dropna=True).items():
+        counts[value.item() if isinstance(value, np.generic) else value] += int(count)
+
+
+def check_columns(found, columns):
+    """
+    Valida que un archivo tenga tantas columnas como las declaradas.
+    """
+    if len(found) != len(columns):
+        raise ValueError(f"El archivo tiene {len(found)} columnas, se esperaban {len(columns)}")
+
+
+class ChunkedCacheWriter:
+    """
+    Escribe el cache Parquet de un CSV bloque a bloque mientras se recorre el archivo.
+    Si un bloque no se puede representar con el esquema del primero (tipos que cambian
+    entre bloques) se descarta el cache y se regenera en la primera lectura completa.
+    """
+
+    def __init__(self, path, columns):
+        self.path = path
+        self.tmp_path = None
+        self.writer = None
+        self.enabled = bool(columns) and all(isinstance(col, str) for col in columns)
+
+    def write(self, chunk: pd.DataFrame):
+        if not self.enabled:
+            return
+        try:
+            table = pa.Table.from_pandas(chunk, preserve_index=False)
+            if self.writer is None:
+                self.tmp_path = temp_path(self.path)
+                self.writer = pq.ParquetWriter(self.tmp_path, table.schema)
+            else:
+                table = table.cast(self.writer.schema)
+            self.writer.write_table(table)
+        except Exception as e:
+            print(f"No se pudo guardar el cache {self.path}: {e}")
+            self.abort()
+
+    def close(self):
+        if self.writer is None:
+            return
+        self.writer.close()
+        self.writer = None
+        os.replace(self.tmp_path, self.path)
+
+    def abort(self):
+        self.enabled = False
+        if self.writer is not None:
+            self.writer.close()
+            self.writer = None
+        if self.tmp_path is not None and os.path.exists(self.tmp_path):
+            os.remove(self.tmp_path)
+
+
+def write_cache(X: pd.DataFrame, path: str):
+    """
+    Guarda un DataFrame como cache Parquet. Si los datos no se pueden representar en
+    Parquet (columnas sin nombre o con tipos mezclados) no se guarda cache.
+    """
+    if not all(isinstance(col, str) for col in X.columns):
+        return
+    tmp_path = temp_path(path)
+    try:
+        X.to_parquet(tmp_path)
+        os.replace(tmp_path, path)
+    except Exception as e:
+        print(f"No se pudo guardar el cache {path}: {e}")
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+def temp_path(path: str):
+    """
+    Archivo temporal único en la carpeta de path, para escribirlo y moverlo con os.replace.
+    Dos escrituras simultáneas del mismo cache (lecturas en paralelo en el pool de las rutas)
+    no comparten el temporal.
+    """
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix=os.path.basename(path) + ".", suffix=".tmp")
+    os.close(fd)
+    return tmp_path
+
+
+def cache_is_fresh(dataset_file: DatasetFile, path: str):
+    """
+    Indica si un archivo de cache existe y es más reciente que el archivo original.
+    """
+    return os.path.exists(path) and os.path.getmtime(path) >= os.path.getmtime(dataset_file.file_path)
+
+
+def cache_path(dataset_file: DatasetFile, columns=None, extension="parquet"):
+    """
+    Ruta de un archivo de cache de un archivo de dataset, depende del archivo, del
+    encabezado y de las columnas.
+    """
+    signature = hashlib.sha1(json.dumps([bool(dataset_file.header), columns]).encode()).hexdigest()[:12]
+    return f"{cache_prefix(dataset_file)}.{signature}.{extension}"
+
+
+def cache_prefix(dataset_file: DatasetFile):
+    """
+    Prefijo común de los archivos de cache asociados a un archivo de dataset.
+    """
+    file_path = os.path.abspath(str(dataset_file.file_path))
+    path_hash = hashlib.sha1(file_path.encode()).hexdigest()[:12]
+    return os.path.join(settings.CACHE_FOLDER, f"{path_hash}_{os.path.basename(file_path)}")
+
+
+def remove_cache(dataset_file: DatasetFile):
+    """
+    Elimina los archivos de cache asociados a un archivo de dataset.
+    """
+    for path in glob.glob(glob.escape(cache_prefix(dataset_file)) + ".*"):
+        try:
+            os.remove(path)
+        except Exception as e:
+            print(f"Error al eliminar el cache {path}: {e}")
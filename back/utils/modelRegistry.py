@@ -0,0 +1,80 @@
+import os
+import threading
+from collections import OrderedDict
+
+
+class ModelRegistry:
+    """
+    Cache LRU en memoria de modelos cargados, indexado por id de iteración.
+
+    Cada entrada recuerda la ruta y la fecha de modificación del archivo del modelo,
+    si el archivo cambia en disco la entrada se recarga. El cache se limita por
+    cantidad de modelos y por memoria aproximada (tamaño del archivo serializado).
+    """
+
+    def __init__(self, loader, max_models=16, max_bytes=512 * 1024 * 1024):
+        """
+        Args:
+            loader (callable): Función loader(model_path, n_classes) que carga un modelo desde disco.
+            max_models (int): Número máximo de modelos en memoria.
+            max_bytes (int): Memoria máxima aproximada en bytes de los modelos en memoria.
+        """
+        self.loader = loader
+        self.max_models = max_models
+        self.max_bytes = max_bytes
+        self._models = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def get(self, iteration_id, model_path, n_classes):
+        """
+        Retorna el modelo de una iteración, cargándolo desde disco si no está en memoria
+        o si el archivo cambió desde que se cargó.
+        Args:
+            iteration_id (int): Id de la iteración.
+            model_path (str): Ruta del archivo del modelo.
+            n_classes (int): Número de clases del modelo.
+        Returns:
+            Modelo cargado.
+        """
+        mtime = os.path.getmtime(model_path)
+        key = (model_path, mtime, n_classes)
+        with self._lock:
+            entry = self._models.get(iteration_id)
+            if entry is not None and entry["key"] == key:
+                self._models.move_to_end(iteration_id)
+                return entry["model"]
+        model = self.loader(model_path, n_classes)
+        size = os.path.getsize(model_path)
+        with self._lock:
+            self._discard(iteration_id)
+            self._models[iteration_id] = {"key": key, "size": size, "model": model}
+            self._bytes += size
+            while len(self._models) > 1 and (len(self._models) > self.max_models or self._bytes > self.max_bytes):
+                self._discard(next(iter(self._models)))
+        return model
+
+    def invalidate(self, iteration_id):
+        """
+        Elimina de memoria el modelo de una iteración (por ejemplo al borrarla).
+        """
+        with self._lock:
+            self._discard(iteration_id)
+
+    def clear(self):
+        with self._lock:
+            self._models.clear()
+            self._bytes = 0
+
+    def __contains__(self, iteration_id):
+        with self._lock:
+            return iteration_id in self._models
+
+    def __len__(self):
+        with self._lock:
+            return len(self._models)
+
+    def _discard(self, iteration_id):
+        entry = self._models.pop(iteration_id, None)
+        if entry is not None:
+            self._bytes -= entry["size"]
@@ -0,0 +1,154 @@
+from collections import Counter
+import numpy as np
+import pandas as pd
+
+# Hashes conservados para estimar los valores únicos de una columna con muchos valores distintos
+SKETCH_SIZE = 4096
+
+
+def histogram_entries(counts, bin_edges):
+    """
+    Formato del histograma de una columna numérica en las estadísticas.
+    """
+    return [
+        {"bin": f"{bin_edges[i]:.2f} - {bin_edges[i+1]:.2f}", "count": int(round(counts[i]))}
+        for i in range(len(counts))
+    ]
+
+
+def column_type(dtypes):
+    """
+    Tipo de una columna leída completa a partir de los tipos de sus bloques, como lo infiere pandas.
+    """
+    if len(dtypes) == 1:
+        return next(iter(dtypes))
+    if all(pd.api.types.is_numeric_dtype(dtype) and not pd.api.types.is_bool_dtype(dtype) for dtype in dtypes):
+        return np.result_type(*dtypes)
+    return np.dtype(object)
+
+
+class StreamingStats:
+    """
+    Estadísticas por columna de un archivo que se recorre por bloques, con el formato de
+    column_stats y sin tener el archivo completo en memoria.
+
+    Nulos, mínimo, máximo y media se acumulan de forma exacta. En las columnas numéricas
+    las frecuencias de cada valor se guardan mientras no superen max_distinct valores
+    distintos, con ellas el histograma y los valores únicos son exactos; sobre ese límite
+    los únicos se estiman con los SKETCH_SIZE hashes menores y el histograma se calcula
+    sobre una muestra uniforme de sample_rows filas. Los valores únicos y el histograma
+    de las columnas de texto salen de las frecuencias que ya junta scan_dataset_file.
+    """
+
+    def __init__(self, columns, max_distinct=100_000, sample_rows=100_000, seed=0):
+        self.n_rows = 0
+        self.max_distinct = max_distinct
+        self.sample_rows = sample_rows
+        self.rng = np.random.default_rng(seed)
+        self.columns = {
+            column: {
+                "dtypes": set(),
+                "nulls": 0,
+                "count": 0,
+                "sum": 0.0,
+                "min": None,
+                "max": None,
+                "counts": pd.Series(dtype=float),
+                "sketch": np.empty(0, dtype=np.uint64),
+                "sample": np.empty(0, dtype=float),
+                "sample_keys": np.empty(0, dtype=float),
+            }
+            for column in columns
+        }
+
+    def update(self, chunk: pd.DataFrame):
+        """
+        Suma un bloque de filas a las estadísticas.
+        """
+        self.n_rows += len(chunk)
+        for column, state in self.columns.items():
+            values = chunk[column]
+            state["dtypes"].add(values.dtype)
+            state["nulls"] += int(values.isnull().sum())
+            if pd.api.types.is_numeric_dtype(values):
+                self._update_numeric(state, values.dropna().to_numpy(dtype=float))
+
+    def _update_numeric(self, state, values):
+        if values.size == 0:
+            return
+        state["count"] += values.size
+        state["sum"] += float(values.sum())
+        low, high = float(values.min()), float(values.max())
+        state["min"] = low if state["min"] is None else min(state["min"], low)
+        state["max"] = high if state["max"] is None else max(state["max"], high)
+        if state["counts"] is not None:
+            counts = pd.Series(values).value_counts()
+            state["counts"] = state["counts"].add(counts, fill_value=0)
+            if len(state["counts"]) > self.max_distinct:
+                #demasiados valores distintos, se sigue solo con el sketch y la muestra
+                state["counts"] = None
+        #hashes menores de los valores distintos
+        hashes = pd.util.hash_array(values)
+        state["sketch"] = np.unique(np.concatenate([state["sketch"], hashes]))[:SKETCH_SIZE]
+        #muestra uniforme: las filas con las claves aleatorias menores
+        keys = self.rng.random(values.size)
+        sample = np.concatenate([state["sample"], values])
+        sample_keys = np.concatenate([state["sample_keys"], keys])
+        if sample.size > self.sample_rows:
+            keep = np.argpartition(sample_keys, self.sample_rows)[:self.sample_rows]
+            sample, sample_keys = sample[keep], sample_keys[keep]
+        state["sample"], state["sample_keys"] = sample, sample_keys
+
+    @staticmethod
+    def _distinct(state):
+        if state["counts"] is not None:
+            return len(state["counts"])
+        sketch = state["sketch"]
+        if sketch.size < SKETCH_SIZE:
+            return int(sketch.size)
+        #estimador de los k valores minimos
+        return int(round((SKETCH_SIZE - 1) / (float(sketch[-1]) / 2.0 ** 64)))
+
+    def result(self, categories=None):
+        """
+        Estadísticas de todas las columnas, ver column_stats.
+        Args:
+            categories (dict, optional): {columna: Counter de valores} de las columnas de texto.
+        Returns:
+            list: Estadísticas por columna.
+        """
+        categories = categories or {}
+        return [self._column_result(column, state, categories.get(column, Counter()))
+                for column, state in self.columns.items()]
+
+    def _column_result(self, column, state, counter):
+        dtype = column_type(state["dtypes"]) if state["dtypes"] else np.dtype(object)
+        numeric = pd.api.types.is_numeric_dtype(dtype)
+        has_nulls = 1 if state["nulls"] else 0
+        if numeric:
+            unique_count = self._distinct(state) + has_nulls
+            bins = min(unique_count, 10)
+            if state["counts"] is not None:
+                counts, bin_edges = np.histogram(state["counts"].index.to_numpy(dtype=float), bins=bins,
+                                                 weights=state["counts"].to_numpy())
+            else:
+                counts, bin_edges = np.histogram(state["sample"], bins=bins, range=(state["min"], state["max"]))
+                counts = counts * state["count"] / max(state["sample"].size, 1)
+            histogram = histogram_entries(counts, bin_edges)
+        else:
+            unique_count = len(counter) + has_nulls
+            histogram = None
+            if unique_count <= 10:
+                histogram = [{"bin": str(value), "count": int(count)} for value, count in counter.most_common()]
+        count = state["count"]
+        return {
+            "column": str(column),
+            "type": str(dtype),
+            "nulls": state["nulls"],
+            "nullPercent": float(state["nulls"] / self.n_rows * 100) if self.n_rows else 0.0,
+            "uniqueCount": int(unique_count),
+            "min": float(round(state["min"], 2)) if numeric and count else None,
+            "max": float(round(state["max"], 2)) if numeric and count else None,
+            "mean": float(round(state["sum"] / count, 2)) if numeric and count else None,
+            "histogram": histogram,
+        }
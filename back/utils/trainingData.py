@@ -0,0 +1,140 @@
+import json
+import os
+import shutil
+import numpy as np
+import pandas as pd
+from scipy import sparse
+from sklearn.model_selection import KFold, StratifiedKFold
+
+
+def numeric_columns(X):
+    """
+    Columnas numéricas o booleanas de X, las únicas que usa el entrenamiento.
+    Las columnas object ya codificadas se convierten a su tipo inferido.
+    """
+    X = X.infer_objects()
+    return X.select_dtypes(include=[np.number, "bool"]).columns.tolist()
+
+
+def as_float_matrix(X, columns=None):
+    """
+    Convierte X en una matriz float32 contigua, en una sola copia.
+    Args:
+        X (pd.DataFrame): Features.
+        columns (list): Columnas a usar, por defecto las numéricas o booleanas.
+    Returns:
+        tuple: (matriz float32, columnas)
+    """
+    if columns is None:
+        columns = numeric_columns(X)
+    return np.ascontiguousarray(X[columns].to_numpy(dtype=np.float32)), columns
+
+
+def write_matrix(path, X, columns):
+    """
+    Escribe las columnas de X como un .npy float32 contiguo, columna a columna,
+    sin materializar la matriz completa en memoria.
+    """
+    matrix = np.lib.format.open_memmap(path, mode="w+", dtype=np.float32, shape=(len(X), len(columns)))
+    for j, column in enumerate(columns):
+        matrix[:, j] = X[column].to_numpy(dtype=np.float32)
+    matrix.flush()
+    del matrix
+
+
+def save_split(path, X_train, X_test, y_train, y_test):
+    """
+    Guarda en disco un split de entrenamiento para que un worker lo lea por referencia.
+    Las features quedan como matrices float32 contiguas que se leen con memmap.
+    Args:
+        path (str): Carpeta donde se guardan los datos.
+        X_train, X_test (pd.DataFrame): Features de entrenamiento y prueba.
+        y_train, y_test (pd.Series | np.ndarray): Etiquetas de entrenamiento y prueba.
+    Returns:
+        str: Carpeta con los datos guardados.
+    """
+    os.makedirs(path, exist_ok=True)
+    columns = numeric_columns(X_train)
+    X_train, X_test = X_train.infer_objects(), X_test.infer_objects()
+    write_matrix(os.path.join(path, "X_train.npy"), X_train, columns)
+    write_matrix(os.path.join(path, "X_test.npy"), X_test, columns)
+    np.save(os.path.join(path, "y_train.npy"), np.asarray(y_train).astype(np.int64))
+    np.save(os.path.join(path, "y_test.npy"), np.asarray(y_test).astype(np.int64))
+    with open(os.path.join(path, "columns.json"), "w") as f:
+        json.dump(columns, f)
+    return path
+
+
+def load_split(path):
+    """
+    Lee un split guardado con save_split sin copiarlo a memoria (memmap de solo lectura).
+    Returns:
+        tuple: (X_train, X_test, y_train, y_test, columns)
+    """
+    X_train = np.load(os.path.join(path, "X_train.npy"), mmap_mode="r")
+    X_test = np.load(os.path.join(path, "X_test.npy"), mmap_mode="r")
+    y_train = np.load(os.path.join(path, "y_train.npy"), mmap_mode="r")
+    y_test = np.load(os.path.join(path, "y_test.npy"), mmap_mode="r")
+    with open(os.path.join(path, "columns.json")) as f:
+        columns = json.load(f)
+    return X_train, X_test, y_train, y_test, columns
+
+
+def save_activations(path, activations):
+    """
+    Guarda junto al split la matriz dispersa de activación de reglas sobre X_train,
+    para que los entrenamientos que comparten el split no vuelvan a evaluar las reglas.
+    """
+    sparse.save_npz(os.path.join(path, "activations.npz"), sparse.csr_matrix(activations))
+
+
+def load_activations(path):
+    """
+    Lee la matriz de activación guardada con save_activations.
+    Returns:
+        sparse.csr_matrix | None: None si el split no tiene activaciones precalculadas.
+    """
+    file = os.path.join(path, "activations.npz")
+    if not os.path.exists(file):
+        return None
+    return sparse.load_npz(file).tocsr()
+
+
+def fold_assignment(y, folds, seed=42):
+    """
+    Asigna cada fila a su fold de prueba, estratificando por clase cuando todas las clases
+    tienen al menos una fila por fold.
+    Returns:
+        np.ndarray: Índice del fold de cada fila.
+    """
+    y = np.asarray(y)
+    _, counts = np.unique(y, return_counts=True)
+    if counts.min() >= folds:
+        splitter = StratifiedKFold(n_splits=folds, shuffle=True, random_state=seed)
+    else:
+        splitter = KFold(n_splits=folds, shuffle=True, random_state=seed)
+    assignment = np.zeros(len(y), dtype=np.int64)
+    for i, (_, test) in enumerate(splitter.split(np.zeros(len(y)), y)):
+        assignment[test] = i
+    return assignment
+
+
+def save_folds(path, folds):
+    """
+    Guarda junto al split el fold de prueba de cada fila de X_train, para una validación cruzada.
+    """
+    np.save(os.path.join(path, "folds.npy"), np.asarray(folds, dtype=np.int64))
+
+
+def load_folds(path):
+    """
+    Lee la asignación de folds guardada con save_folds.
+    """
+    return np.load(os.path.join(path, "folds.npy"))
+
+
+def remove_split(path):
+    """
+    Elimina los datos de un split guardado.
+    """
+    shutil.rmtree(path, ignore_errors=True)
@@ -0,0 +1,59 @@
+import hashlib
+import os
+import uuid
+from fastapi import UploadFile
+from core.config import settings
+
+
+async def save_upload(file: UploadFile, path: str, chunk_size=None):
+    """
+    Guarda un archivo subido en disco por bloques de tamaño fijo, sin cargarlo completo
+    en memoria, y calcula su hash a medida que se escribe.
+    El archivo se escribe primero en un temporal, si la subida falla no queda un archivo a medias.
+    Args:
+        file (UploadFile): Archivo subido.
+        path (str): Ruta de destino.
+        chunk_size (int, optional): Bytes por bloque, por defecto UPLOAD_CHUNK_SIZE.
+    Returns:
+        tuple: (sha256 del contenido en hexadecimal, tamaño en bytes)
+    """
+    chunk_size = chunk_size or settings.UPLOAD_CHUNK_SIZE
+    digest = hashlib.sha256()
+    size = 0
+    tmp_path = f"{path}.part"
+    try:
+        with open(tmp_path, "wb") as f:
+            while True:
+                chunk = await file.read(chunk_size)
+                if not chunk:
+                    break
+                digest.update(chunk)
+                f.write(chunk)
+                size += len(chunk)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    return digest.hexdigest(), size
+
+
+async def save_blob(file: UploadFile, folder: str, extension: str):
+    """
+    Guarda un archivo subido direccionado por su contenido: la ruta final es el sha256 del
+    contenido, si ya existe un archivo idéntico se descarta la copia nueva y se reutiliza.
+    Args:
+        file (UploadFile): Archivo subido.
+        folder (str): Carpeta del almacenamiento.
+        extension (str): Extensión del archivo.
+    Returns:
+        tuple: (ruta del archivo almacenado, sha256 del contenido, tamaño en bytes, si ya existía)
+    """
+    tmp_path = os.path.join(folder, f"upload_{uuid.uuid4().hex}")
+    digest, size = await save_upload(file, tmp_path)
+    path = os.path.join(folder, f"{digest}.{extension}")
+    if os.path.exists(path):
+        os.remove(tmp_path)
+        return path, digest, size, True
+    os.replace(tmp_path, path)
+    return path, digest, size, False